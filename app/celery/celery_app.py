@@ -5,11 +5,15 @@ from redbeat import RedBeatSchedulerEntry          #  ← NEW
 import os
 import logging
 import logging.config
+from app.celery.serialization import SERIALIZER, register_msgpack_ext
 
 # ── 1.  Broker / backend  ────────────────────────────────────
 CELERY_BROKER_URL    = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
 
+# msgpack + SwapBatch/Decimal/datetime extension types (see serialization.py)
+register_msgpack_ext()
+
 celery_app = Celery(
     "crypto_tasks",
     broker=CELERY_BROKER_URL,
@@ -18,10 +22,12 @@ celery_app = Celery(
 
 # ── 2.  Core config Beat & routing tweaks ─────────────────────
 celery_app.conf.update(
-    # serialization (kept)
-    task_serializer       ='json',
-    result_serializer     ='json',
-    accept_content        =['json'],
+    # serialization – columnar swap batches travel as msgpack; JSON is
+    # still accepted for messages queued before the switch
+    task_serializer       =SERIALIZER,
+    result_serializer     =SERIALIZER,
+    accept_content        =[SERIALIZER, 'json'],
+    result_accept_content =[SERIALIZER, 'json'],
     timezone              ='UTC',
     enable_utc            =True,
 
@@ -67,6 +73,8 @@ celery_app.conf.imports = [
     "app.sources.dex_data_pipeline.ingestion.schedule_ingest",
     "app.sources.dex_data_pipeline.utils.aggregator_and_upsert",
     "app.sources.dex_data_pipeline.evm.utils.uniswap_v3_decoder",
+    "app.sources.dex_data_pipeline.evm.utils.uniswap_v2_decoder",
+    "app.sources.dex_data_pipeline.evm.utils.decoder_registry",
     "app.sources.dex_data_pipeline.evm.utils.enrich_tx_batch",
     "app.scheduler.dispatcher"
 ]   # Celery looks for tasks.py files here
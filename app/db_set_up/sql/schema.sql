@@ -167,6 +167,11 @@ CREATE TABLE IF NOT EXISTS extraction_metrics (
     duration_seconds NUMERIC(10, 2)  -- how long it took to process in seconds
 );
 
+ALTER TABLE extraction_metrics
+    ADD COLUMN IF NOT EXISTS timestamp_rpc_calls      INTEGER,
+    ADD COLUMN IF NOT EXISTS timestamp_cache_hit_rate NUMERIC(5, 4),
+    ADD COLUMN IF NOT EXISTS range_stats              JSONB;
+
 CREATE TABLE pools (
     id            SERIAL PRIMARY KEY,
     chain         VARCHAR(32)  NOT NULL,
@@ -202,4 +207,18 @@ CREATE TABLE IF NOT EXISTS pool_flow_hourly (
           volume_usd   NUMERIC(38,2),
           pressure     NUMERIC(8,5),
           PRIMARY KEY (pool_slug, bucket_start)
-        );
\ No newline at end of file
+        );
+CREATE TABLE IF NOT EXISTS block_time_index (
+    chain         TEXT    NOT NULL,
+    block_number  BIGINT  NOT NULL,
+    "timestamp"   BIGINT  NOT NULL,          -- unix seconds
+    PRIMARY KEY (chain, block_number)
+);
+
+CREATE TABLE IF NOT EXISTS block_coverage (
+    pool_slug   TEXT        NOT NULL,
+    from_block  BIGINT      NOT NULL,
+    to_block    BIGINT      NOT NULL,        -- inclusive
+    created_at  TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (pool_slug, from_block, to_block)
+);
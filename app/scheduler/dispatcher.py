@@ -4,7 +4,7 @@ from redlock import Redlock
 import time
 from app.storage.db import SessionLocal
 from app.storage.models.pools import Pool
-from app.sources.dex_data_pipeline.ingestion.schedule_ingest import ingest_pool           # Celery wrapper task
+from app.sources.dex_data_pipeline.ingestion.schedule_ingest import ingest_chain          # Celery wrapper task
 import logging
 log = logging.getLogger(__name__)
 
@@ -32,26 +32,29 @@ def dispatch_all(self):
                        .order_by(Pool.last_started.nullsfirst())
                        .all())
 
+        # One run per chain: its pools share every eth_getLogs call.
+        by_chain: dict[str, list] = {}
         for pool in pools:
-            log.info(f"🚀 Launching {pool.chain}/{pool.dex} {pool.pair}")
-            result = ingest_pool.apply_async(
-                kwargs={
-                    "chain": pool.chain,
-                    "dex": pool.dex,
-                    "pair": pool.pair,
-                    "pool_addr": pool.address,
-                    "days_back": 1,
-                },
-                queue="orchestrate",
-            )
+            by_chain.setdefault(pool.chain.lower(), []).append(pool)
+
+        for chain, chain_pools in by_chain.items():
+            log.info(f"🚀 Launching {chain} for {len(chain_pools)} pools: "
+                     f"{', '.join(f'{p.dex} {p.pair}' for p in chain_pools)}")
             try:
-                log.info(f"✅ Done {pool.address}")
+                ingest_chain.apply_async(
+                    kwargs={
+                        "chain": chain,
+                        "days_back": 1,
+                    },
+                    queue="orchestrate",
+                )
+                log.info(f"✅ Queued {chain}")
             except Exception:
-                log.exception(f"❌ Failed {pool.address}")
+                log.exception(f"❌ Failed {chain}")
 
             with SessionLocal() as db:
-                db.query(Pool).filter_by(id=pool.id)\
-                              .update({"last_started": time.time()})
+                db.query(Pool).filter(Pool.id.in_([p.id for p in chain_pools]))\
+                              .update({"last_started": time.time()}, synchronize_session=False)
                 db.commit()
 
             time.sleep(STAGGER_SECS)
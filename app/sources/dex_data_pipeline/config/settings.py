@@ -25,4 +25,108 @@ ROUTER_MAP = {
 }
 
 ARBITRUM_BLOCKS_PER_CALL = 10000
-BASE_BLOCKS_PER_CALL = 10000
\ No newline at end of file
+BASE_BLOCKS_PER_CALL = 10000
+
+# Average seconds per block – seeds the interpolation block search
+BLOCK_TIME_SECONDS = {
+    "arbitrum": 0.25,
+    "base": 2.0,
+}
+
+# Block-time checkpoints are persisted only this far below the chain head
+# (younger blocks can still be reorged)
+BLOCK_INDEX_SAFE_SECONDS = 15 * 60
+
+# Seeding an empty coverage ledger from a kline table: up to this many
+# minutes without klines between two minutes with klines count as quiet
+# minutes, not as a hole (a failed crawl range of a quiet pool spans more)
+COVERAGE_SEED_MAX_EMPTY_MINUTES = 5
+
+# "bisect" | "interpolate" | "batched" – how BlockClient finds a block by timestamp.
+# Bisection is the default; interpolation is opt-in per chain, e.g.
+# BLOCK_SEARCH_MODE_ARBITRUM=interpolate
+BLOCK_SEARCH_MODE = {
+    "arbitrum": os.getenv("BLOCK_SEARCH_MODE_ARBITRUM", "bisect"),
+    "base": os.getenv("BLOCK_SEARCH_MODE_BASE", "bisect"),
+}
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Fetch the real timestamp of every block that has logs instead of
+# interpolating between checkpoints (costs ~1 RPC per new block, shared cache)
+EXACT_BLOCK_TIMESTAMPS = {
+    "arbitrum": False,
+    "base": False,
+}
+
+# Adaptive eth_getLogs windows aim for this many logs per call
+LOGS_PER_CALL_TARGET = 2_000
+# Per-pool overrides, keyed by lower-case pool address
+POOL_LOGS_PER_CALL_TARGET: dict[str, int] = {}
+# Hard cap on a single eth_getLogs window (blocks)
+MAX_BLOCKS_PER_CALL = {
+    "arbitrum": 1_000_000,
+    "base": 200_000,
+}
+
+# eth_getLogs windows fetched ahead of the one being dispatched
+LOG_FETCH_CONCURRENCY = 4
+# Provider call budget per chain (Alchemy Growth ≈ 660 CU/s, eth_getLogs = 75 CU)
+RPC_CALLS_PER_SECOND = {
+    "arbitrum": 8,
+    "base": 8,
+}
+
+# Ranges with fewer logs than this are decoded inside the orchestrate worker
+# (local process pool) instead of one Celery decode task per chunk
+LOCAL_DECODE_MAX_LOGS = 5_000
+# Processes of that local decode pool (≤ 1 → decode inline, no pool); shipping
+# logs to pool processes only pays off with spare cores
+LOCAL_DECODE_PROCESSES = min(4, (os.cpu_count() or 1) - 1)
+
+# Streaming backfill (cli `stream`): block ranges buffered between two stages
+# (bounds memory) and how often per-stage throughput / queue depth is logged
+STREAM_QUEUE_SIZE = 4
+STREAM_REPORT_SECONDS = 30
+
+# Chord backpressure (see chord_throttle): range chords one orchestrator keeps
+# in flight per pool (per chain for the chain crawler), and across all
+# orchestrators (shared through Redis)
+CHORD_MAX_IN_FLIGHT_PER_POOL = int(os.getenv("CHORD_MAX_IN_FLIGHT_PER_POOL", "8"))
+CHORD_MAX_IN_FLIGHT_PER_CHAIN = int(os.getenv("CHORD_MAX_IN_FLIGHT_PER_CHAIN", "16"))
+CHORD_MAX_IN_FLIGHT_GLOBAL = int(os.getenv("CHORD_MAX_IN_FLIGHT_GLOBAL", "64"))
+# A global slot frees itself after this long (orchestrator died mid-crawl)
+CHORD_SLOT_TTL_SECONDS = 30 * 60
+# How long a crawl waits for its last chords before finalizing the pool
+CHORD_DRAIN_TIMEOUT_SECONDS = 30 * 60
+
+# Decode chunk sizing (see chunk_planner): starting estimate of decode cost per
+# log (refined from measured local decodes), the least work worth a task of
+# its own, and the decode concurrency to assume when workers can't be inspected
+DECODE_SECONDS_PER_LOG = 40e-6
+DECODE_TASK_SECONDS = 0.02
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "8"))
+
+# tx hash → sender cache in front of eth_getTransactionByHash (enrich): Redis
+# entries expire after the TTL, each worker keeps an LRU of the given size
+TX_SENDER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+TX_SENDER_CACHE_SIZE = 200_000
+
+# How enrich resolves uncached senders (see tx_senders.SenderCostModel):
+# "tx" = eth_getTransactionByHash per tx, "block" = eth_getBlockByNumber with
+# full txs per distinct block, "auto" = whichever the cost model says is
+# cheaper for the batch's swaps-per-block density.  Model inputs: one HTTP
+# round trip, node work per sub-request, transfer + parse of one tx object,
+# and the txs per block to expect until blocks have been seen
+TX_SENDER_STRATEGY = os.getenv("TX_SENDER_STRATEGY", "auto")
+TX_SENDER_SECONDS_PER_CALL = 0.03
+TX_SENDER_SECONDS_PER_REQUEST = 0.5e-3
+TX_SENDER_SECONDS_PER_TX = 0.05e-3
+TX_SENDER_TXS_PER_BLOCK = 20
+
+# JSON-RPC batches (see rpc_batcher): batches one call may have on the wire at
+# once, sub-requests per second a worker process sends to one provider, and
+# attempts per sub-request before the calling task gives up and retries
+RPC_MAX_CONCURRENCY = int(os.getenv("RPC_MAX_CONCURRENCY", "8"))
+RPC_RATE_PER_SECOND = int(os.getenv("RPC_RATE_PER_SECOND", "300"))
+RPC_SUBREQUEST_ATTEMPTS = 3
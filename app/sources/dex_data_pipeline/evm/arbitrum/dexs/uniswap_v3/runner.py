@@ -1,6 +1,5 @@
 from app.sources.dex_data_pipeline.evm.utils.orchestrator import run_evm_orchestration
 from app.sources.dex_data_pipeline.config.settings import ARBITRUM_RPC_URL
-from app.sources.dex_data_pipeline.evm.utils.uniswap_v3_decoder import decode_log_chunk
 from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import (
     SWAP_TOPIC,
     SWAP_ABI,
@@ -26,7 +25,6 @@ def run_uniswap_orchestration(
         pool_address=pool_address,
         swap_topic=SWAP_TOPIC,
         swap_abi=SWAP_ABI,
-        decode_log_chunk_fn=decode_log_chunk,
         chain=chain,
         dex=dex,
         pair=pair,
@@ -0,0 +1,46 @@
+"""
+(chain, dex) → everything needed to crawl and decode that DEX's swaps.
+
+The per-pool runners wire these pieces by hand; the chain-level crawler
+looks them up here so one eth_getLogs call can serve every active pool.
+"""
+from typing import NamedTuple
+
+from app.sources.dex_data_pipeline.config.settings import ARBITRUM_RPC_URL, BASE_RPC_URL
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.camelot import config as arbitrum_camelot
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3 import config as arbitrum_uniswap_v3
+from app.sources.dex_data_pipeline.evm.base.dexs.aerodrome import config as base_aerodrome
+from app.sources.dex_data_pipeline.evm.base.dexs.pancakeswap import config as base_pancakeswap
+from app.sources.dex_data_pipeline.evm.base.dexs.uniswap_v3 import config as base_uniswap_v3
+
+
+class DexSpec(NamedTuple):
+    rpc_url: str
+    swap_topic: bytes
+    swap_abi: dict  # decoded through decoder_registry plans
+
+
+CHAIN_RPC_URLS = {
+    "arbitrum": ARBITRUM_RPC_URL,
+    "base": BASE_RPC_URL,
+}
+
+DEX_REGISTRY: dict[tuple[str, str], DexSpec] = {
+    ("arbitrum", "uniswap_v3"): DexSpec(
+        ARBITRUM_RPC_URL, arbitrum_uniswap_v3.SWAP_TOPIC, arbitrum_uniswap_v3.SWAP_ABI),
+    ("arbitrum", "camelot"): DexSpec(
+        ARBITRUM_RPC_URL, arbitrum_camelot.SWAP_TOPIC, arbitrum_camelot.SWAP_ABI),
+    ("base", "uniswap_v3"): DexSpec(
+        BASE_RPC_URL, base_uniswap_v3.SWAP_TOPIC, base_uniswap_v3.SWAP_ABI),
+    ("base", "pancakeswap"): DexSpec(
+        BASE_RPC_URL, base_pancakeswap.SWAP_TOPIC, base_pancakeswap.SWAP_ABI),
+    ("base", "aerodrome"): DexSpec(
+        BASE_RPC_URL, base_aerodrome.SWAP_TOPIC, base_aerodrome.SWAP_ABI),
+}
+
+
+def get_dex_spec(chain: str, dex: str) -> DexSpec:
+    try:
+        return DEX_REGISTRY[(chain.lower(), dex.lower())]
+    except KeyError:
+        raise ValueError(f"Unsupported chain/DEX: {chain}/{dex}") from None
@@ -0,0 +1,110 @@
+"""
+ABI-free parsing of fixed-layout event payloads.
+
+Swap events have a static layout – N 32-byte words of data and the
+indexed addresses in topics[1:] – so the values can be sliced straight
+out of the payload instead of going through `get_event_data` per log.
+Layouts that do not match are reported back so callers can fall back to
+the ABI decoder for those logs only.
+"""
+from functools import lru_cache
+from typing import Iterable
+import logging
+
+from eth_hash.auto import keccak
+
+logger = logging.getLogger(__name__)
+
+WORD = 32
+_INT256_MIN = 1 << 255
+_UINT256 = 1 << 256
+
+
+def _as_bytes(value) -> bytes:
+    """Log data / topic as bytes; accepts bytes, HexBytes and (0x-)hex str."""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return bytes.fromhex(value[2:] if value[:2] in ("0x", "0X") else value)
+
+
+def to_signed(word: int) -> int:
+    """Two's-complement view of a 256-bit word (int256 and sign-extended intN)."""
+    return word - _UINT256 if word >= _INT256_MIN else word
+
+
+@lru_cache(maxsize=65_536)
+def topic_address(topic: bytes) -> str:
+    """
+    EIP-55 checksum address of an indexed-address topic.
+
+    Same result as `Web3.to_checksum_address`, without its input
+    validation layers; routers repeat, so results are cached too.
+    """
+    lower = topic[-20:].hex()
+    digest = keccak(lower.encode()).hex()
+    upper = lower.upper()
+    return "0x" + "".join([u if h > "7" else c for c, u, h in zip(lower, upper, digest)])
+
+
+def parse_words(
+    logs: Iterable[dict],
+    n_words: int,
+    n_topics: int,
+) -> tuple[list[tuple[int, ...] | None], list[tuple[bytes, ...] | None]]:
+    """
+    Slice `n_words` unsigned data words and the raw topics of every log.
+
+    Returns two lists parallel to `logs`; an entry is None when the log
+    does not have exactly `n_words` words of data and `n_topics` topics.
+    """
+    size = n_words * WORD
+    offsets = range(0, size, WORD)
+    words, topics = [], []
+    from_bytes = int.from_bytes
+    for log in logs:
+        data = _as_bytes(log["data"])
+        raw_topics = log["topics"]
+        if len(data) != size or len(raw_topics) != n_topics:
+            words.append(None)
+            topics.append(None)
+            continue
+        words.append(tuple(from_bytes(data[i:i + WORD], "big") for i in offsets))
+        topics.append(tuple(_as_bytes(t) for t in raw_topics))
+    return words, topics
+
+
+@lru_cache(maxsize=1)
+def _abi_codec():
+    # web3 import + codec construction once per process, not per chunk
+    from web3 import Web3
+    from web3._utils.events import get_event_data
+    return Web3().codec, get_event_data
+
+
+def decode_args_abi(logs: list, abi: dict) -> list[dict]:
+    """Reference path: `get_event_data` per log."""
+    codec, get_event_data = _abi_codec()
+    return [get_event_data(codec, abi, log)["args"] for log in logs]
+
+
+def fill_from_abi(logs: list, abi: dict, args_list: list[dict | None], label: str) -> list[dict]:
+    """
+    Complete fast-path `args_list` with the ABI decoder.
+
+    The first fast-decoded log is cross-checked against `abi`; if they
+    disagree (the chunk is not the event the fast path assumes) the whole
+    chunk is ABI-decoded.  Otherwise only the None entries are.
+    """
+    first = next((i for i, args in enumerate(args_list) if args is not None), None)
+    if first is not None:
+        reference = decode_args_abi([logs[first]], abi)[0]
+        if any(reference.get(key) != value for key, value in args_list[first].items()):
+            logger.error(f"Fast {label} decode disagrees with the ABI, decoding {len(logs)} logs via ABI")
+            args_list = [None] * len(logs)
+    odd = [i for i, args in enumerate(args_list) if args is None]
+    if odd:
+        if len(odd) < len(logs):
+            logger.warning(f"{len(odd)} of {len(logs)} logs not in {label} Swap layout, decoding via ABI")
+        for i, args in zip(odd, decode_args_abi([logs[i] for i in odd], abi)):
+            args_list[i] = args
+    return args_list
@@ -0,0 +1,132 @@
+from bisect import bisect_left
+from typing import Iterable
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.sources.dex_data_pipeline.config.settings import BLOCK_INDEX_SAFE_SECONDS
+from app.storage.models.block_time_index import block_time_index_table
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BlockTimeIndex:
+    """
+    Sorted block → timestamp checkpoints for a single chain.
+
+    Every block timestamp the `BlockClient` fetches is recorded here, so the
+    next search for a timestamp starts from a tight [lower, upper] bracket
+    instead of bisecting from genesis.  New points are kept in `_pending`
+    until `flush()` writes them to the *block_time_index* table (schema.sql)
+    – only once they are `safe_seconds` older than the chain head, since
+    blocks near the head can still be reorged.
+    """
+
+    def __init__(self, chain: str, points: Iterable[tuple[int, int]] = (),
+                 safe_seconds: int = BLOCK_INDEX_SAFE_SECONDS):
+        self.chain = chain
+        self.safe_seconds = safe_seconds
+        self.head: tuple[int, int] | None = None
+        self._blocks: list[int] = []
+        self._timestamps: list[int] = []
+        self._pending: dict[int, int] = {}
+        for block, ts in sorted(points):
+            self._insert(block, ts)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def _insert(self, block: int, ts: int) -> bool:
+        i = bisect_left(self._blocks, block)
+        if i < len(self._blocks) and self._blocks[i] == block:
+            return False
+        self._blocks.insert(i, block)
+        self._timestamps.insert(i, ts)
+        return True
+
+    def add(self, block: int, ts: int) -> None:
+        """Record a fetched (block, timestamp) pair."""
+        if self._insert(block, ts):
+            self._pending[block] = ts
+
+    def add_head(self, block: int, ts: int) -> None:
+        """Record the chain head – usable now, persisted only once it is `safe_seconds` deep."""
+        self.add(block, ts)
+        if self.head is None or block > self.head[0]:
+            self.head = (block, ts)
+
+    def get(self, block: int) -> int | None:
+        i = bisect_left(self._blocks, block)
+        if i < len(self._blocks) and self._blocks[i] == block:
+            return self._timestamps[i]
+        return None
+
+    def bracket(self, target_ts: int) -> tuple[tuple[int, int] | None, tuple[int, int] | None]:
+        """
+        Return the known checkpoints around `target_ts`:
+
+        • lower – the last (block, ts) with ts <  target_ts, or None
+        • upper – the first (block, ts) with ts >= target_ts, or None
+
+        The first block whose timestamp reaches `target_ts` therefore lies in
+        (lower.block, upper.block].
+        """
+        i = bisect_left(self._timestamps, target_ts)
+        lower = (self._blocks[i - 1], self._timestamps[i - 1]) if i > 0 else None
+        upper = (self._blocks[i], self._timestamps[i]) if i < len(self._blocks) else None
+        return lower, upper
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    @classmethod
+    def load(cls, db: Session, chain: str, from_ts: int | None = None,
+             to_ts: int | None = None) -> "BlockTimeIndex":
+        """
+        Load `chain`'s stored checkpoints with from_ts <= timestamp <= to_ts
+        (open ends when None), plus the nearest checkpoint outside each end
+        so searches at the window's edges still start from a bracket.
+        """
+        t = block_time_index_table
+        columns = select(t.c.block_number, t.c.timestamp).where(t.c.chain == chain)
+        window = columns
+        if from_ts is not None:
+            window = window.where(t.c.timestamp >= from_ts)
+        if to_ts is not None:
+            window = window.where(t.c.timestamp <= to_ts)
+        rows = list(db.execute(window).all())
+        if from_ts is not None:
+            below = columns.where(t.c.timestamp < from_ts).order_by(t.c.block_number.desc()).limit(1)
+            rows += db.execute(below).all()
+        if to_ts is not None:
+            above = columns.where(t.c.timestamp > to_ts).order_by(t.c.block_number).limit(1)
+            rows += db.execute(above).all()
+        logger.info(f"Loaded {len(rows)} block-time checkpoints for {chain}")
+        return cls(chain, ((r.block_number, r.timestamp) for r in rows))
+
+    def flush(self, db: Session) -> int:
+        """
+        Persist checkpoints added since the last flush that lie at least
+        `safe_seconds` below the head (the newest known checkpoint when no
+        head was seen); younger ones stay pending.  Caller commits.
+        """
+        if not self._pending:
+            return 0
+        head_ts = self.head[1] if self.head is not None else self._timestamps[-1]
+        cutoff = head_ts - self.safe_seconds
+        rows = [
+            {"chain": self.chain, "block_number": b, "timestamp": ts}
+            for b, ts in self._pending.items()
+            if ts <= cutoff
+        ]
+        if not rows:
+            return 0
+        stmt = (
+            pg_insert(block_time_index_table).values(rows)
+            .on_conflict_do_nothing(index_elements=["chain", "block_number"])
+        )
+        db.execute(stmt)
+        for row in rows:
+            del self._pending[row["block_number"]]
+        logger.info(f"Persisted {len(rows)} new block-time checkpoints for {self.chain}")
+        return len(rows)
@@ -10,24 +10,154 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 import logging
 import requests
-from app.sources.dex_data_pipeline.config.settings import ARBITRUM_RPC_URL
+import math
+from bisect import bisect_right
+import numpy as np
+from redis import Redis
+from app.sources.dex_data_pipeline.config.settings import (
+    ARBITRUM_RPC_URL,
+    COVERAGE_SEED_MAX_EMPTY_MINUTES,
+    REDIS_URL,
+)
+from app.sources.dex_data_pipeline.evm.utils.block_index import BlockTimeIndex
+from app.sources.dex_data_pipeline.evm.utils.coverage import IntervalSet
+from app.utils.layered_cache import LayeredCache
 logger = logging.getLogger(__name__)
 
+SEARCH_MODES = ("bisect", "interpolate", "batched")
+
+
+def post_block_timestamp_batch(rpc_url: str, block_numbers: list[int], timeout: int = 10) -> dict[int, int]:
+    """
+    Fetch the timestamps of `block_numbers` with ONE JSON-RPC batch of
+    eth_getBlockByNumber calls (Web3 has no batch helper).  Blocks the node
+    answered with `null` are simply absent from the result; transport errors
+    propagate to the caller.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "method": "eth_getBlockByNumber",
+        "params": [hex(b), False], "id": i}
+        for i, b in enumerate(block_numbers)
+    ]
+    r = requests.post(rpc_url, json=payload, timeout=timeout)
+    r.raise_for_status()
+    return {
+        int(item["result"]["number"], 16): int(item["result"]["timestamp"], 16)
+        for item in r.json()
+        if item.get("result")
+    }
+
 class BlockClient:
-    def __init__(self, w3: Web3):
+    def __init__(
+        self,
+        w3: Web3,
+        index: BlockTimeIndex | None = None,
+        search_mode: str = "bisect",
+        block_time: float | None = None,
+        rpc_url: str | None = None,
+        probes_per_round: int = 32,
+    ):
+        """
+        search_mode : "bisect" (halve the interval each step), "interpolate"
+            (seed from the head's timestamp and `block_time`, then secant
+            steps with a bisection fallback) or "batched" (k-ary search, one
+            JSON-RPC batch of `probes_per_round` blocks per round trip).
+            See settings.BLOCK_SEARCH_MODE.
+        block_time : average seconds per block, required for "interpolate"
+            and used by "batched" to centre its first round.
+        rpc_url : HTTP endpoint for "batched" probe rounds.
+        """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown block search mode: {search_mode}")
+        if search_mode == "interpolate" and not block_time:
+            raise ValueError("Interpolation search needs an estimated block_time")
+        if search_mode == "batched" and not rpc_url:
+            raise ValueError("Batched search needs an rpc_url")
         self.w3 = w3
+        self.index = index
+        self.search_mode = search_mode
+        self.block_time = block_time
+        self.rpc_url = rpc_url
+        self.probes_per_round = max(2, probes_per_round)
+        self.rpc_calls = 0    # JSON-RPC calls made by this client
+        self.round_trips = 0  # HTTP requests (a batch counts once)
+        self._head: tuple[int, int] | None = None
 
     def get_latest_block(self) -> int:
-        return self.w3.eth.block_number
+        # One RPC that also yields the head's timestamp – a free checkpoint.
+        self.rpc_calls += 1
+        self.round_trips += 1
+        head = self.w3.eth.get_block("latest")
+        self._head = (head["number"], head["timestamp"])
+        if self.index is not None:
+            self.index.add_head(*self._head)
+        return head["number"]
 
     def get_block_timestamp(self, block_number: int) -> int:
-        return self.w3.eth.get_block(block_number).timestamp
+        if self._head is not None and block_number == self._head[0]:
+            return self._head[1]
+        if self.index is not None and (ts := self.index.get(block_number)) is not None:
+            return ts
+        self.rpc_calls += 1
+        self.round_trips += 1
+        ts = self.w3.eth.get_block(block_number).timestamp
+        if self.index is not None:
+            self.index.add(block_number, ts)
+        return ts
+
+    def get_block_timestamps(self, block_numbers: list[int]) -> dict[int, int]:
+        """Timestamps for many blocks in a single batched round trip."""
+        out: dict[int, int] = {}
+        missing = []
+        for b in block_numbers:
+            if self._head is not None and b == self._head[0]:
+                out[b] = self._head[1]
+            elif self.index is not None and (ts := self.index.get(b)) is not None:
+                out[b] = ts
+            else:
+                missing.append(b)
+        if missing:
+            self.rpc_calls += len(missing)
+            self.round_trips += 1
+            fetched = post_block_timestamp_batch(self.rpc_url, missing)
+            if self.index is not None:
+                for b, ts in fetched.items():
+                    self.index.add(b, ts)
+            out.update(fetched)
+            # Null replies (node lag, pruning) fall back to one-off calls.
+            for b in missing:
+                if b not in out:
+                    out[b] = self.get_block_timestamp(b)
+        return out
+
+    def _narrow(self, target_ts: int, start_block: int, end_block: int | None):
+        """(start_block, end_block, lower, upper) tightened to the indexed checkpoints straddling target_ts."""
+        if end_block is None:
+            end_block = self.get_latest_block()
+        lower = upper = None
+        if self.index is not None:
+            lower, upper = self.index.bracket(target_ts)
+            if lower is not None and lower[0] >= start_block:
+                start_block = lower[0] + 1
+            else:
+                lower = None
+            if upper is not None and upper[0] <= end_block:
+                end_block = upper[0]
+            else:
+                upper = None
+        return start_block, end_block, lower, upper
 
     def find_block_by_timestamp(self, target_ts: int, start_block: int = 0, end_block: int = None) -> int:
         logger.info(f"Finding block for timestamp {target_ts} (start={start_block}, end={end_block})")
-        if end_block is None:
-            end_block = self.get_latest_block()
-        logger.info(f"Searching in blocks {start_block} to {end_block}")
+        # Narrow the search to the checkpoints that straddle target_ts.
+        start_block, end_block, lower, upper = self._narrow(target_ts, start_block, end_block)
+        logger.info(f"Searching in blocks {start_block} to {end_block} ({self.search_mode})")
+        if self.search_mode == "interpolate":
+            return self._interpolation_search(target_ts, start_block, end_block, lower, upper)
+        if self.search_mode == "batched":
+            return self._batched_search(target_ts, start_block, end_block, lower, upper)
+
+        mid_ts = None
         while start_block <= end_block:
             mid = (start_block + end_block) // 2
             mid_ts = self.get_block_timestamp(mid)
@@ -42,19 +172,231 @@ class BlockClient:
         logger.info(f"Block for timestamp {target_ts} not found, returning start_block {start_block}")
         return start_block
 
+    def find_first_block_at_or_after(self, target_ts: int) -> int:
+        """
+        First block whose timestamp is >= target_ts (latest + 1 if none).
+        `find_block_by_timestamp` in "bisect" mode returns whichever block
+        of the target second it hits first; on chains with several blocks
+        per second that can be a later one.  This lower-bound bisection is
+        exact in every mode.
+        """
+        if self.search_mode != "bisect":
+            return self.find_block_by_timestamp(target_ts)
+        start_block, end_block, _, upper = self._narrow(target_ts, 0, None)
+        lo, hi = start_block, end_block if upper is not None else end_block + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_block_timestamp(mid) < target_ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _interpolation_search(
+        self,
+        target_ts: int,
+        start_block: int,
+        end_block: int,
+        lo: tuple[int, int] | None = None,
+        hi: tuple[int, int] | None = None,
+    ) -> int:
+        """
+        First block in [start_block, end_block] whose timestamp is >= target_ts
+        (end_block + 1 if none).  `lo` / `hi` are optional known (block, ts)
+        points just before / at the end of that interval.
+
+        1. While only `hi` is known, extrapolate down from it with the
+           estimated (then locally observed) block time; the overshoot pad
+           doubles on every probe that is still too late.
+        2. Secant steps inside the bracket.  When two probes in a row land on
+           the same side, step one second across; a third miss, or a bracket
+           only a couple of seconds wide, falls back to bisection.
+        """
+        if hi is None:
+            hi = (end_block, self.get_block_timestamp(end_block))
+            if hi[1] < target_ts:
+                return end_block + 1
+        if hi[0] <= start_block:
+            return hi[0]
+
+        rate = self.block_time                       # seconds per block
+        step = max(1, math.ceil(1 / rate))           # ~one second of blocks
+
+        pad = 0
+        while lo is None:
+            probe = hi[0] - math.ceil((hi[1] - target_ts) / rate) - pad
+            if probe <= start_block:
+                ts = self.get_block_timestamp(start_block)
+                if ts >= target_ts:
+                    return start_block
+                lo = (start_block, ts)
+                break
+            ts = self.get_block_timestamp(probe)
+            if ts < target_ts:
+                lo = (probe, ts)
+            else:
+                if ts < hi[1]:
+                    rate = (hi[1] - ts) / (hi[0] - probe)
+                hi = (probe, ts)
+                pad = max(2 * pad, step)
+
+        repeats = 0          # consecutive probes landing on the same side
+        last_below = None
+        while hi[0] - lo[0] > 1:
+            span = hi[0] - lo[0]
+            if span <= 2 * step or repeats >= 2:
+                probe = lo[0] + span // 2
+            elif repeats == 1:
+                # The estimate undershot/overshot twice: step just across.
+                probe = lo[0] + step if last_below else hi[0] - step
+            else:
+                probe = self._secant(target_ts, lo, hi)
+            probe = min(max(probe, lo[0] + 1), hi[0] - 1)
+            ts = self.get_block_timestamp(probe)
+            below = ts < target_ts
+            if below:
+                lo = (probe, ts)
+            else:
+                hi = (probe, ts)
+            repeats = repeats + 1 if below == last_below else 0
+            last_below = below
+        return hi[0]
+
+    def _batched_search(
+        self,
+        target_ts: int,
+        start_block: int,
+        end_block: int,
+        lo: tuple[int, int] | None = None,
+        hi: tuple[int, int] | None = None,
+    ) -> int:
+        """
+        k-ary search: every round fetches `probes_per_round` blocks spread
+        over the open bracket (lo, hi] in one JSON-RPC batch and keeps the
+        sub-interval that straddles target_ts.  Same result as
+        `_interpolation_search` (first block with ts >= target_ts).
+
+        With a `block_time` the first round is a geometric fan centred on the
+        extrapolated block, so a good estimate leaves a bracket of a few
+        hundred blocks after one round trip; later rounds are evenly spaced.
+        """
+        if hi is None:
+            hi = (end_block, self.get_block_timestamp(end_block))
+            if hi[1] < target_ts:
+                return end_block + 1
+        lo_block = lo[0] if lo is not None else start_block - 1
+        hi_block = hi[0]
+        k = self.probes_per_round
+
+        first_round = True
+        while hi_block - lo_block > 1:
+            if first_round and self.block_time:
+                guess = hi_block - math.ceil((hi[1] - target_ts) / self.block_time)
+                probes = self._fan_probes(guess, lo_block, hi_block, k)
+            else:
+                span = hi_block - lo_block
+                probes = sorted({lo_block + (span * i) // (k + 1) for i in range(1, k + 1)})
+                probes = [b for b in probes if lo_block < b < hi_block]
+            first_round = False
+            if not probes:
+                break
+            ts_map = self.get_block_timestamps(probes)
+            for b in probes:
+                if ts_map[b] < target_ts:
+                    lo_block = b
+                else:
+                    hi_block = b
+                    break
+        return hi_block
+
+    @staticmethod
+    def _fan_probes(center: int, lo_block: int, hi_block: int, k: int) -> list[int]:
+        """Up to k probes around `center`, spacing growing geometrically outwards."""
+        center = min(max(center, lo_block + 1), hi_block - 1)
+        reach = max(center - lo_block, hi_block - center, 2)
+        per_side = max(1, (k - 1) // 2)
+        ratio = reach ** (1 / per_side)
+        probes = {center}
+        for i in range(1, per_side + 1):
+            offset = math.ceil(ratio ** i)
+            probes.add(center - offset)
+            probes.add(center + offset)
+        return sorted(b for b in probes if lo_block < b < hi_block)
+
+    @staticmethod
+    def _secant(target_ts: int, lo: tuple[int, int], hi: tuple[int, int]) -> int:
+        # Integer timestamps floor the real block time, so aim for the middle
+        # of the target second to land near the first block that reaches it.
+        frac = (target_ts - lo[1] - 0.5) / (hi[1] - lo[1])
+        return lo[0] + int(frac * (hi[0] - lo[0]))
+
     def walk_block_ranges(self, start: int, end: int, step: int = 1000):
-        for i in range(start, end, step):
+        # `end` is inclusive – single-block holes must still be crawled
+        for i in range(start, end + 1, step):
             yield i, min(i + step - 1, end)
 
+    def seed_coverage(self, db: Session, table_name: str, from_ts: int, coverage: IntervalSet) -> None:
+        """
+        Add to `coverage` the blocks of every run of kline minutes at or
+        after `from_ts`.  Runs separated by at most
+        COVERAGE_SEED_MAX_EMPTY_MINUTES minutes without a row are one run
+        (a quiet pool's empty minutes); a longer gap may be a hole, so it
+        stays uncovered.  Run edges are exact first blocks of their second,
+        so no block of an aggregated minute is crawled – and counted – twice.
+        """
+        rows = db.execute(
+            text(f"""
+                SELECT DISTINCT EXTRACT(EPOCH FROM minute_start) AS ts
+                FROM {table_name}
+                WHERE minute_start >= to_timestamp(:from_ts)
+                ORDER BY ts
+            """),
+            {"from_ts": from_ts},
+        ).all()
+        max_step = 60 * (COVERAGE_SEED_MAX_EMPTY_MINUTES + 1)
+        runs = []
+        for minute in (int(r.ts) for r in rows):
+            if runs and minute - runs[-1][1] <= max_step:
+                runs[-1][1] = minute
+            else:
+                runs.append([minute, minute])
+        for first, last in runs:
+            # blocks from the run's first second up to the next minute's first block
+            lo = self.find_first_block_at_or_after(first)
+            hi = self.find_first_block_at_or_after(last + 60) - 1
+            if lo <= hi:
+                coverage.add(lo, hi)
+        logger.info(f"Seeded coverage of {table_name} from {len(runs)} kline minute runs")
+
     def compute_missing_block_ranges(
         self,
         db: Session,
         table_name: str,
-        days_back: int
+        days_back: int,
+        coverage: IntervalSet | None = None,
     ) -> list[tuple[int, int]]:
+        """
+        Block intervals still to crawl for the last `days_back` days.
+
+        With a non-empty coverage ledger the answer is exact: every hole
+        in [block at now - days_back, latest] that was never committed.
+        Otherwise fall back to the MIN/MAX(minute_start) of the kline table
+        and, if a `coverage` set was passed, seed it with the block ranges
+        of the kline table's contiguous minute runs (see `seed_coverage`) so
+        the next run can use the ledger.
+        """
         if not re.fullmatch(r"[A-Za-z0-9_]+", table_name):
             raise ValueError(f"Unsafe table name: {table_name}")
 
+        want_start_ts = int((datetime.utcnow() - timedelta(days=days_back)).timestamp())
+        if coverage:
+            want_start_block = self.find_block_by_timestamp(want_start_ts)
+            latest_block = self.get_latest_block()
+            gaps = coverage.missing(want_start_block, latest_block)
+            logger.info(f"Coverage ledger for {table_name}: {len(coverage)} intervals, "
+                        f"{len(gaps)} holes in {want_start_block}…{latest_block}")
+            return gaps
+
         row = db.execute(
             text(f"""
                 SELECT
@@ -66,7 +408,6 @@ class BlockClient:
         have_min_ts = int(row.min_ts) if row.min_ts is not None else None
         have_max_ts = int(row.max_ts) if row.max_ts is not None else None
 
-        want_start_ts = int((datetime.utcnow() - timedelta(days=days_back)).timestamp())
         latest_block = self.get_latest_block()
         gaps = []
         logger.info(f"Checking gaps in {table_name} for {days_back} days back, "
@@ -88,23 +429,131 @@ class BlockClient:
                 latest_block
             ))
 
+        if coverage is not None:
+            self.seed_coverage(db, table_name, want_start_ts, coverage)
         return gaps
     
 from web3 import Web3
 from typing import List, Dict
 
+
+def block_timestamp_cache(chain: str, maxsize: int = 500_000) -> LayeredCache:
+    """
+    Shared block → timestamp cache for `chain`.  Block timestamps never
+    change, so Redis entries are kept without a TTL.
+    """
+    return LayeredCache(f"blockts:{chain}", redis=Redis.from_url(REDIS_URL), maxsize=maxsize)
+
+
 class BlockTimestampResolver:
-    def __init__(self, w3: Web3, num_chunks: int = 5, rpc_url: str = ARBITRUM_RPC_URL):
+    """
+    Stamps logs with block timestamps.
+
+    Default mode interpolates linearly between a few checkpoint blocks per
+    batch.  With `exact=True` the real timestamp of every distinct block is
+    fetched instead (chunked JSON-RPC batches), looked up first in `cache`
+    so a block is fetched once across ranges, pools and workers.
+    """
+    def __init__(
+        self,
+        w3: Web3,
+        num_chunks: int = 5,
+        rpc_url: str = ARBITRUM_RPC_URL,
+        exact: bool = False,
+        cache: LayeredCache | None = None,
+        rpc_batch_size: int = 100,
+    ):
         self.w3 = w3
-        self.ranges = []  # Stores (start_block, end_block, start_ts, slope)
+        # (start_block, end_block, start_ts, slope) – sorted by start_block and
+        # non-overlapping, so a block maps to at most one segment
+        self.ranges = []
+        self._starts = []      # parallel list of start_block for bisect
+        self._arrays = None    # cached NumPy columns of `ranges`
         self.num_chunks = num_chunks
         self.rpc_url = rpc_url
+        self.exact = exact
+        self.cache = cache if cache is not None else LayeredCache("blockts")
+        self.rpc_batch_size = rpc_batch_size
+
+        # cumulative RPC accounting + stats of the last assign_timestamps()
+        self.rpc_calls = 0
+        self.round_trips = 0
+        self.last_stats: dict = {}
+
+    # ------------------------------------------------------------------
+    # Segment store
+    # ------------------------------------------------------------------
+    def _segment_index(self, block_number: int) -> int | None:
+        i = bisect_right(self._starts, block_number) - 1
+        if i >= 0 and block_number <= self.ranges[i][1]:
+            return i
+        return None
+
+    def covers(self, start_block: int, end_block: int) -> bool:
+        """True if every block in [start_block, end_block] lies in some segment."""
+        i = self._segment_index(start_block)
+        if i is None:
+            return False
+        reach = self.ranges[i][1]
+        while reach < end_block:
+            i += 1
+            # the next segment must pick up where this one ends (or right after)
+            if i == len(self.ranges) or self.ranges[i][0] > reach + 1:
+                return False
+            reach = self.ranges[i][1]
+        return True
+
+    def add_segments(self, segments: List[Tuple[int, int, float, float]]) -> None:
+        """
+        Insert a contiguous, sorted run of segments spanning [S, E].
+
+        Existing segments overlapping [S, E] are trimmed to the part outside
+        it (a segment straddling the whole span is split in two), so the
+        freshly fetched checkpoints win and `ranges` stays non-overlapping.
+        """
+        if not segments:
+            return
+        span_start, span_end = segments[0][0], segments[-1][1]
+
+        # segments starting at or before span_end …
+        j = bisect_right(self._starts, span_end)
+        # … and ending after span_start overlap the new span
+        i = j
+        while i > 0 and self.ranges[i - 1][1] > span_start:
+            i -= 1
+
+        head, tail = [], []
+        if i < j:
+            s, _, t0, slope = self.ranges[i]
+            if s < span_start:
+                head.append((s, span_start, t0, slope))
+            s, e, t0, slope = self.ranges[j - 1]
+            if e > span_end:
+                tail.append((span_end + 1, e, t0 + (span_end + 1 - s) * slope, slope))
+        merged = head + list(segments) + tail
+
+        self.ranges[i:j] = merged
+        self._starts[i:j] = [seg[0] for seg in merged]
+        self._arrays = None
+
+    def _segment_arrays(self):
+        if self._arrays is None:
+            starts, ends, ts_start, slopes = zip(*self.ranges)
+            self._arrays = (
+                np.asarray(starts, dtype=np.int64),
+                np.asarray(ends, dtype=np.int64),
+                np.asarray(ts_start, dtype=np.float64),
+                np.asarray(slopes, dtype=np.float64),
+            )
+        return self._arrays
 
     def _get_single_block_ts(self, block: int) -> int | None:
         """
         Fallback for a *single* block using the Web3 client already wired into
         this resolver.  Returns unix timestamp or None if the call fails.
         """
+        self.rpc_calls += 1
+        self.round_trips += 1
         try:
             blk = self.w3.eth.get_block(block, full_transactions=False)
             return blk["timestamp"]
@@ -131,25 +580,14 @@ class BlockTimestampResolver:
         sorted_anchors = sorted(anchors)
 
         # Batched JSON-RPC (still via requests – Web3 has no batch helper) ─
-        payload = [
-            {"jsonrpc": "2.0", "method": "eth_getBlockByNumber",
-            "params": [hex(b), False], "id": i}
-            for i, b in enumerate(sorted_anchors)
-        ]
+        self.rpc_calls += len(sorted_anchors)
+        self.round_trips += 1
         try:
-            r = requests.post(self.rpc_url, json=payload, timeout=10)
-            r.raise_for_status()
-            batch_res = r.json()
+            ts_map = post_block_timestamp_batch(self.rpc_url, sorted_anchors)
         except Exception as exc:
             logger.error(f"batch RPC ({len(sorted_anchors)} blocks) failed: {exc}")
             return {}
 
-        ts_map: dict[int, int] = {
-            int(item["result"]["number"], 16): int(item["result"]["timestamp"], 16)
-            for item in batch_res
-            if item.get("result")
-        }
-
         # 2️⃣  Single-block rescue (Web3) ───────────────────────────────────────
         start_blk, end_blk = min(block_numbers), max(block_numbers)
 
@@ -185,9 +623,8 @@ class BlockTimestampResolver:
         end_block   = max(block_nums)
 
         # Skip work if this whole span is already covered
-        for s, e, *_ in self.ranges:
-            if s <= start_block and end_block <= e:
-                return
+        if self.covers(start_block, end_block):
+            return
 
         # ------------------------------------------------------------------
         # 1. Pick checkpoint blocks (same logic as before).
@@ -212,27 +649,105 @@ class BlockTimestampResolver:
             )
 
         # 5. Create segments only between **consecutive** good checkpoints
+        segments = []
         for b0, b1 in zip(avail, avail[1:]):
             t0, t1 = block_ts_map[b0], block_ts_map[b1]
             slope  = (t1 - t0) / (b1 - b0) if b1 != b0 else 0.0
-            self.ranges.append((b0, b1, t0, slope))
+            segments.append((b0, b1, t0, slope))
+        self.add_segments(segments)
 
     def estimate_timestamp(self, block_number: int) -> int:
-        for start, end, ts_start, slope in self.ranges:
-            if start <= block_number <= end:
-                return int(ts_start + (block_number - start) * slope)
-        logger.info(f"Estimating timestamp for block {self.ranges}")
-        raise ValueError(f"Block {block_number} not in any cached range")
+        i = self._segment_index(block_number)
+        if i is None:
+            raise ValueError(f"Block {block_number} not in any cached range")
+        start, _, ts_start, slope = self.ranges[i]
+        return int(ts_start + (block_number - start) * slope)
+
+    def estimate_timestamps(self, block_numbers: np.ndarray) -> np.ndarray:
+        """
+        Vectorised `estimate_timestamp`: one `searchsorted` over the segment
+        starts plus the same float interpolation, truncated to int64.
+        """
+        block_numbers = np.asarray(block_numbers, dtype=np.int64)
+        if not self.ranges:
+            if block_numbers.size:
+                raise ValueError(f"Block {int(block_numbers[0])} not in any cached range")
+            return np.empty(0, dtype=np.int64)
+
+        starts, ends, ts_start, slopes = self._segment_arrays()
+        idx = np.searchsorted(starts, block_numbers, side="right") - 1
+        safe = np.maximum(idx, 0)
+        missing = (idx < 0) | (block_numbers > ends[safe])
+        if missing.any():
+            raise ValueError(f"Block {int(block_numbers[missing][0])} not in any cached range")
+
+        offsets = (block_numbers - starts[safe]).astype(np.float64)
+        return (ts_start[safe] + offsets * slopes[safe]).astype(np.int64)
+
+    def fetch_exact_timestamps(self, block_numbers: List[int]) -> Dict[int, int]:
+        """
+        Real timestamps for `block_numbers`: cache first, then chunked
+        JSON-RPC batches for the rest, then one-off Web3 calls for blocks a
+        batch answered with `null`.  Raises ValueError if a block stays
+        unresolved.
+        """
+        ts_map = self.cache.get_many(block_numbers)
+        missing = [b for b in block_numbers if b not in ts_map]
+
+        fetched: Dict[int, int] = {}
+        for i in range(0, len(missing), self.rpc_batch_size):
+            batch = missing[i:i + self.rpc_batch_size]
+            self.rpc_calls += len(batch)
+            self.round_trips += 1
+            try:
+                fetched.update(post_block_timestamp_batch(self.rpc_url, batch))
+            except Exception as exc:
+                logger.error(f"batch RPC ({len(batch)} blocks) failed: {exc}")
+
+        for b in missing:
+            if b not in fetched:
+                if (ts := self._get_single_block_ts(b)) is None:
+                    raise ValueError(f"Cannot resolve timestamp for block {b}")
+                fetched[b] = ts
+
+        self.cache.set_many(fetched)
+        ts_map.update(fetched)
+        return ts_map
 
     def assign_timestamps(self, logs: List[Dict]) -> Dict[int, int]:
-        self.build_from_logs(logs)  # build range once
-        cache = {}
-        for log in logs:
-            block_num = log["blockNumber"]
-            log["timestamp"] = self.estimate_timestamp(block_num)
-            cache[str(block_num)] = log["timestamp"]
-        return cache
+        """
+        Set `log["timestamp"]` on every log in place – decode tasks read it
+        from there – and return the {block: timestamp} map of the batch.
+        """
+        rpc_before, trips_before = self.rpc_calls, self.round_trips
+        if not logs:
+            self.last_stats = {"blocks": 0, "cache_hits": 0, "rpc_calls": 0, "round_trips": 0}
+            return {}
 
+        if self.exact:
+            blocks = sorted({log["blockNumber"] for log in logs})
+            hits_before = self.cache.local_hits + self.cache.shared_hits
+            ts_map = self.fetch_exact_timestamps(blocks)
+            for log in logs:
+                log["timestamp"] = ts_map[log["blockNumber"]]
+            block_ts = {b: ts_map[b] for b in blocks}
+            cache_hits = self.cache.local_hits + self.cache.shared_hits - hits_before
+        else:
+            self.build_from_logs(logs)  # build range once
+            block_nums = np.fromiter((log["blockNumber"] for log in logs), dtype=np.int64, count=len(logs))
+            timestamps = self.estimate_timestamps(block_nums).tolist()
+            for log, ts in zip(logs, timestamps):
+                log["timestamp"] = ts
+            block_ts = dict(zip(block_nums.tolist(), timestamps))
+            cache_hits = None  # interpolated – no per-block cache involved
+
+        self.last_stats = {
+            "blocks": len(block_ts),
+            "cache_hits": cache_hits,
+            "rpc_calls": self.rpc_calls - rpc_before,
+            "round_trips": self.round_trips - trips_before,
+        }
+        return block_ts
 
 
 
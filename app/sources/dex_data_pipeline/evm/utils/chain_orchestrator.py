@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
+
+from app.sources.dex_data_pipeline.config.settings import (
+    CHORD_MAX_IN_FLIGHT_PER_CHAIN,
+    LOGS_PER_CALL_TARGET,
+    RPC_CALLS_PER_SECOND,
+)
+from app.sources.dex_data_pipeline.evm.registry import CHAIN_RPC_URLS, get_dex_spec
+from app.sources.dex_data_pipeline.evm.utils.chord_throttle import chord_throttle
+from app.sources.dex_data_pipeline.evm.utils.client import get_web3_client
+from app.sources.dex_data_pipeline.evm.utils.coverage import IntervalSet
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_key
+from app.sources.dex_data_pipeline.evm.utils.events import fetch_logs_raw
+from app.sources.dex_data_pipeline.evm.utils.log_demux import demux_logs, normalize_topic, route_range
+from app.sources.dex_data_pipeline.evm.utils.orchestrator import (
+    crawl_ranges,
+    dispatch_range,
+    find_pool_gaps,
+    finalize_pool,
+    log_fetch_stats,
+    make_planner,
+    make_timestamp_resolver,
+    open_block_client,
+    prepare_pool,
+    record_empty_ranges,
+    stamp_range,
+)
+from app.sources.dex_data_pipeline.evm.utils.prefetch import RateLimiter
+from app.sources.dex_data_pipeline.evm.utils.tx_senders import log_sender_stats, prefetch_shared_senders, sender_stats
+from app.sources.dex_data_pipeline.utils.find_quote_usd_prices import FillQuoteUSDPrices
+from app.storage.db import SessionLocal
+
+log = logging.getLogger(__name__)
+
+
+def run_chain_orchestration(
+        chain: str,
+        pools: list[tuple[str, str, str]],
+        days_back: int = 1,
+        step: int = 1000,
+        logs_per_call: int | None = None,
+        ) -> None:
+    """Crawl every given pool of one chain with a single eth_getLogs per range.
+
+    Parameters
+    ----------
+    chain : str
+        Chain all pools live on ("arbitrum", "base", …).
+    pools : list of (dex, pair, pool_address)
+        Active pools to ingest; each dex must be in DEX_REGISTRY.
+    days_back : int, default 1
+        How many days of history to backfill.
+    step : int, default 1_000
+        Initial number of blocks per crawl chunk; adapted to the combined
+        log density of all pools.
+    logs_per_call : int | None, default None
+        Target logs per eth_getLogs call (defaults to LOGS_PER_CALL_TARGET).
+
+    Each range is fetched once with the list of pool addresses and the
+    OR of their swap topics, stamped once, then demultiplexed by address
+    and dispatched per pool over the blocks that pool is still missing.
+    """
+    start_ts = time.time()
+    rpc_url = CHAIN_RPC_URLS[chain]
+    w3 = get_web3_client(rpc_url)
+    blockClient, block_index = open_block_client(w3, chain, rpc_url, days_back)
+
+    target_time = datetime.utcnow() - timedelta(days=days_back)
+    start_block = blockClient.find_block_by_timestamp(int(target_time.timestamp()))
+    end_block = blockClient.get_latest_block()
+
+    # ---------------------------------------------------------------------
+    # Inspect every pool; one bad pool must not stop the others.
+    # ---------------------------------------------------------------------
+    contexts, specs, decoder_keys, gaps_by_pool = {}, {}, {}, {}
+    for dex, pair, pool_address in pools:
+        try:
+            spec = get_dex_spec(chain, dex)
+            pool = prepare_pool(w3, chain, dex, pair, pool_address)
+            gaps = find_pool_gaps(blockClient, block_index, pool, days_back)
+        except Exception:
+            log.exception(f"[run_chain] Skipping {chain}/{dex} {pair} at {pool_address}")
+            continue
+        address = pool_address.lower()
+        contexts[address], specs[address] = pool, spec
+        decoder_keys[address] = plan_key(spec.swap_abi, pool.dec0, pool.dec1, pool.base_is_token1)
+        if gaps:
+            gaps_by_pool[address] = IntervalSet(gaps)
+    log.info(f"Block search used {blockClient.rpc_calls} RPCs in {blockClient.round_trips} round trips "
+             f"({len(block_index)} indexed checkpoints)")
+
+    if not gaps_by_pool:
+        log.info(f"[run_chain] {chain}: all {len(contexts)} pools up-to-date ✔")
+        return
+
+    with SessionLocal() as session:
+        filler = FillQuoteUSDPrices(session, "ETH", days_back=days_back)
+        asyncio.run(filler.fill_missing_prices())
+
+    ts_resolver = make_timestamp_resolver(w3, chain, rpc_url)
+
+    # Crawl the union of the gaps; each pool only takes its own share.
+    crawl = IntervalSet()
+    for gaps in gaps_by_pool.values():
+        for lo, hi in gaps:
+            crawl.add(lo, hi)
+
+    addresses = [contexts[address].address for address in gaps_by_pool]
+    topic_by_address = {address: specs[address].swap_topic for address in gaps_by_pool}
+    topics = sorted({normalize_topic(topic) for topic in topic_by_address.values()})
+    topic_filter = ["0x" + topics[0]] if len(topics) == 1 else [["0x" + topic for topic in topics]]
+    log.info(f"[run_chain] {chain}: crawling {list(crawl)} for {len(addresses)} pools "
+             f"({len(topics)} swap topics)")
+
+    planner = make_planner(chain, step, logs_per_call or LOGS_PER_CALL_TARGET)
+    limiter = RateLimiter(RPC_CALLS_PER_SECOND.get(chain, 8))
+    # One chain-wide chord cap (plus the global one in Redis): with a cap per
+    # pool, a single busy pool at its cap would block the shared fetch loop
+    # and so every other pool of the chain.
+    throttle = chord_throttle(chain, max_in_flight=CHORD_MAX_IN_FLIGHT_PER_CHAIN)
+
+    def fetch(lo: int, hi: int):
+        limiter.acquire()
+        return fetch_logs_raw(rpc_url, addresses, lo, hi, topic_filter)
+
+    logs_per_pool = dict.fromkeys(gaps_by_pool, 0)
+    stats_per_pool = {address: [] for address in gaps_by_pool}
+    empty_per_pool = {address: [] for address in gaps_by_pool}
+    failed_ranges = 0
+    total_logs = 0
+    crawled_ranges = 0
+    crawl_started = time.time()
+    senders_before = sender_stats()
+    shared_txs = 0
+
+    for gap_start, gap_end in crawl:
+        log.info(f"Processing gap from {gap_start} to {gap_end}")
+        for from_block, to_block, raw_logs in crawl_ranges(planner, gap_start, gap_end, fetch):
+            range_started = time.monotonic()
+            crawled_ranges += 1
+            if raw_logs is None:
+                # left out of every pool's ledger → retried on the next run
+                failed_ranges += 1
+                continue
+            logs_by_pool = demux_logs(raw_logs, topic_by_address)
+            kept = [log for pool_logs in logs_by_pool.values() for log in pool_logs]
+            total_logs += len(kept)
+            log.info(f"----Fetched {len(raw_logs)} logs from blocks {from_block} to {to_block} "
+                     f"for {len(logs_by_pool)} pools")
+
+            range_stat = stamp_range(ts_resolver, kept, from_block, to_block) if kept else None
+            # a multi-hop tx swapping in several of our pools: look its sender up once
+            shared_txs += prefetch_shared_senders(rpc_url, logs_by_pool)
+            for address, parts in route_range(logs_by_pool, gaps_by_pool, from_block, to_block).items():
+                pool = contexts[address]
+                for lo, hi, pool_logs in parts:
+                    if not pool_logs:
+                        empty_per_pool[address].append((lo, hi))
+                        continue
+                    logs_per_pool[address] += len(pool_logs)
+                    stats_per_pool[address].append({**range_stat, "from_block": lo, "to_block": hi})
+                    throttle.submit(
+                        lo, hi,
+                        lambda: dispatch_range(pool, pool_logs, decoder_keys[address], rpc_url, lo, hi),
+                        started=range_started,
+                    )
+
+    if failed_ranges:
+        log.warning(f"[run_chain] {failed_ranges} block ranges failed to fetch; left for the next run")
+    log_fetch_stats(planner, limiter, time.time() - crawl_started, crawled_ranges, total_logs)
+    log.info(f"[run_chain] {chain}: {planner.calls} eth_getLogs calls served {len(addresses)} pools "
+             f"(one crawl per pool would repeat every call per pool)")
+
+    throttle.drain()
+    throttle.log_summary()
+    log.info(f"[run_chain] {shared_txs} transactions swapped in more than one pool (sender fetched once)")
+    log_sender_stats(senders_before, sender_stats(), "run_chain")
+
+    duration = time.time() - start_ts
+    for address, pool in ((address, contexts[address]) for address in gaps_by_pool):
+        record_empty_ranges(pool, empty_per_pool[address])
+        try:
+            finalize_pool(pool, f"{start_block}-{end_block}", logs_per_pool[address], duration,
+                          stats_per_pool[address])
+        except Exception:
+            log.exception(f"[run_chain] Post-processing failed for {pool.table_name}")
+
+    log.info(f"[run_chain] Completed {chain} in {time.time() - start_ts:.2f}s, {total_logs} logs")
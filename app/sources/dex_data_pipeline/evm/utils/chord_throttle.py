@@ -0,0 +1,224 @@
+"""
+Backpressure for chord dispatch.
+
+`apply_async()` returns immediately, so a crawl can enqueue range chords
+far faster than the decode / enrich / aggregate workers drain them –
+Redis then holds every pending message and chord counter.  A
+ChordThrottle sits between the crawl loop and `dispatch_range`:
+
+* it keeps the AsyncResult of every chord it dispatched and blocks the
+  next dispatch while `max_in_flight` of its ranges are still running –
+  one throttle per pool, or one per chain for the chain crawler, whose
+  pools share a single fetch loop;
+* it holds a slot in a Redis sorted set shared by every orchestrator,
+  so all pools together stay under `global_max` chords.  Slots carry an
+  expiry score – a crashed orchestrator's slots free themselves after
+  CHORD_SLOT_TTL_SECONDS;
+* when a range's chord finishes it logs the range's end-to-end lag
+  (fetched → committed) and the broker queue depths (LLEN).
+
+Without Redis (`redis=None`, or Redis unreachable) only the per-pool cap
+applies.
+"""
+import logging
+import time
+import uuid
+from typing import Callable, NamedTuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.celery.celery_app import CELERY_BROKER_URL
+from app.sources.dex_data_pipeline.config.settings import (
+    CHORD_DRAIN_TIMEOUT_SECONDS,
+    CHORD_MAX_IN_FLIGHT_GLOBAL,
+    CHORD_MAX_IN_FLIGHT_PER_POOL,
+    CHORD_SLOT_TTL_SECONDS,
+    REDIS_URL,
+)
+
+log = logging.getLogger(__name__)
+
+GLOBAL_SLOTS_KEY = "chords:in_flight"
+# broker queues a range chord passes through (decode tasks use the default queue)
+PIPELINE_QUEUES = ("celery", "enrich", "aggregate")
+
+
+class InFlightRange(NamedTuple):
+    slot: str
+    result: object          # AsyncResult of the chord body
+    from_block: int
+    to_block: int
+    started: float          # when the range was fetched
+
+
+class ChordThrottle:
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int = CHORD_MAX_IN_FLIGHT_PER_POOL,
+        global_max: int | None = CHORD_MAX_IN_FLIGHT_GLOBAL,
+        redis: Redis | None = None,
+        broker: Redis | None = None,
+        slot_ttl: float = CHORD_SLOT_TTL_SECONDS,
+        poll_interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.global_max = global_max
+        self.redis = redis
+        self.broker = broker
+        self.slot_ttl = slot_ttl
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._sleep = sleep
+        self.in_flight: list[InFlightRange] = []
+        # stats
+        self.dispatched = 0
+        self.completed = 0
+        self.failed = 0
+        self.waited = 0.0
+        self.lags: list[float] = []
+        self.peak_in_flight = 0
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+    def submit(self, from_block: int, to_block: int, dispatch: Callable[[], object],
+               started: float | None = None) -> None:
+        """Wait for a free slot, then run `dispatch()` (→ AsyncResult) and track it."""
+        started = self._clock() if started is None else started
+        slot = self._acquire()
+        try:
+            result = dispatch()
+        except BaseException:
+            self._release_global(slot)
+            raise
+        self.in_flight.append(InFlightRange(slot, result, from_block, to_block, started))
+        self.dispatched += 1
+        self.peak_in_flight = max(self.peak_in_flight, len(self.in_flight))
+
+    def _acquire(self) -> str:
+        slot = f"{self.name}:{uuid.uuid4().hex[:12]}"
+        t0 = self._clock()
+        warned = False
+        while True:
+            self.poll()
+            if len(self.in_flight) < self.max_in_flight and self._acquire_global(slot):
+                break
+            if not warned:
+                log.info(f"[throttle] {self.name}: {len(self.in_flight)} ranges in flight "
+                         f"(cap {self.max_in_flight}/pool, {self.global_max}/all); waiting"
+                         f"{self._depth_info()}")
+                warned = True
+            self._sleep(self.poll_interval)
+        self.waited += self._clock() - t0
+        return slot
+
+    def _acquire_global(self, slot: str) -> bool:
+        if self.redis is None or self.global_max is None:
+            return True
+        now = time.time()
+        try:
+            pipe = self.redis.pipeline()
+            pipe.zremrangebyscore(GLOBAL_SLOTS_KEY, "-inf", now)
+            pipe.zadd(GLOBAL_SLOTS_KEY, {slot: now + self.slot_ttl})
+            pipe.zcard(GLOBAL_SLOTS_KEY)
+            _, _, taken = pipe.execute()
+            if taken <= self.global_max:
+                return True
+            self.redis.zrem(GLOBAL_SLOTS_KEY, slot)
+            return False
+        except RedisError as exc:
+            log.warning(f"[throttle] Redis unavailable for the global chord cap ({exc}); per-pool cap only")
+            self.redis = None
+            return True
+
+    def _release_global(self, slot: str) -> None:
+        if self.redis is None:
+            return
+        try:
+            self.redis.zrem(GLOBAL_SLOTS_KEY, slot)
+        except RedisError:
+            pass   # expires with its TTL
+
+    # ------------------------------------------------------------------
+    # Completion
+    # ------------------------------------------------------------------
+    def poll(self) -> int:
+        """Reap finished chords; returns how many are still in flight."""
+        done, still = [], []
+        for item in self.in_flight:
+            (done if item.result.ready() else still).append(item)
+        self.in_flight = still
+        for item in done:
+            self._release_global(item.slot)
+            lag = self._clock() - item.started
+            self.lags.append(lag)
+            if item.result.failed():
+                self.failed += 1
+                log.error(f"[throttle] {self.name}: range {item.from_block}-{item.to_block} failed after "
+                          f"{lag:.1f}s; left for the next run")
+            else:
+                self.completed += 1
+                log.info(f"[throttle] {self.name}: range {item.from_block}-{item.to_block} committed, "
+                         f"lag {lag:.1f}s, {len(still)} in flight{self._depth_info()}")
+        return len(still)
+
+    def drain(self, timeout: float = CHORD_DRAIN_TIMEOUT_SECONDS) -> bool:
+        """Wait until every dispatched chord finished; False on timeout."""
+        deadline = self._clock() + timeout
+        while self.poll():
+            if self._clock() >= deadline:
+                log.warning(f"[throttle] {self.name}: {len(self.in_flight)} ranges still running after "
+                            f"{timeout:g}s; not waiting any longer")
+                for item in self.in_flight:
+                    self._release_global(item.slot)
+                return False
+            self._sleep(self.poll_interval)
+        return True
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def queue_depths(self) -> dict[str, int] | None:
+        if self.broker is None:
+            return None
+        try:
+            pipe = self.broker.pipeline(transaction=False)
+            for name in PIPELINE_QUEUES:
+                pipe.llen(name)
+            return dict(zip(PIPELINE_QUEUES, pipe.execute()))
+        except RedisError:
+            return None
+
+    def _depth_info(self) -> str:
+        depths = self.queue_depths()
+        if depths is None:
+            return ""
+        return "; queued " + ", ".join(f"{name}={depth}" for name, depth in depths.items())
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags)
+        return {
+            "dispatched": self.dispatched,
+            "completed": self.completed,
+            "failed": self.failed,
+            "peak_in_flight": self.peak_in_flight,
+            "waited_s": self.waited,
+            "lag_p50": lags[len(lags) // 2] if lags else None,
+            "lag_max": lags[-1] if lags else None,
+        }
+
+    def log_summary(self) -> None:
+        s = self.summary()
+        lag = f"lag p50 {s['lag_p50']:.1f}s, max {s['lag_max']:.1f}s" if s["lag_max"] is not None else "no lag data"
+        log.info(f"[throttle] {self.name}: {s['dispatched']} chords ({s['failed']} failed), "
+                 f"peak {s['peak_in_flight']} in flight, fetch loop waited {s['waited_s']:.1f}s, {lag}")
+
+
+def chord_throttle(name: str, **kwargs) -> ChordThrottle:
+    """ChordThrottle sharing the global cap in Redis and reading broker queue depths."""
+    return ChordThrottle(name, redis=Redis.from_url(REDIS_URL), broker=Redis.from_url(CELERY_BROKER_URL), **kwargs)
@@ -0,0 +1,92 @@
+"""
+How many decode chunks a range is split into, and where.
+
+The old split was a fixed `min(8, logs / 200)` equal slices: a minute's
+swaps could straddle two chunks, small ranges paid a task per 200 logs
+and large ones were capped at 8 whatever the worker count.  Now
+
+    chunks = clamp(logs × decode seconds per log / DECODE_TASK_SECONDS,
+                   1, decode workers)
+
+where the per-log cost starts at DECODE_SECONDS_PER_LOG and follows the
+decodes this process measures, and the worker count is the concurrency
+of the workers consuming the decode queue (inspected at most every few
+minutes, DECODE_WORKERS when that fails).  Cuts fall on minute
+boundaries (`partition_logs`), so each chunk's per-minute partials are
+complete and the aggregate step only merges them.
+"""
+import logging
+import math
+import threading
+import time
+
+from app.celery.celery_app import celery_app
+from app.sources.dex_data_pipeline.config.settings import (
+    DECODE_SECONDS_PER_LOG,
+    DECODE_TASK_SECONDS,
+    DECODE_WORKERS,
+)
+from app.utils.log_utils import partition_logs
+
+log = logging.getLogger(__name__)
+
+DECODE_QUEUE = "celery"          # decode_swap_chunk has no queue of its own
+WORKERS_TTL_SECONDS = 300
+
+
+class DecodeCostModel:
+    """Exponentially weighted decode seconds per log."""
+
+    def __init__(self, seconds_per_log: float = DECODE_SECONDS_PER_LOG, alpha: float = 0.2):
+        self.seconds_per_log = seconds_per_log
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def observe(self, n_logs: int, seconds: float) -> None:
+        if n_logs <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            self.seconds_per_log += self.alpha * (seconds / n_logs - self.seconds_per_log)
+
+
+decode_cost = DecodeCostModel()
+
+_workers: tuple[float, int] | None = None   # (checked at, count)
+
+
+def _inspect_decode_workers() -> int | None:
+    inspector = celery_app.control.inspect(timeout=1.0)
+    queues = inspector.active_queues() or {}
+    stats = inspector.stats() or {}
+    total = sum(
+        stats.get(worker, {}).get("pool", {}).get("max-concurrency", 0)
+        for worker, worker_queues in queues.items()
+        if any(q.get("name") == DECODE_QUEUE for q in worker_queues)
+    )
+    return total or None
+
+
+def decode_workers() -> int:
+    """Concurrency of the workers consuming decode tasks (cached)."""
+    global _workers
+    now = time.monotonic()
+    if _workers is None or now - _workers[0] > WORKERS_TTL_SECONDS:
+        try:
+            count = _inspect_decode_workers()
+        except Exception as exc:
+            log.debug(f"Could not inspect decode workers: {exc}")
+            count = None
+        _workers = (now, count or DECODE_WORKERS)
+    return _workers[1]
+
+
+def chunk_count(n_logs: int, workers: int, seconds_per_log: float | None = None) -> int:
+    """Chunks for `n_logs`: enough work per task to pay its overhead, at most one per worker."""
+    cost = decode_cost.seconds_per_log if seconds_per_log is None else seconds_per_log
+    return max(1, min(workers, math.ceil(n_logs * cost / DECODE_TASK_SECONDS)))
+
+
+def plan_chunks(logs: list[dict], workers: int | None = None) -> list[list[dict]]:
+    """Minute-aligned decode chunks for one range's stamped logs."""
+    workers = decode_workers() if workers is None else workers
+    return partition_logs(logs, chunk_count(len(logs), workers))
@@ -0,0 +1,120 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator
+from sqlalchemy import and_, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.storage.models.block_coverage import block_coverage_table
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IntervalSet:
+    """
+    Disjoint, sorted set of closed block intervals [from_block, to_block].
+
+    Overlapping or adjacent intervals are merged on insert, so the set is
+    always the minimal description of what has been covered.
+    """
+
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()):
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for lo, hi in sorted(intervals):
+            self.add(lo, hi)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return iter(zip(self._starts, self._ends))
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({list(self)})"
+
+    def add(self, lo: int, hi: int) -> None:
+        if hi < lo:
+            raise ValueError(f"Empty interval [{lo}, {hi}]")
+        # every interval touching [lo - 1, hi + 1] is absorbed
+        i = bisect_left(self._ends, lo - 1)
+        j = bisect_right(self._starts, hi + 1)
+        if i < j:
+            lo = min(lo, self._starts[i])
+            hi = max(hi, self._ends[j - 1])
+        self._starts[i:j] = [lo]
+        self._ends[i:j] = [hi]
+
+    def contains(self, lo: int, hi: int) -> bool:
+        i = bisect_right(self._starts, lo) - 1
+        return i >= 0 and self._ends[i] >= hi
+
+    def overlap(self, lo: int, hi: int) -> list[tuple[int, int]]:
+        """The parts of [lo, hi] inside the set, in order."""
+        parts = []
+        i = max(bisect_right(self._starts, lo) - 1, 0)
+        while i < len(self._starts) and self._starts[i] <= hi:
+            a, b = max(lo, self._starts[i]), min(hi, self._ends[i])
+            if a <= b:
+                parts.append((a, b))
+            i += 1
+        return parts
+
+    def missing(self, lo: int, hi: int) -> list[tuple[int, int]]:
+        """The holes of [lo, hi] not covered by the set, in order."""
+        gaps = []
+        cursor = lo
+        i = max(bisect_right(self._starts, lo) - 1, 0)
+        while cursor <= hi and i < len(self._starts):
+            start, end = self._starts[i], self._ends[i]
+            if start > hi:
+                break
+            if start > cursor:
+                gaps.append((cursor, start - 1))
+            cursor = max(cursor, end + 1)
+            i += 1
+        if cursor <= hi:
+            gaps.append((cursor, hi))
+        return gaps
+
+
+# ----------------------------------------------------------------------
+# Persistence
+# ----------------------------------------------------------------------
+def load_coverage(db: Session, pool_slug: str) -> IntervalSet:
+    """Merged block coverage of `pool_slug` (table: schema.sql)."""
+    rows = db.execute(
+        select(block_coverage_table.c.from_block, block_coverage_table.c.to_block)
+        .where(block_coverage_table.c.pool_slug == pool_slug)
+    ).all()
+    covered = IntervalSet((r.from_block, r.to_block) for r in rows)
+    logger.info(f"Loaded {len(rows)} coverage rows for {pool_slug} → {len(covered)} intervals")
+    if len(rows) > len(covered):
+        compact_coverage(db, pool_slug, covered)
+    return covered
+
+
+def record_coverage(db: Session, pool_slug: str, from_block: int, to_block: int) -> None:
+    """Mark [from_block, to_block] as committed. Caller commits."""
+    stmt = (
+        pg_insert(block_coverage_table)
+        .values(pool_slug=pool_slug, from_block=from_block, to_block=to_block)
+        .on_conflict_do_nothing(index_elements=["pool_slug", "from_block", "to_block"])
+    )
+    db.execute(stmt)
+
+
+def compact_coverage(db: Session, pool_slug: str, covered: IntervalSet) -> None:
+    """
+    Replace the rows inside each merged interval by that one interval.
+    Rows written concurrently inside an interval are redundant, so deleting
+    them with the rest is safe. Caller commits.
+    """
+    for lo, hi in covered:
+        db.execute(
+            delete(block_coverage_table).where(and_(
+                block_coverage_table.c.pool_slug == pool_slug,
+                block_coverage_table.c.from_block >= lo,
+                block_coverage_table.c.to_block <= hi,
+            ))
+        )
+        record_coverage(db, pool_slug, lo, hi)
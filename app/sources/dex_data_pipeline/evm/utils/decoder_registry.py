@@ -0,0 +1,117 @@
+"""
+Process-level registry of precompiled swap decoders.
+
+A decode plan is everything a decode task used to rebuild per chunk: the
+decoder family picked from the event ABI, the amount / price scalers for
+the pool's decimals and orientation, and the ABI for the fallback path.
+Plans are keyed by pool shape –
+
+    "<topic>:<abi hash>:<dec0>:<dec1>:<base_is_token1>"   e.g.
+    "c42079f9:9af676336dd5:18:6:0"
+
+– so a task message carries that short key instead of the ABI dict, and
+each worker process builds a plan once and reuses it for every chunk.
+
+Workers resolve the ABI hash against the ABIs they know: every DEX in
+`evm.registry`, the V2 Swap event, and whatever this process registered.
+"""
+import hashlib
+import json
+import logging
+from typing import Callable
+
+from eth_utils import event_abi_to_log_topic
+
+from app.celery.celery_app import celery_app
+from app.sources.dex_data_pipeline.evm.registry import DEX_REGISTRY
+from app.sources.dex_data_pipeline.evm.utils import abi_words, uniswap_v2_decoder, uniswap_v3_decoder
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import minute_partials
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch
+
+logger = logging.getLogger(__name__)
+
+# decoder family → (label, fast args parser, swap builder factory)
+_FAMILIES = {
+    "sqrtPriceX96": ("V3", uniswap_v3_decoder.decode_swap_args_fast, uniswap_v3_decoder.swap_builder),
+    "amount0In": ("V2", uniswap_v2_decoder.decode_swap_args_fast, uniswap_v2_decoder.swap_builder),
+}
+
+_ABIS: dict[str, dict] = {}            # abi hash → event ABI
+_PLANS: dict[str, "DecodePlan"] = {}   # plan key → plan
+
+
+class DecodePlan:
+    """One pool shape's decoder: `decode(logs_chunk) -> SwapBatch`."""
+
+    __slots__ = ("key", "abi", "label", "_parse", "_build")
+
+    def __init__(self, key: str, abi: dict, dec0: int, dec1: int, base_is_token1: bool):
+        names = {i["name"] for i in abi["inputs"]}
+        family = next((f for f in _FAMILIES if f in names), None)
+        if family is None:
+            raise ValueError(f"No swap decoder for event {abi.get('name')}({', '.join(sorted(names))})")
+        self.key = key
+        self.abi = abi
+        self.label, self._parse, make_builder = _FAMILIES[family]
+        self._build: Callable[[list, list], SwapBatch] = make_builder(dec0, dec1, base_is_token1)
+
+    def decode(self, logs_chunk: list) -> SwapBatch:
+        """SwapBatch of the chunk, with its per-minute partials for the aggregate step."""
+        args_list = abi_words.fill_from_abi(logs_chunk, self.abi, self._parse(logs_chunk), self.label)
+        batch = self._build(logs_chunk, args_list)
+        batch.minutes = minute_partials(batch)
+        return batch
+
+    def __repr__(self) -> str:
+        return f"DecodePlan({self.key!r}, {self.label})"
+
+
+def abi_hash(abi: dict) -> str:
+    """Short hash of an event's shape (name, inputs, indexing) – formatting-independent."""
+    shape = [abi.get("name"), bool(abi.get("anonymous")),
+             [(i["name"], i["type"], bool(i.get("indexed"))) for i in abi["inputs"]]]
+    return hashlib.sha1(json.dumps(shape).encode()).hexdigest()[:12]
+
+
+def register_abi(abi: dict) -> str:
+    digest = abi_hash(abi)
+    _ABIS.setdefault(digest, abi)
+    return digest
+
+
+def plan_key(abi: dict, dec0: int, dec1: int, base_is_token1: bool) -> str:
+    """Key of the plan for a pool; registers `abi` in this process."""
+    topic = event_abi_to_log_topic(abi).hex()
+    return f"{topic.removeprefix('0x')[:8]}:{register_abi(abi)}:{dec0}:{dec1}:{int(base_is_token1)}"
+
+
+def get_plan(key: str) -> DecodePlan:
+    plan = _PLANS.get(key)
+    if plan is None:
+        _, digest, dec0, dec1, base_is_token1 = key.split(":")
+        abi = _ABIS.get(digest)
+        if abi is None:
+            raise ValueError(f"Unknown swap ABI {digest} in decoder key {key}")
+        plan = _PLANS[key] = DecodePlan(key, abi, int(dec0), int(dec1), base_is_token1 == "1")
+        logger.info(f"Built decode plan {plan}")
+    return plan
+
+
+def plan_for(abi: dict, dec0: int, dec1: int, base_is_token1: bool) -> DecodePlan:
+    return get_plan(plan_key(abi, dec0, dec1, base_is_token1))
+
+
+for _spec in DEX_REGISTRY.values():
+    register_abi(_spec.swap_abi)
+register_abi(uniswap_v2_decoder.SWAP_ABI)
+
+
+@celery_app.task(name="decode_swap_chunk")
+def decode_swap_chunk(logs_chunk: list, key: str) -> SwapBatch:
+    """
+    Decode one chunk of Swap logs with the worker's cached plan for `key`
+    (see `plan_key`) → columnar SwapBatch for *raw_swaps*.
+    """
+    out = get_plan(key).decode(logs_chunk)
+    logger.debug("decoded %d swaps with %s", len(out), key)
+    return out
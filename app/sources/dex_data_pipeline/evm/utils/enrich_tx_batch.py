@@ -1,18 +1,22 @@
 # enrich.py  (or wherever you keep the Celery tasks)
 
-import os, requests
+import logging
+
 from celery import shared_task
 from app.sources.dex_data_pipeline.config.settings import ROUTER_MAP
+from app.sources.dex_data_pipeline.evm.utils.tx_senders import lookup_senders, resolve_senders, tx_key
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch, as_batch
+
+log = logging.getLogger(__name__)
 
 # ────────────────────────────────────────────────────────────────────────────
 # Constants ─ tune to taste
 # ────────────────────────────────────────────────────────────────────────────
-BATCH_SIZE = 100                     # Alchemy hard-limit
 RATE_LIMIT = "900/s"                 # keep well under the free-tier 1 000 QPS
 RETRIES    = 3                       # exponential back-off handled by Celery
 
 # ────────────────────────────────────────────────────────────────────────────
-# Task: enrich_tx_batch
+# Task: enrich_tx_batch – a single batch (range chords use enrich_range)
 # ────────────────────────────────────────────────────────────────────────────
 @shared_task(
             name = "enrich_tx_batch",
@@ -21,55 +25,40 @@ RETRIES    = 3                       # exponential back-off handled by Celery
              rate_limit=RATE_LIMIT,
              max_retries=RETRIES,
              default_retry_delay=3)   # seconds → doubles each retry
-def enrich_tx_batch(self, decoded_rows: list[dict],rpc_url) -> list[dict]:
+def enrich_tx_batch(self, decoded_rows: SwapBatch | list[dict], rpc_url) -> SwapBatch:
     """
     Parameters
     ----------
-    decoded_rows : list[dict]
-        Output of `decode_log_chunk_fn`.  Each dict **must** include
-        at least {"tx_hash": str, "wallet": str, … }.
+    decoded_rows : SwapBatch
+        Output of the decode task (a legacy list of dicts is
+        converted first).
 
     Returns
     -------
-    list[dict]
-        Same rows with two new keys:
+    SwapBatch
+        Same batch with two columns filled in:
             • 'caller'     – the true EOA that paid gas for the tx
             • 'router_tag' – 'EOA' | known-router label | 'router/agg' | 'missing'
     """
-    key = lambda h: h.lower().lstrip("0x")               # internal 64-char hash
-    rpc_param  = lambda h: (h := h.lower()) if h.startswith("0x") else "0x" + h
-    # ── 1. Collect unique tx-hashes in this chunk ───────────────────────────
-    hashes = list({row["tx_hash"].lower() for row in decoded_rows})
-    # ── 2. Batch-call eth_getTransactionByHash via Alchemy ─────────────────
-    from_map: dict[str, str | None] = {}   # tx_hash → from-address (lowercase)
-    for i in range(0, len(hashes), BATCH_SIZE):
-        batch = hashes[i : i + BATCH_SIZE]
-        payload = [
-            {"jsonrpc": "2.0", "id": j, "method": "eth_getTransactionByHash", "params": [rpc_param(h)]}
-            for j, h in enumerate(batch)
-        ]
-
-        try:
-            resp = requests.post(rpc_url, json=payload, timeout=10)
-            resp.raise_for_status()
-            results = resp.json()
-        except Exception as exc:           # network glitch, 5xx, etc.
-            raise self.retry(exc=exc)
-        for item in results:
-            if (res := item.get("result")):               # successful lookup
-                k = res["hash"].lower().lstrip("0x")
-                v = res["from"].lower()
-                from_map[k] = v
-            else:
-                # could be dropped tx, bad hash, etc.
-                from_map[item["id"]] = None
-
-    # ── 3. Enrich each swap row ─────────────────────────────────────────────
-    enriched = []
-    for row in decoded_rows:
-        h       = key(row["tx_hash"])
-        caller  = from_map.get(h)                        # None if lookup failed
-        sender  = row["sender"].lower()
+    batch = as_batch(decoded_rows)
+    # ── 1+2. Senders of the unique tx-hashes: shared cache first, then
+    #         batched per-tx or per-block lookups for the misses ─────────
+    try:
+        from_map = lookup_senders(batch.tx_hash, rpc_url, blocks=batch.block_number)  # tx key → from (lowercase)
+    except Exception as exc:           # network glitch, 5xx, etc.
+        raise self.retry(exc=exc)
+
+    # ── 3. Enrich the batch ───────────────────────────────────────────────
+    return apply_senders(batch, from_map)
+
+
+def apply_senders(batch: SwapBatch, from_map: dict[str, str]) -> SwapBatch:
+    """Fill `batch`'s caller / router_tag columns from {tx key: sender}, in place."""
+    # Senders are interned, so each distinct sender is lower-cased once
+    sender_lower = [a.lower() for a in batch.addresses]
+    for i, (tx_hash, sender_idx) in enumerate(zip(batch.tx_hash, batch.sender)):
+        caller  = from_map.get(tx_key(tx_hash))          # None if lookup failed
+        sender  = sender_lower[sender_idx]
 
         # Tag logic ----------------------------------------------------------
         if sender in ROUTER_MAP:                     # known router / aggregator
@@ -77,9 +66,57 @@ def enrich_tx_batch(self, decoded_rows: list[dict],rpc_url) -> list[dict]:
         elif caller == sender:                       # user hit pool directly
             tag = "EOA"
         else:                                        # unknown contract path
-            tag = "router/agg"        
+            tag = "router/agg"
+
+        batch.caller[i]     = batch.intern(caller)
+        batch.router_tag[i] = tag
+    return batch
+
+
+def range_senders(batches: list[SwapBatch], rpc_url: str) -> dict[str, str]:
+    """
+    One sender lookup for all of a range's decoded chunks: every tx hash
+    is resolved once, however many chunks / swaps carry it, and the
+    misses go out in full-size batches.  Logs the range's dedup ratio and
+    enrich RPCs.
+    """
+    tx_hashes = [h for batch in batches for h in batch.tx_hash]
+    blocks = [b for batch in batches for b in batch.block_number]
+    lookup = resolve_senders(tx_hashes, rpc_url, blocks=blocks)
+    if tx_hashes:
+        unique = lookup.hits + lookup.misses
+        per_chunk = sum(len(set(batch.tx_hash)) for batch in batches)
+        log.info(f"------Enrich: {len(tx_hashes)} swaps in {len(batches)} chunks → {unique} unique txs "
+                 f"(dedup {len(tx_hashes) / unique:.2f}×, {per_chunk} per-chunk lookups); "
+                 f"{lookup.hits} cached, {lookup.misses} fetched in {lookup.rpc_calls} RPCs")
+    return lookup.senders
+
 
-        row["caller"]     = caller
-        row["router_tag"] = tag
-        enriched.append(row)
-    return enriched
+def enrich_batches(batches: list[SwapBatch | list[dict]], rpc_url: str) -> list[SwapBatch]:
+    """A range's decoded chunks, enriched through one `range_senders` lookup."""
+    batches = [as_batch(batch) for batch in batches]
+    from_map = range_senders(batches, rpc_url)
+    return [apply_senders(batch, from_map) for batch in batches]
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Task: enrich_range – the range chord's first body step
+# ────────────────────────────────────────────────────────────────────────────
+@shared_task(
+            name = "enrich_range",
+             queue="enrich",
+             bind=True,
+             rate_limit=RATE_LIMIT,
+             max_retries=RETRIES,
+             default_retry_delay=3)
+def enrich_range(self, decoded_chunks: list[SwapBatch | list[dict]], rpc_url) -> list[SwapBatch]:
+    """
+    Enrich every decoded chunk of one range at once (see `range_senders`)
+    and hand the chunks, partials intact, on to aggregate_and_upsert.
+    """
+    batches = [as_batch(chunk) for chunk in decoded_chunks]
+    try:
+        from_map = range_senders(batches, rpc_url)
+    except Exception as exc:           # network glitch, 5xx, etc.
+        raise self.retry(exc=exc)
+    return [apply_senders(batch, from_map) for batch in batches]
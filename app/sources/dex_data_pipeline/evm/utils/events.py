@@ -1,28 +1,183 @@
 from typing import List
+import threading
 from web3 import Web3
 from web3.types import LogReceipt
 import backoff
 import logging
+import requests
 
 log = logging.getLogger(__name__)
 
-@backoff.on_exception(backoff.expo, Exception, max_tries=3)
+# Fragments of the errors providers return when an eth_getLogs window holds
+# too many logs (Alchemy, Infura, QuickNode, public nodes).
+_RANGE_TOO_LARGE_HINTS = (
+    "log response size exceeded",
+    "query returned more than",
+    "response size exceeded",
+    "too many results",
+    "block range is too large",
+    "exceed maximum block range",
+    "is limited to a",
+)
+
+
+class LogRangeTooLarge(Exception):
+    """The provider refused an eth_getLogs window as too large – split it."""
+
+    def __init__(self, from_block: int, to_block: int, reason: str = ""):
+        super().__init__(f"blocks {from_block}-{to_block} too large: {reason}")
+        self.from_block = from_block
+        self.to_block = to_block
+
+
+def is_range_too_large(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return any(hint in message for hint in _RANGE_TOO_LARGE_HINTS)
+
+
+@backoff.on_exception(
+    backoff.expo,
+    Exception,
+    max_tries=3,
+    giveup=is_range_too_large,
+    giveup_log_level=logging.DEBUG,  # fetch_logs reports the outcome itself
+)
+def _get_logs(w3: Web3, params: dict) -> List[LogReceipt]:
+    return w3.eth.get_logs(params)
+
+
 def fetch_logs(
     w3: Web3,
-    pool_address: str,
+    pool_address: str | List[str],
     from_block: int,
     to_block: int,
-    topics: List[str]
-) -> List[LogReceipt]:
-    """Generic log fetcher for a given address and topics over a block range."""
+    topics: List
+) -> List[LogReceipt] | None:
+    """
+    Generic log fetcher for a given address and topics over a block range.
+
+    `pool_address` may be a list – the node then returns the logs of every
+    address in one call – and `topics[0]` may be a list of alternatives.
+
+    Transient errors are retried; once retries are exhausted it returns
+    None (not []), so callers can tell a failed range from one that simply
+    has no logs and leave it uncovered.  A provider "too many results"
+    error is not retried but raised as `LogRangeTooLarge`.
+    """
     try:
-        logs = w3.eth.get_logs({
+        return _get_logs(w3, {
             "fromBlock": from_block,
             "toBlock": to_block,
             "address": pool_address,
             "topics": topics
         })
-        return logs
     except Exception as e:
+        if is_range_too_large(e):
+            raise LogRangeTooLarge(from_block, to_block, str(e)) from e
+        log.error(f"--[!] Error fetching logs for blocks {from_block}-{to_block}: {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Raw JSON-RPC path
+# ---------------------------------------------------------------------------
+# web3 wraps every log in an AttributeDict of HexBytes that sanitize_log then
+# turns back into plain values.  Posting eth_getLogs ourselves keeps the
+# node's JSON as is: data / topics stay 0x-hex strings (the decoders read
+# them directly) and only the fields the pipeline computes with are
+# normalised, in place, to what sanitize_log produced.
+_RAW_INT_FIELDS = ("blockNumber", "logIndex", "transactionIndex")
+_RAW_HASH_FIELDS = ("transactionHash", "blockHash")   # stored without 0x, as HexBytes.hex() gives
+
+_local = threading.local()
+
+
+class RpcError(Exception):
+    """JSON-RPC error object returned by the node."""
+
+
+def _http() -> requests.Session:
+    # one keep-alive session per prefetch thread
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _hex_topic(topic):
+    if topic is None:
+        return None
+    if isinstance(topic, list):
+        return [_hex_topic(t) for t in topic]
+    if isinstance(topic, (bytes, bytearray)):
+        return "0x" + bytes(topic).hex()
+    return topic if topic[:2] in ("0x", "0X") else "0x" + topic
+
+
+def normalize_raw_logs(logs: list[dict]) -> list[dict]:
+    """Give raw eth_getLogs entries the int / hash formats of `sanitize_log`, in place."""
+    for log in logs:
+        for field in _RAW_INT_FIELDS:
+            value = log.get(field)
+            if value.__class__ is str:
+                log[field] = int(value, 16)
+        for field in _RAW_HASH_FIELDS:
+            value = log.get(field)
+            if value is not None and value[:2] == "0x":
+                log[field] = value[2:]
+    return logs
+
+
+@backoff.on_exception(
+    backoff.expo,
+    Exception,
+    max_tries=3,
+    giveup=is_range_too_large,
+    giveup_log_level=logging.DEBUG,
+)
+def _get_logs_raw(rpc_url: str, params: dict) -> list[dict]:
+    resp = _http().post(
+        rpc_url,
+        json={"jsonrpc": "2.0", "id": 1, "method": "eth_getLogs", "params": [params]},
+        timeout=30,
+    )
+    # Some providers answer a too-large window with HTTP 4xx *and* a JSON-RPC
+    # error body: read the body first so that error still splits the range.
+    try:
+        body = resp.json()
+    except ValueError:
+        body = None
+    error = body.get("error") if isinstance(body, dict) else None
+    if error:
+        raise RpcError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+    resp.raise_for_status()
+    if body is None:
+        raise RpcError(f"eth_getLogs answered with a non-JSON body: {resp.text[:200]!r}")
+    return body["result"]
+
+
+def fetch_logs_raw(
+    rpc_url: str,
+    pool_address: str | List[str],
+    from_block: int,
+    to_block: int,
+    topics: List
+) -> List[dict] | None:
+    """
+    `fetch_logs` over plain JSON-RPC: same filter, retries and None /
+    LogRangeTooLarge outcomes, but returns the node's log dicts ready for
+    stamping and decoding – no `sanitize_log` pass needed.
+    """
+    try:
+        logs = _get_logs_raw(rpc_url, {
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "address": pool_address,
+            "topics": _hex_topic(topics),
+        })
+    except Exception as e:
+        if is_range_too_large(e):
+            raise LogRangeTooLarge(from_block, to_block, str(e)) from e
         log.error(f"--[!] Error fetching logs for blocks {from_block}-{to_block}: {e}")
-        return []
+        return None
+    return normalize_raw_logs(logs)
@@ -0,0 +1,55 @@
+from collections import defaultdict
+from typing import Iterable
+
+from app.sources.dex_data_pipeline.evm.utils.coverage import IntervalSet
+
+
+def normalize_topic(topic) -> str:
+    """Lower-case hex without 0x for a topic given as bytes / HexBytes / str."""
+    if isinstance(topic, (bytes, bytearray)):
+        return bytes(topic).hex()
+    return str(topic).lower().removeprefix("0x")
+
+
+def demux_logs(logs: Iterable[dict], topic_by_address: dict[str, str]) -> dict[str, list[dict]]:
+    """
+    Split a multi-address eth_getLogs result into per-pool lists.
+
+    `topic_by_address` maps lower-case pool address → that pool's swap
+    topic; logs from other addresses, or with another event signature
+    (the filter ORs every pool's topic), are dropped.  Block order is kept.
+    """
+    wanted = {addr.lower(): normalize_topic(topic) for addr, topic in topic_by_address.items()}
+    by_pool: dict[str, list[dict]] = defaultdict(list)
+    for log in logs:
+        address = log["address"].lower()
+        topic = wanted.get(address)
+        if topic is not None and log["topics"] and normalize_topic(log["topics"][0]) == topic:
+            by_pool[address].append(log)
+    return dict(by_pool)
+
+
+def logs_between(logs: list[dict], from_block: int, to_block: int) -> list[dict]:
+    return [log for log in logs if from_block <= log["blockNumber"] <= to_block]
+
+
+def route_range(
+    logs_by_pool: dict[str, list[dict]],
+    gaps_by_pool: dict[str, IntervalSet],
+    from_block: int,
+    to_block: int,
+) -> dict[str, list[tuple[int, int, list[dict]]]]:
+    """
+    Map one fetched range onto each pool's own gaps.
+
+    Returns {address: [(lo, hi, logs), ...]} for every sub-range of
+    [from_block, to_block] the pool still needs; blocks a pool already
+    covers are skipped, so its ledger and kline table see no re-upsert.
+    """
+    routed = {}
+    for address, gaps in gaps_by_pool.items():
+        pool_logs = logs_by_pool.get(address, [])
+        parts = gaps.overlap(from_block, to_block)
+        if parts:
+            routed[address] = [(lo, hi, logs_between(pool_logs, lo, hi)) for lo, hi in parts]
+    return routed
@@ -1,72 +1,100 @@
 from celery import chord
 from celery import chain as celery_chain
 from celery import group
-from app.utils.log_utils import sanitize_log, chunk_logs
 import time
 from datetime import datetime, timedelta
-from app.sources.dex_data_pipeline.evm.utils.events import fetch_logs
+from app.sources.dex_data_pipeline.evm.utils.events import fetch_logs_raw
 from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggregator_and_upsert_handler import aggregate_and_upsert
 from app.sources.dex_data_pipeline.evm.utils.token_meta import inspect_pool
 from app.storage.db_utils import resolve_table_name
 from app.sources.dex_data_pipeline.evm.utils.client import get_web3_client
-from app.sources.dex_data_pipeline.evm.utils.blocks import BlockTimestampResolver, BlockClient
+from app.sources.dex_data_pipeline.evm.utils.blocks import BlockTimestampResolver, BlockClient, block_timestamp_cache
+from app.sources.dex_data_pipeline.evm.utils.block_index import BlockTimeIndex
+from app.sources.dex_data_pipeline.evm.utils.coverage import load_coverage, record_coverage
+from app.sources.dex_data_pipeline.evm.utils.range_planner import AdaptiveRangePlanner
+from app.sources.dex_data_pipeline.evm.utils.prefetch import RateLimiter, prefetch_ordered
 from app.sources.dex_data_pipeline.utils.cleaner import delete_price_anomalies_with_retry
 from app.sources.dex_data_pipeline.utils.crunch_pool_flow import crunch_pool_flow
-from app.sources.dex_data_pipeline.utils.log_extraction_metrics import log_extraction_metrics
-from app.sources.dex_data_pipeline.evm.utils.enrich_tx_batch import enrich_tx_batch
+from app.sources.dex_data_pipeline.utils.log_extraction_metrics import log_extraction_metrics, extract_pool_slug
+from app.sources.dex_data_pipeline.evm.utils.enrich_tx_batch import enrich_range
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import decode_swap_chunk, plan_key
+from app.sources.dex_data_pipeline.evm.utils import local_decode
+from app.sources.dex_data_pipeline.evm.utils.chunk_planner import plan_chunks
+from app.sources.dex_data_pipeline.evm.utils.chord_throttle import chord_throttle
+from app.sources.dex_data_pipeline.evm.utils.tx_senders import log_sender_stats, sender_stats
 from app.storage.db import SessionLocal
+from app.sources.dex_data_pipeline.config.settings import (
+    BLOCK_SEARCH_MODE,
+    BLOCK_TIME_SECONDS,
+    EXACT_BLOCK_TIMESTAMPS,
+    LOG_FETCH_CONCURRENCY,
+    LOGS_PER_CALL_TARGET,
+    MAX_BLOCKS_PER_CALL,
+    POOL_LOGS_PER_CALL_TARGET,
+    RPC_CALLS_PER_SECOND,
+)
 from app.utils.clean_util import clean_symbol
 import logging
 from app.storage.db_utils import create_table_if_not_exists
 from app.sources.dex_data_pipeline.utils.wallet_watcher import crunch_wallet_metrics
 from app.sources.dex_data_pipeline.utils.find_quote_usd_prices import FillQuoteUSDPrices
 import asyncio
+from typing import NamedTuple
 log = logging.getLogger(__name__)
 
 
 
-def run_evm_orchestration(
-        rpc_url: str,
-        pool_address: str,
-        swap_topic: str,
-        swap_abi: dict,
-        decode_log_chunk_fn,
-        chain: str = "arbitrum",
-        dex: str = "uniswap",
-        pair: str = "ARB/USDC",
-        days_back: int = 1, 
-        step: int = 1000
-        ) -> None:
-    """End‑to‑end swap log extraction → minute‑level OHLCV aggregation.
+class PoolContext(NamedTuple):
+    """Per-pool state every crawl step needs (tables, decimals, orientation)."""
+    address: str
+    table_name: str
+    swap_table: str
+    quote_pair: str
+    dec0: int
+    dec1: int
+    base_is_token1: bool
 
-    Parameters
-    ----------
-    pool_address : str
-        Uniswap‑style pool address (checksum format).
-    days_back : int, default 1
-        How many days of history to backfill.
-    step : int, default 1_000
-        Number of blocks per crawl chunk.
-    db : sqlalchemy.orm.Session | None, default None
-        The DB session if needed downstream (kept for interface parity).
-    """
+    @property
+    def pool_slug(self) -> str:
+        return extract_pool_slug(self.table_name)
 
-    start_ts = time.time()
-    w3 = get_web3_client(rpc_url)
-    blockClient = BlockClient(w3)
 
-    # ---------------------------------------------------------------------
-    # Resolve the block range we need to crawl.
-    # ---------------------------------------------------------------------
-    target_time = datetime.utcnow() - timedelta(days=days_back)
-    target_ts = int(target_time.timestamp())
-    log.info(f"Target timestamp for extraction: {target_ts} ({target_time})")
-    start_block = blockClient.find_block_by_timestamp(target_ts)
-    end_block = blockClient.get_latest_block()
+def open_block_client(w3, chain: str, rpc_url: str, days_back: int) -> tuple[BlockClient, BlockTimeIndex]:
+    """BlockClient seeded with the chain's block-time checkpoints for the last `days_back` days."""
+    # Persisted block ↔ timestamp checkpoints turn each block search into a
+    # few RPCs inside a known bracket instead of a bisection from genesis.
+    # Only the run's window (plus a neighbour below it) is loaded.
+    from_ts = int((datetime.utcnow() - timedelta(days=days_back)).timestamp())
+    with SessionLocal() as session:
+        block_index = BlockTimeIndex.load(session, chain, from_ts=from_ts)
+    block_client = BlockClient(
+        w3,
+        index=block_index,
+        search_mode=BLOCK_SEARCH_MODE.get(chain, "bisect"),
+        block_time=BLOCK_TIME_SECONDS.get(chain),
+        rpc_url=rpc_url,
+    )
+    return block_client, block_index
+
 
+def make_timestamp_resolver(w3, chain: str, rpc_url: str) -> BlockTimestampResolver:
     # ---------------------------------------------------------------------
-    # Inspect the pool (symbols, decimals) & verify aggregation table exists.
+    # Instantiate a *single* timestamp resolver so we reuse its internal map
+    # across all block ranges. This cuts RPC calls dramatically vs creating
+    # a new object each loop.
     # ---------------------------------------------------------------------
+    # In exact mode every distinct block is fetched once and shared through
+    # the Redis-backed block cache.
+    return BlockTimestampResolver(
+        w3,
+        rpc_url=rpc_url,
+        exact=EXACT_BLOCK_TIMESTAMPS.get(chain, False),
+        cache=block_timestamp_cache(chain),
+    )
+
+
+def prepare_pool(w3, chain: str, dex: str, pair: str, pool_address: str) -> PoolContext:
+    """Inspect the pool (symbols, decimals) & make sure its tables exist."""
     token0, token1, dec0, dec1 = inspect_pool(w3, pool_address)
     token0 = clean_symbol(token0)
     token1 = clean_symbol(token1)
@@ -98,74 +126,118 @@ def run_evm_orchestration(
         log.info(f"Created table: {table_name} for pair {token0}/{token1}")
         log.info(f"Created table for wallet_stats: {swap_table} ")
 
-    # we will implement this later it is too translate quote token to USD (we have to pull USD proces by 8h time buckets 
-    # very useful for non usd quoted items)
-    
-    # log.info(f"Using table: {table_name} for {token0}/{token1} pair")
+    return PoolContext(pool_address, table_name, swap_table, quote_pair, dec0, dec1, base_is_token1)
+
+
+def find_pool_gaps(
+    block_client: BlockClient,
+    block_index: BlockTimeIndex,
+    pool: PoolContext,
+    days_back: int,
+) -> list[tuple[int, int]]:
+    """Uncovered block intervals of `pool` (seeds its coverage ledger on first use)."""
+    # The coverage ledger knows every committed range, so internal holes
+    # left by failed fetches or chords are refilled too.
     with SessionLocal() as session:
-        filler = FillQuoteUSDPrices(session, "ETH", days_back=days_back)
-        asyncio.run(filler.fill_missing_prices())
+        coverage = load_coverage(session, pool.pool_slug)
+        seeding = not coverage
+        gaps = block_client.compute_missing_block_ranges(session, pool.table_name, days_back, coverage=coverage)
+        if seeding and coverage:
+            # first run with the ledger: record what the kline table already spans
+            for lo, hi in coverage:
+                record_coverage(session, pool.pool_slug, lo, hi)
+        block_index.flush(session)
+        session.commit()
+    return gaps
 
 
+def stamp_range(ts_resolver: BlockTimestampResolver, raw_logs: list[dict], from_block: int, to_block: int) -> dict:
+    """Stamp `raw_logs` with block timestamps and return the range's resolver stats."""
+    # Stamp every log with its block timestamp in place; the logs carry
+    # it into the decode tasks, so no block map rides along per chunk.
+    ts_resolver.assign_timestamps(raw_logs)
+    stats = {"from_block": from_block, "to_block": to_block, **ts_resolver.last_stats}
+    hit_rate = f"{stats['cache_hits'] / stats['blocks']:.1%}" if stats["cache_hits"] is not None else "n/a"
+    log.info(f"------Timestamps for {stats['blocks']} blocks: {stats['rpc_calls']} RPCs, "
+             f"{stats['round_trips']} round trips, cache hit rate {hit_rate}")
+    return stats
 
-    # ---------------------------------------------------------------------
-    # Instantiate a *single* timestamp resolver so we reuse its internal map
-    # across all block ranges. This cuts RPC calls dramatically vs creating
-    # a new object each loop.
-    # ---------------------------------------------------------------------
-    ts_resolver = BlockTimestampResolver(w3, rpc_url=rpc_url)
 
+def dispatch_range(
+    pool: PoolContext,
+    raw_logs: list[dict],
+    decoder_key: str,
+    rpc_url: str,
+    from_block: int,
+    to_block: int,
+):
+    """
+    Send one range's stamped logs through decode → enrich → aggregate.
+    `decoder_key` names the pool's decode plan (see decoder_registry).
 
-    log.info(f"Extracting data from blocks {start_block} to {end_block} for pool {pool_address}")
+    Small ranges (see local_decode) are decoded right here and go straight
+    to the enrich → aggregate chain; large ones fan out a Celery decode
+    task per chunk with that chain as the chord body.  Enrich runs once
+    per range, so each tx hash is looked up once however many chunks
+    carry it.  Returns the AsyncResult of the aggregate step.
+    """
+    # Minute-aligned chunks sized from the decode cost and worker count.
+    chunks = plan_chunks(raw_logs)
+    enrich_and_aggregate = celery_chain(
+        enrich_range.s(rpc_url).set(queue="enrich"),
+        aggregate_and_upsert.s(pool.table_name, pool.swap_table, pool.quote_pair.lower(),
+                               from_block, to_block),
+    )
+    if local_decode.use_local_decode(len(raw_logs)):
+        log.info(f"------Decoding {len(chunks)} chunks locally")
+        batches = local_decode.decode_chunks(chunks, decoder_key)
+        return enrich_and_aggregate.apply_async(args=(batches,))
+    log.info(f"------Chunked logs into {len(chunks)} chunks")
+    # Build the chord for this range.
+    range_chord = chord(
+        header=[decode_swap_chunk.s(chunk, decoder_key) for chunk in chunks],
+        body=enrich_and_aggregate,
+    )
+    return range_chord.apply_async()
 
-    # Check if we have any gaps in the aggregated data for this pool.
-    with SessionLocal() as session:
-        gaps = blockClient.compute_missing_block_ranges(session, table_name, days_back)
-    if not gaps:
-        log.info("[run_extraction] Up-to-date ✔")
+
+def record_empty_ranges(pool: PoolContext, ranges: list[tuple[int, int]]) -> None:
+    """Ranges without swaps never reach a chord – mark them covered here."""
+    if not ranges:
         return
+    with SessionLocal() as session:
+        for from_block, to_block in ranges:
+            record_coverage(session, pool.pool_slug, from_block, to_block)
+        session.commit()
+
+
+def log_fetch_stats(planner: AdaptiveRangePlanner, limiter: RateLimiter, crawl_seconds: float,
+                    crawled_ranges: int, total_logs: int) -> None:
+    crawl_seconds = max(crawl_seconds, 1e-9)
+    log.info(
+        f"[run_extraction] Crawl throughput: {crawled_ranges / crawl_seconds:.2f} ranges/s, "
+        f"{total_logs / crawl_seconds:.0f} logs/s over {crawl_seconds:.1f}s "
+        f"({LOG_FETCH_CONCURRENCY} in flight, {limiter.rate:g} calls/s cap)"
+    )
+    fetch_stats = planner.summary()
+    calls_per_day = fetch_stats["calls_per_day"]
+    log.info(
+        f"[run_extraction] eth_getLogs: {fetch_stats['calls']} calls ({fetch_stats['splits']} splits), "
+        f"{fetch_stats['logs_per_call']:.0f} logs/call, {fetch_stats['logs_per_sec']:.0f} logs/s, "
+        f"{f'{calls_per_day:.1f}' if calls_per_day is not None else 'n/a'} calls/day of history, "
+        f"final step {fetch_stats['step']} blocks"
+    )
 
-    total_logs = 0
-    # Celery chord chain that we build incrementally so the tasks execute in
-    # the same order as the ranges we crawl.
-    for gap_start, gap_end in gaps:
-        log.info(f"Processing gap from {gap_start} to {gap_end}")
-        for from_block, to_block in blockClient.walk_block_ranges(gap_start, gap_end, step=step):
-            range_time = time.time()
-            log.info(f"Processing block range: {from_block} to {to_block}")
-            
-            raw_logs = fetch_logs(w3, pool_address, from_block, to_block, [swap_topic])
-            raw_logs = [sanitize_log(log) for log in raw_logs]
-            len_of_logs = len(raw_logs)
-            total_logs += len_of_logs
-            log.info(f"----Fetched {len_of_logs} logs from blocks {from_block} to {to_block}")
-            if not raw_logs:
-                continue
-            
-            # Resolve/create timestamps in‑batch (adds to resolver's cache internally).
-            block_cache = ts_resolver.assign_timestamps(raw_logs)
-
-            # Split into chunks to leverage CPU cores / asyncio workers.
-            max_workers = 8
-            log_chunks = min(max_workers, max(1, (len_of_logs + 99) // 200))
-            chunks = chunk_logs(raw_logs, n_chunks=log_chunks)
-            log.info(f"------Chunked logs into {len(chunks)} chunks")
-            # Build the chord for this range.
-            range_chord = chord(
-                header=[ 
-                    celery_chain(
-                        decode_log_chunk_fn.s(chunk, block_cache, swap_abi,
-                                            dec0, dec1, base_is_token1),
-                        enrich_tx_batch.s(rpc_url).set(queue="enrich"),
-                    )
-                    for chunk in chunks 
-                ],
-                body = aggregate_and_upsert.s(table_name, swap_table, quote_pair.lower())
-            )
-            range_chord.apply_async()
-            range_duration = time.time() - range_time
-            log.info(f"----------Chord finished for blocks {from_block} to {to_block} duration: {range_duration:.2f}s")
-    # ---------------------------------------------------------------------
+
+def finalize_pool(
+    pool: PoolContext,
+    block_range: str,
+    total_logs: int,
+    duration: float,
+    range_stats: list[dict],
+) -> None:
+    """Post-crawl cleanup, run metrics and wallet / flow crunching for one pool."""
+    table_name, swap_table, quote_pair = pool.table_name, pool.swap_table, pool.quote_pair
 
     # Cleanup: delete any price anomalies from the aggregated table.
     del_mins = delete_price_anomalies_with_retry(table_name)
@@ -174,15 +246,15 @@ def run_evm_orchestration(
     # with SessionLocal() as db:
     #     crunch_metrics_for_table(db,table_name)
     #     log.info(f"[run_extraction] Metrics crunching completed for {table_name}")
-    duration = time.time() - start_ts
     #     db.commit()
     with SessionLocal() as db:
         log_extraction_metrics(
             db,
-            block_range=f"{start_block}-{end_block}",
+            block_range=block_range,
             log_count=total_logs,
             duration_seconds=duration,
-            table_name=table_name
+            table_name=table_name,
+            range_stats=range_stats,
         )
         db.commit()
     with SessionLocal() as db:
@@ -200,8 +272,164 @@ def run_evm_orchestration(
         )
         db.commit()
 
+
+def make_planner(chain: str, step: int, target_logs: int) -> AdaptiveRangePlanner:
+    # Window sizes follow the log density; oversized windows are split.
+    return AdaptiveRangePlanner(
+        step,
+        target_logs=target_logs,
+        max_step=MAX_BLOCKS_PER_CALL.get(chain, 1_000_000),
+        block_time=BLOCK_TIME_SECONDS.get(chain),
+    )
+
+
+def crawl_ranges(planner: AdaptiveRangePlanner, gap_start: int, gap_end: int, fetch):
+    """
+    Yield (from_block, to_block, logs | None) over the gap.
+
+    The next LOG_FETCH_CONCURRENCY windows are fetched on worker threads
+    while the current one is stamped and dispatched; results still come
+    back in block order so upserts keep the crawl order.
+    """
+    windows = planner.plan(gap_start, gap_end)
+    fetch_window = lambda window: planner.fetch(*window, fetch)
+    for _, pieces in prefetch_ordered(windows, fetch_window, LOG_FETCH_CONCURRENCY):
+        yield from pieces
+
+
+def run_evm_orchestration(
+        rpc_url: str,
+        pool_address: str,
+        swap_topic: str,
+        swap_abi: dict,
+        chain: str = "arbitrum",
+        dex: str = "uniswap",
+        pair: str = "ARB/USDC",
+        days_back: int = 1, 
+        step: int = 1000,
+        logs_per_call: int | None = None,
+        ) -> None:
+    """End‑to‑end swap log extraction → minute‑level OHLCV aggregation.
+
+    Parameters
+    ----------
+    pool_address : str
+        Uniswap‑style pool address (checksum format).
+    days_back : int, default 1
+        How many days of history to backfill.
+    step : int, default 1_000
+        Initial number of blocks per crawl chunk; adapted to log density.
+    logs_per_call : int | None, default None
+        Target logs per eth_getLogs call (falls back to the pool override,
+        then LOGS_PER_CALL_TARGET).
+    db : sqlalchemy.orm.Session | None, default None
+        The DB session if needed downstream (kept for interface parity).
+    """
+
+    start_ts = time.time()
+    w3 = get_web3_client(rpc_url)
+    blockClient, block_index = open_block_client(w3, chain, rpc_url, days_back)
+
+    # ---------------------------------------------------------------------
+    # Resolve the block range we need to crawl.
+    # ---------------------------------------------------------------------
+    target_time = datetime.utcnow() - timedelta(days=days_back)
+    target_ts = int(target_time.timestamp())
+    log.info(f"Target timestamp for extraction: {target_ts} ({target_time})")
+    start_block = blockClient.find_block_by_timestamp(target_ts)
+    end_block = blockClient.get_latest_block()
+
+    # ---------------------------------------------------------------------
+    # Inspect the pool (symbols, decimals) & verify aggregation table exists.
+    # ---------------------------------------------------------------------
+    pool = prepare_pool(w3, chain, dex, pair, pool_address)
+    decoder_key = plan_key(swap_abi, pool.dec0, pool.dec1, pool.base_is_token1)
+
+    # we will implement this later it is too translate quote token to USD (we have to pull USD proces by 8h time buckets 
+    # very useful for non usd quoted items)
+    
+    # log.info(f"Using table: {table_name} for {token0}/{token1} pair")
+    with SessionLocal() as session:
+        filler = FillQuoteUSDPrices(session, "ETH", days_back=days_back)
+        asyncio.run(filler.fill_missing_prices())
+
+    ts_resolver = make_timestamp_resolver(w3, chain, rpc_url)
+
+    log.info(f"Extracting data from blocks {start_block} to {end_block} for pool {pool_address}")
+
+    # Check if we have any gaps in the aggregated data for this pool.
+    gaps = find_pool_gaps(blockClient, block_index, pool, days_back)
+    log.info(f"Block search used {blockClient.rpc_calls} RPCs in {blockClient.round_trips} round trips "
+             f"({len(block_index)} indexed checkpoints)")
+    if not gaps:
+        log.info("[run_extraction] Up-to-date ✔")
+        return
+
+    total_logs = 0
+    range_stats = []
+    empty_ranges = []
+    failed_ranges = 0
+    planner = make_planner(
+        chain, step,
+        logs_per_call or POOL_LOGS_PER_CALL_TARGET.get(pool_address.lower(), LOGS_PER_CALL_TARGET),
+    )
+    limiter = RateLimiter(RPC_CALLS_PER_SECOND.get(chain, 8))
+    # caps the chords in flight; the crawl waits here when workers fall behind
+    throttle = chord_throttle(pool.pool_slug)
+
+    def fetch(lo: int, hi: int):
+        limiter.acquire()
+        return fetch_logs_raw(rpc_url, pool_address, lo, hi, [swap_topic])
+
+    crawl_started = time.time()
+    crawled_ranges = 0
+    senders_before = sender_stats()
+
+    # Celery chord chain that we build incrementally so the tasks execute in
+    # the same order as the ranges we crawl.
+    for gap_start, gap_end in gaps:
+        log.info(f"Processing gap from {gap_start} to {gap_end}")
+        for from_block, to_block, raw_logs in crawl_ranges(planner, gap_start, gap_end, fetch):
+            range_time = time.time()
+            range_started = time.monotonic()
+            crawled_ranges += 1
+            log.info(f"Processing block range: {from_block} to {to_block}")
+            
+            if raw_logs is None:
+                # left out of the coverage ledger → retried on the next run
+                failed_ranges += 1
+                continue
+            len_of_logs = len(raw_logs)
+            total_logs += len_of_logs
+            log.info(f"----Fetched {len_of_logs} logs from blocks {from_block} to {to_block}")
+            if not raw_logs:
+                empty_ranges.append((from_block, to_block))
+                continue
+            
+            range_stats.append(stamp_range(ts_resolver, raw_logs, from_block, to_block))
+            throttle.submit(
+                from_block, to_block,
+                lambda: dispatch_range(pool, raw_logs, decoder_key, rpc_url, from_block, to_block),
+                started=range_started,
+            )
+            range_duration = time.time() - range_time
+            log.info(f"----------Chord dispatched for blocks {from_block} to {to_block} duration: {range_duration:.2f}s")
+    # ---------------------------------------------------------------------
+
+    record_empty_ranges(pool, empty_ranges)
+    # finalize_pool cleans / crunches the tables – let the chords land first
+    throttle.drain()
+    throttle.log_summary()
+    log_sender_stats(senders_before, sender_stats(), "run_extraction")
+    if failed_ranges:
+        log.warning(f"[run_extraction] {failed_ranges} block ranges failed to fetch; left for the next run")
+    log_fetch_stats(planner, limiter, time.time() - crawl_started, crawled_ranges, total_logs)
+
+    duration = time.time() - start_ts
+    finalize_pool(pool, f"{start_block}-{end_block}", total_logs, duration, range_stats)
+
     # ---------------------------------------------------------------------
     # Finalize: print duration and return.
     log.info(f"[run_extraction] Completed setup in {duration:.2f}s")
     log.info(f"[run_extraction] Total logs processed: {total_logs}")
-        
\ No newline at end of file
+        
@@ -0,0 +1,68 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every fetch thread hitting one provider:
+    at most `rate` calls per second on average, bursts of up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def prefetch_ordered(
+    items: Iterable[T],
+    fn: Callable[[T], R],
+    max_in_flight: int = 4,
+) -> Iterator[tuple[T, R]]:
+    """
+    Run `fn` over `items` on a thread pool with at most `max_in_flight`
+    calls outstanding, yielding (item, result) strictly in input order.
+
+    Items are pulled lazily, so the next K are being fetched while the
+    caller is still handling the current one.  An exception raised by `fn`
+    surfaces when its item's turn comes.
+    """
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be >= 1, got {max_in_flight}")
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="prefetch") as pool:
+        window: deque = deque()
+        for item in items:
+            window.append((item, pool.submit(fn, item)))
+            if len(window) >= max_in_flight:
+                break
+        while window:
+            item, future = window.popleft()
+            result = future.result()
+            # top the window back up before handing the result over
+            for nxt in items:
+                window.append((nxt, pool.submit(fn, nxt)))
+                break
+            yield item, result
@@ -0,0 +1,133 @@
+from typing import Callable, Iterator, List
+import threading
+import time
+import logging
+
+from app.sources.dex_data_pipeline.evm.utils.events import LogRangeTooLarge
+
+logger = logging.getLogger(__name__)
+
+DAY = 86_400
+
+FetchFn = Callable[[int, int], List | None]
+
+
+class AdaptiveRangePlanner:
+    """
+    Sizes eth_getLogs windows from the log density seen so far.
+
+    • After every successful call the next window is set to
+      `target_logs / density`, growing by at most `growth`× per call (quiet
+      pools quickly reach `max_step`, busy ones settle near the target).
+    • A provider "too many results" error (`LogRangeTooLarge`) halves the
+      window and the range is retried as two halves, recursively.
+
+    `plan()` yields windows lazily, so each one uses the latest step size.
+    Stats are guarded by a lock so `fetch()` may run on several threads.
+    """
+
+    def __init__(
+        self,
+        step: int,
+        target_logs: int = 2_000,
+        min_step: int = 1,
+        max_step: int = 1_000_000,
+        growth: float = 2.0,
+        block_time: float | None = None,
+    ):
+        if not 1 <= min_step <= max_step:
+            raise ValueError(f"Invalid step bounds [{min_step}, {max_step}]")
+        self.target_logs = target_logs
+        self.min_step = min_step
+        self.max_step = max_step
+        self.growth = growth
+        self.block_time = block_time
+        self.step = self._clamp(step)
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.splits = 0
+        self.failed = 0
+        self.logs = 0
+        self.blocks = 0
+        self.fetch_seconds = 0.0
+
+    def _clamp(self, step: float) -> int:
+        return max(self.min_step, min(self.max_step, int(step)))
+
+    def plan(self, start: int, end: int) -> Iterator[tuple[int, int]]:
+        """Consecutive windows covering [start, end] (inclusive)."""
+        cursor = start
+        while cursor <= end:
+            to_block = min(cursor + self.step - 1, end)
+            yield cursor, to_block
+            cursor = to_block + 1
+
+    def observe(self, blocks: int, n_logs: int) -> None:
+        """Resize the window from a successful call over `blocks` blocks."""
+        with self._lock:
+            if n_logs == 0:
+                wanted = self.step * self.growth
+            else:
+                wanted = min(self.target_logs * blocks / n_logs, self.step * self.growth)
+            self.step = self._clamp(wanted)
+
+    def fetch(self, from_block: int, to_block: int, fetch_fn: FetchFn) -> list[tuple[int, int, List | None]]:
+        """
+        Fetch [from_block, to_block] with `fetch_fn`, splitting on
+        `LogRangeTooLarge`.  Returns (from, to, logs) pieces in block order;
+        logs is None for a piece that failed (or cannot be split further).
+        """
+        pieces = []
+        pending = [(from_block, to_block)]
+        while pending:
+            lo, hi = pending.pop()
+            t0 = time.perf_counter()
+            try:
+                logs = fetch_fn(lo, hi)
+            except LogRangeTooLarge as exc:
+                self._account(time.perf_counter() - t0)
+                if lo == hi:
+                    logger.error(f"Block {lo} alone exceeds the provider's log limit: {exc}")
+                    with self._lock:
+                        self.failed += 1
+                    pieces.append((lo, hi, None))
+                    continue
+                mid = (lo + hi) // 2
+                with self._lock:
+                    self.splits += 1
+                    self.step = self._clamp(min(self.step, mid - lo + 1))
+                logger.info(f"----Range {lo}-{hi} too large, splitting at {mid} (step → {self.step})")
+                pending.append((mid + 1, hi))
+                pending.append((lo, mid))  # LIFO: lower half first keeps block order
+                continue
+
+            self._account(time.perf_counter() - t0, logs=logs, blocks=hi - lo + 1, failed=logs is None)
+            if logs is not None:
+                self.observe(hi - lo + 1, len(logs))
+            pieces.append((lo, hi, logs))
+        return pieces
+
+    def _account(self, seconds: float, logs: List | None = None, blocks: int = 0, failed: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.fetch_seconds += seconds
+            self.failed += failed
+            if logs is not None:
+                self.logs += len(logs)
+                self.blocks += blocks
+
+    def summary(self) -> dict:
+        """Achieved throughput – logs/sec of fetch time and calls per day of history."""
+        days = self.blocks * self.block_time / DAY if self.block_time else None
+        return {
+            "calls": self.calls,
+            "splits": self.splits,
+            "failed": self.failed,
+            "logs": self.logs,
+            "blocks": self.blocks,
+            "step": self.step,
+            "logs_per_call": self.logs / self.calls if self.calls else 0.0,
+            "logs_per_sec": self.logs / self.fetch_seconds if self.fetch_seconds else 0.0,
+            "calls_per_day": self.calls / days if days else None,
+        }
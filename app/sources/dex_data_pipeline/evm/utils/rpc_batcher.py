@@ -0,0 +1,183 @@
+"""
+Concurrent JSON-RPC batches over pooled keep-alive connections.
+
+The enrich lookups used to post their batches one after another through
+`requests.post` – a new TCP/TLS connection each, so a 2,000-hash chunk
+was 20 serialized round trips, and one failed sub-request retried the
+whole Celery task.  An RpcBatcher instead
+
+* sends a call's batches concurrently (at most RPC_MAX_CONCURRENCY on
+  the wire) through one httpx.Client per provider and worker process,
+  so connections stay open across tasks;
+* draws every sub-request from the provider's RateBudget (a token bucket
+  of RPC_RATE_PER_SECOND per worker process – the task rate_limit only
+  caps how often tasks start, not how many requests each sends);
+* re-sends only the sub-requests that failed – an error object, or the
+  whole batch on a transport / HTTP error – up to RPC_SUBREQUEST_ATTEMPTS
+  times, then raises RpcError so the task can still retry as before.
+
+A null result is an answer (unknown tx, missing block), not a failure.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.sources.dex_data_pipeline.config.settings import (
+    RPC_MAX_CONCURRENCY,
+    RPC_RATE_PER_SECOND,
+    RPC_SUBREQUEST_ATTEMPTS,
+)
+from app.sources.dex_data_pipeline.evm.utils.events import RpcError
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 100                     # Alchemy hard-limit per JSON-RPC batch
+RETRY_DELAY = 0.5                    # seconds, doubled each round
+
+_lock = threading.Lock()
+_clients: dict[str, httpx.Client] = {}
+_budgets: dict[str, "RateBudget"] = {}
+_executor: ThreadPoolExecutor | None = None
+
+
+class RateBudget:
+    """Token bucket: `rate` sub-requests per second, bursts up to one second's worth."""
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = rate
+        self.updated = clock()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int) -> None:
+        """Block until `n` tokens are available, then take them."""
+        n = min(n, self.capacity)
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            self.waited += wait
+            self.sleep(wait)
+
+
+class BatchOutcome(NamedTuple):
+    results: list[Any]       # one per call, in order (None = null result)
+    posts: int               # HTTP round trips, retries included
+    retried: int             # sub-requests sent more than once
+
+
+def _provider(rpc_url: str) -> str:
+    return urlsplit(rpc_url).netloc
+
+
+def http_client(rpc_url: str) -> httpx.Client:
+    """This process's keep-alive client for the provider behind `rpc_url`."""
+    with _lock:
+        client = _clients.get(_provider(rpc_url))
+        if client is None:
+            limits = httpx.Limits(max_connections=RPC_MAX_CONCURRENCY,
+                                  max_keepalive_connections=RPC_MAX_CONCURRENCY)
+            client = _clients[_provider(rpc_url)] = httpx.Client(limits=limits, timeout=10)
+        return client
+
+
+def rate_budget(rpc_url: str) -> RateBudget:
+    """This process's rate budget for the provider behind `rpc_url`."""
+    with _lock:
+        budget = _budgets.get(_provider(rpc_url))
+        if budget is None:
+            budget = _budgets[_provider(rpc_url)] = RateBudget(RPC_RATE_PER_SECOND)
+        return budget
+
+
+def _pool() -> ThreadPoolExecutor:
+    # created on first use, i.e. after the prefork worker has forked
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(RPC_MAX_CONCURRENCY, thread_name_prefix="rpc")
+        return _executor
+
+
+class RpcBatcher:
+    def __init__(self, rpc_url: str, client: httpx.Client | None = None, budget: RateBudget | None = None,
+                 batch_size: int = BATCH_SIZE, attempts: int = RPC_SUBREQUEST_ATTEMPTS,
+                 retry_delay: float = RETRY_DELAY, sleep: Callable[[float], None] = time.sleep):
+        self.rpc_url = rpc_url
+        self.client = http_client(rpc_url) if client is None else client
+        self.budget = rate_budget(rpc_url) if budget is None else budget
+        self.batch_size = batch_size
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.sleep = sleep
+
+    def _post(self, calls: list[tuple[int, str, list]]) -> dict[int, tuple[bool, Any]]:
+        """One batch → {call index: (ok, result or error)}."""
+        self.budget.acquire(len(calls))
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params} for i, method, params in calls]
+        try:
+            resp = self.client.post(self.rpc_url, json=payload)
+            resp.raise_for_status()
+            body = resp.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            return {i: (False, exc) for i, _, _ in calls}
+        if not isinstance(body, list):        # provider answered the batch with a single error
+            return {i: (False, body.get("error", body)) for i, _, _ in calls}
+        answers = {i: (False, "no response") for i, _, _ in calls}
+        for item in body:
+            if item.get("id") in answers:
+                error = item.get("error")
+                answers[item["id"]] = (False, error) if error else (True, item.get("result"))
+        return answers
+
+    def call_many(self, calls: list[tuple[str, list]]) -> BatchOutcome:
+        """Results of `calls` ((method, params) pairs), in order."""
+        results: list[Any] = [None] * len(calls)
+        pending = [(i, method, params) for i, (method, params) in enumerate(calls)]
+        posts = retried = 0
+        for attempt in range(self.attempts):
+            if attempt:
+                retried += len(pending)
+                self.sleep(self.retry_delay * 2 ** (attempt - 1))
+            batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            answers: dict[int, tuple[bool, Any]] = {}
+            if len(batches) == 1:
+                answers.update(self._post(batches[0]))
+            else:
+                for batch_answers in _pool().map(self._post, batches):
+                    answers.update(batch_answers)
+            posts += len(batches)
+            failed = []
+            for call in pending:
+                ok, value = answers[call[0]]
+                if ok:
+                    results[call[0]] = value
+                else:
+                    failed.append(call)
+            if not failed:
+                return BatchOutcome(results, posts, retried)
+            log.debug(f"{len(failed)}/{len(pending)} sub-requests failed (attempt {attempt + 1}): "
+                      f"{answers[failed[0][0]][1]}")
+            pending = failed
+        raise RpcError(f"{len(pending)} of {len(calls)} sub-requests still failing after "
+                       f"{self.attempts} attempts: {answers[pending[0][0]][1]}")
+
+
+def rpc_batcher(rpc_url: str, batch_size: int = BATCH_SIZE) -> RpcBatcher:
+    """Batcher on this process's pooled client and rate budget for `rpc_url`."""
+    return RpcBatcher(rpc_url, batch_size=batch_size)
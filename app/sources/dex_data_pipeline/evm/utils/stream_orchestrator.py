@@ -0,0 +1,193 @@
+"""
+Streaming backfill of one pool, without Celery chords.
+
+    fetch → timestamp → decode → enrich → write
+
+Each block range flows through the stages of a StreamPipeline (one
+thread per stage, bounded queues in between), so fetching range N+1
+overlaps decoding range N and upserting range N-1, while at most
+STREAM_QUEUE_SIZE ranges wait in front of any stage – memory stays flat
+however many days are backfilled.  Decode, enrich and upsert call the
+same functions the Celery tasks run, in process, and ranges are written
+in block order.  Per-stage throughput and queue depth are logged every
+STREAM_REPORT_SECONDS and at the end.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from app.sources.dex_data_pipeline.config.settings import (
+    LOGS_PER_CALL_TARGET,
+    POOL_LOGS_PER_CALL_TARGET,
+    RPC_CALLS_PER_SECOND,
+    STREAM_QUEUE_SIZE,
+    STREAM_REPORT_SECONDS,
+)
+from app.sources.dex_data_pipeline.evm.utils import local_decode
+from app.sources.dex_data_pipeline.evm.utils.chunk_planner import plan_chunks
+from app.sources.dex_data_pipeline.evm.utils.client import get_web3_client
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_key
+from app.sources.dex_data_pipeline.evm.utils.enrich_tx_batch import RETRIES, enrich_batches
+from app.sources.dex_data_pipeline.evm.utils.events import fetch_logs_raw
+from app.sources.dex_data_pipeline.evm.utils.orchestrator import (
+    PoolContext,
+    crawl_ranges,
+    finalize_pool,
+    find_pool_gaps,
+    log_fetch_stats,
+    make_planner,
+    make_timestamp_resolver,
+    open_block_client,
+    prepare_pool,
+    stamp_range,
+)
+from app.sources.dex_data_pipeline.evm.utils.prefetch import RateLimiter
+from app.sources.dex_data_pipeline.evm.utils.tx_senders import log_sender_stats, sender_stats
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggregator_and_upsert_handler import aggregate_and_upsert
+from app.sources.dex_data_pipeline.utils.find_quote_usd_prices import FillQuoteUSDPrices
+from app.sources.dex_data_pipeline.utils.stream_pipeline import Stage, StreamPipeline
+from app.storage.db import SessionLocal
+
+log = logging.getLogger(__name__)
+
+
+class RangeWork(NamedTuple):
+    """One block range on its way through the stream."""
+    from_block: int
+    to_block: int
+    logs: list[dict]
+    batches: list = []
+
+
+def _with_retries(fn, *args, attempts: int = RETRIES + 1, delay: float = 3.0):
+    # Celery retries the tasks for us; called in process we back off here.
+    for attempt in range(attempts):
+        try:
+            return fn(*args)
+        except Exception as exc:
+            if attempt == attempts - 1:
+                raise
+            log.warning(f"[stream] {getattr(fn, 'name', None) or fn.__name__} failed ({exc}); retrying in {delay:g}s")
+            time.sleep(delay)
+            delay *= 2
+
+
+def pool_stages(pool: PoolContext, decoder_key: str, rpc_url: str, ts_resolver,
+                range_stats: list[dict], retry_delay: float = 3.0) -> list[Stage]:
+    """timestamp → decode → enrich → write stages for one pool's RangeWork items."""
+
+    def timestamp(work: RangeWork) -> RangeWork:
+        if work.logs:
+            range_stats.append(stamp_range(ts_resolver, work.logs, work.from_block, work.to_block))
+        return work
+
+    def decode(work: RangeWork) -> RangeWork:
+        if not work.logs:
+            return work
+        chunks = plan_chunks(work.logs, workers=local_decode.worker_count())
+        batches = local_decode.decode_chunks(chunks, decoder_key)
+        return work._replace(logs=[], batches=batches)   # drop the raw logs early
+
+    def enrich(work: RangeWork) -> RangeWork:
+        # one sender lookup for the whole range, not one per chunk
+        return work._replace(batches=_with_retries(enrich_batches, work.batches, rpc_url, delay=retry_delay))
+
+    def write(work: RangeWork) -> RangeWork:
+        # also records the range as covered – empty ranges included
+        _with_retries(aggregate_and_upsert, work.batches, pool.table_name, pool.swap_table,
+                      pool.quote_pair.lower(), work.from_block, work.to_block, delay=retry_delay)
+        return work
+
+    swaps = lambda work: sum(len(batch) for batch in work.batches)
+    return [
+        Stage("timestamp", timestamp, lambda work: len(work.logs)),
+        Stage("decode", decode, swaps),
+        Stage("enrich", enrich, swaps),
+        Stage("write", write, swaps),
+    ]
+
+
+def run_pool_stream(
+        rpc_url: str,
+        pool_address: str,
+        swap_topic: str,
+        swap_abi: dict,
+        chain: str = "arbitrum",
+        dex: str = "uniswap",
+        pair: str = "ARB/USDC",
+        days_back: int = 1,
+        step: int = 1000,
+        logs_per_call: int | None = None,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        ) -> None:
+    """
+    Backfill one pool like `run_evm_orchestration`, but decode, enrich and
+    upsert in this process through a bounded stream instead of a chord
+    per range.  Ranges that fail to fetch are skipped and left out of the
+    coverage ledger, so the next run retries them.
+    """
+    start_ts = time.time()
+    w3 = get_web3_client(rpc_url)
+    block_client, block_index = open_block_client(w3, chain, rpc_url, days_back)
+
+    target_time = datetime.utcnow() - timedelta(days=days_back)
+    start_block = block_client.find_block_by_timestamp(int(target_time.timestamp()))
+    end_block = block_client.get_latest_block()
+
+    pool = prepare_pool(w3, chain, dex, pair, pool_address)
+    decoder_key = plan_key(swap_abi, pool.dec0, pool.dec1, pool.base_is_token1)
+    with SessionLocal() as session:
+        filler = FillQuoteUSDPrices(session, "ETH", days_back=days_back)
+        asyncio.run(filler.fill_missing_prices())
+    ts_resolver = make_timestamp_resolver(w3, chain, rpc_url)
+
+    gaps = find_pool_gaps(block_client, block_index, pool, days_back)
+    if not gaps:
+        log.info("[stream] Up-to-date ✔")
+        return
+    log.info(f"[stream] Streaming {len(gaps)} gaps of {pool_address} (blocks {start_block}-{end_block})")
+
+    planner = make_planner(
+        chain, step,
+        logs_per_call or POOL_LOGS_PER_CALL_TARGET.get(pool_address.lower(), LOGS_PER_CALL_TARGET),
+    )
+    limiter = RateLimiter(RPC_CALLS_PER_SECOND.get(chain, 8))
+
+    def fetch(lo: int, hi: int):
+        limiter.acquire()
+        return fetch_logs_raw(rpc_url, pool_address, lo, hi, [swap_topic])
+
+    counts = {"ranges": 0, "failed": 0, "logs": 0}
+
+    def ranges():
+        for gap_start, gap_end in gaps:
+            for from_block, to_block, raw_logs in crawl_ranges(planner, gap_start, gap_end, fetch):
+                counts["ranges"] += 1
+                if raw_logs is None:
+                    counts["failed"] += 1
+                    continue
+                counts["logs"] += len(raw_logs)
+                yield RangeWork(from_block, to_block, raw_logs)
+
+    range_stats: list[dict] = []
+    pipeline = StreamPipeline(pool_stages(pool, decoder_key, rpc_url, ts_resolver, range_stats),
+                              queue_size=queue_size, source_name="fetch",
+                              source_units=lambda work: len(work.logs))
+    crawl_started = time.time()
+    senders_before = sender_stats()
+    try:
+        pipeline.run(ranges(), report_every=STREAM_REPORT_SECONDS)
+    finally:
+        pipeline.report()
+        local_decode.shutdown()
+
+    if counts["failed"]:
+        log.warning(f"[stream] {counts['failed']} block ranges failed to fetch; left for the next run")
+    log_fetch_stats(planner, limiter, time.time() - crawl_started, counts["ranges"], counts["logs"])
+    log_sender_stats(senders_before, sender_stats(), "stream")
+
+    duration = time.time() - start_ts
+    finalize_pool(pool, f"{start_block}-{end_block}", counts["logs"], duration, range_stats)
+    log.info(f"[stream] Completed {counts['logs']} logs in {duration:.2f}s")
@@ -0,0 +1,243 @@
+"""
+tx hash → sender (`from`) lookups shared by every enrich task.
+
+`enrich_tx_batch` needs the EOA behind each swap, one
+eth_getTransactionByHash per transaction.  The same transactions come
+back again and again – re-crawled ranges, and multi-hop routes whose one
+transaction swaps in several of our pools – so lookups go through a
+LayeredCache (worker LRU + Redis, TTL TX_SENDER_CACHE_TTL_SECONDS) and
+only misses reach the node.
+
+Misses are resolved one of two ways: eth_getTransactionByHash per tx, or
+eth_getBlockByNumber (full tx objects) per distinct block, picking the
+senders out locally.  A block costs one sub-request but carries every tx
+in it, so it only pays when several of the batch's swaps share a block;
+`SenderCostModel` prices both from the batch's swaps-per-block density
+and the block sizes seen so far (TX_SENDER_STRATEGY forces either).
+
+Cross-pool dedup: the chain crawler sees every pool's logs of a range at
+once and resolves the hashes that touch more than one pool before the
+per-pool chords go out (`prefetch_shared_senders`), so such a transaction
+is fetched once and every pool's enrich task reads it from the cache.
+
+Hits, misses and RPC round trips are counted in the Redis hash
+`txfrom:stats`; `sender_stats()` before and after a run gives the run's
+hit ratio and the calls the cache saved.
+"""
+import logging
+import math
+import threading
+from typing import Iterable, NamedTuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.sources.dex_data_pipeline.config.settings import (
+    REDIS_URL,
+    TX_SENDER_CACHE_SIZE,
+    TX_SENDER_CACHE_TTL_SECONDS,
+    TX_SENDER_SECONDS_PER_CALL,
+    TX_SENDER_SECONDS_PER_REQUEST,
+    TX_SENDER_SECONDS_PER_TX,
+    TX_SENDER_STRATEGY,
+    TX_SENDER_TXS_PER_BLOCK,
+)
+from app.sources.dex_data_pipeline.evm.utils.rpc_batcher import BATCH_SIZE, rpc_batcher
+from app.utils.layered_cache import LayeredCache
+
+log = logging.getLogger(__name__)
+
+BLOCK_BATCH_SIZE = 20                # full blocks are large; keep responses bounded
+STATS_KEY = "txfrom:stats"
+
+_cache: LayeredCache | None = None
+
+
+def sender_cache() -> LayeredCache:
+    """This process's tx-sender cache (created on first use)."""
+    global _cache
+    if _cache is None:
+        _cache = LayeredCache("txfrom", redis=Redis.from_url(REDIS_URL), maxsize=TX_SENDER_CACHE_SIZE,
+                              ttl=TX_SENDER_CACHE_TTL_SECONDS, decode=bytes.decode)
+    return _cache
+
+
+def tx_key(tx_hash: str) -> str:
+    """Cache / lookup key of a tx hash: lower-case hex without 0x."""
+    return tx_hash.lower().removeprefix("0x")
+
+
+class SenderCostModel:
+    """
+    Estimated seconds to resolve `n_txs` uncached senders spread over
+    `n_blocks` blocks, per strategy:
+
+        tx:    ⌈n_txs / BATCH_SIZE⌉ calls + n_txs × (request + tx object)
+        block: ⌈n_blocks / BLOCK_BATCH_SIZE⌉ calls
+               + n_blocks × (request + txs per block × tx object)
+
+    Txs per block is an exponentially weighted average of the blocks fetched.
+    """
+
+    def __init__(self, seconds_per_call: float = TX_SENDER_SECONDS_PER_CALL,
+                 seconds_per_request: float = TX_SENDER_SECONDS_PER_REQUEST,
+                 seconds_per_tx: float = TX_SENDER_SECONDS_PER_TX,
+                 txs_per_block: float = TX_SENDER_TXS_PER_BLOCK, alpha: float = 0.05):
+        self.seconds_per_call = seconds_per_call
+        self.seconds_per_request = seconds_per_request
+        self.seconds_per_tx = seconds_per_tx
+        self.txs_per_block = txs_per_block
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def tx_cost(self, n_txs: int) -> float:
+        return (math.ceil(n_txs / BATCH_SIZE) * self.seconds_per_call
+                + n_txs * (self.seconds_per_request + self.seconds_per_tx))
+
+    def block_cost(self, n_blocks: int) -> float:
+        return (math.ceil(n_blocks / BLOCK_BATCH_SIZE) * self.seconds_per_call
+                + n_blocks * (self.seconds_per_request + self.txs_per_block * self.seconds_per_tx))
+
+    def strategy(self, n_txs: int, n_blocks: int) -> str:
+        """The strategy estimated cheaper: "block" or "tx" (ties go to "tx")."""
+        return "block" if n_blocks and self.block_cost(n_blocks) < self.tx_cost(n_txs) else "tx"
+
+    def observe_block(self, n_txs: int) -> None:
+        with self._lock:
+            self.txs_per_block += self.alpha * (n_txs - self.txs_per_block)
+
+
+sender_cost = SenderCostModel()
+
+
+def _fetch_senders(keys: list[str], rpc_url: str) -> tuple[dict[str, str], int]:
+    """eth_getTransactionByHash in concurrent batches → ({key: lower-case from}, round trips)."""
+    outcome = rpc_batcher(rpc_url).call_many([("eth_getTransactionByHash", ["0x" + key]) for key in keys])
+    senders = {}
+    for res in outcome.results:
+        if res:
+            senders[tx_key(res["hash"])] = res["from"].lower()
+        # no result: dropped tx, bad hash … → caller stays None, not cached
+    return senders, outcome.posts
+
+
+def _fetch_block_senders(blocks: list[int], wanted: set[str], rpc_url: str) -> tuple[dict[str, str], int]:
+    """eth_getBlockByNumber (full txs) in batches → ({key: from} for `wanted` keys, round trips)."""
+    outcome = rpc_batcher(rpc_url, BLOCK_BATCH_SIZE).call_many(
+        [("eth_getBlockByNumber", [hex(number), True]) for number in blocks])
+    senders = {}
+    for block in outcome.results:
+        if not block:
+            continue
+        sender_cost.observe_block(len(block["transactions"]))
+        for tx in block["transactions"]:
+            if (key := tx_key(tx["hash"])) in wanted:
+                senders[key] = tx["from"].lower()
+    return senders, outcome.posts
+
+
+def _fetch_missing(missing: list[str], block_of: dict[str, int], rpc_url: str) -> tuple[dict[str, str], int]:
+    """Resolve `missing` keys by the cheaper strategy; txs a block didn't contain go per tx."""
+    blocks = sorted({block_of[key] for key in missing if key in block_of})
+    strategy = TX_SENDER_STRATEGY
+    if strategy == "auto":
+        strategy = sender_cost.strategy(len(missing), len(blocks))
+    if strategy != "block" or not blocks:
+        return _fetch_senders(missing, rpc_url)
+
+    senders, calls = _fetch_block_senders(blocks, set(missing), rpc_url)
+    if (rest := [key for key in missing if key not in senders]):
+        more, more_calls = _fetch_senders(rest, rpc_url)
+        senders.update(more)
+        calls += more_calls
+    return senders, calls
+
+
+def _record_stats(cache: LayeredCache, hits: int, misses: int, calls: int) -> None:
+    if cache.redis is None:
+        return
+    try:
+        pipe = cache.redis.pipeline(transaction=False)
+        pipe.hincrby(STATS_KEY, "hits", hits)
+        pipe.hincrby(STATS_KEY, "misses", misses)
+        pipe.hincrby(STATS_KEY, "rpc_calls", calls)
+        pipe.execute()
+    except RedisError:
+        pass
+
+
+class SenderLookup(NamedTuple):
+    senders: dict[str, str]      # tx key → lower-case sender
+    hits: int                    # unique hashes found in the cache
+    misses: int                  # unique hashes sent to the node
+    rpc_calls: int               # batched round trips
+
+
+def resolve_senders(tx_hashes: Iterable[str], rpc_url: str, cache: LayeredCache | None = None,
+                    blocks: Iterable[int] | None = None) -> SenderLookup:
+    """
+    Senders of `tx_hashes` – cache first, one batched RPC pass for the
+    misses, which are then cached.  `blocks` (each hash's block number,
+    in the same order) allows fetching whole blocks instead.  Network
+    errors propagate so the calling task can retry.
+    """
+    cache = sender_cache() if cache is None else cache
+    tx_hashes = list(tx_hashes)
+    block_of = {} if blocks is None else {tx_key(h): b for h, b in zip(tx_hashes, blocks)}
+    keys = list(dict.fromkeys(tx_key(h) for h in tx_hashes))
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    fetched, calls = _fetch_missing(missing, block_of, rpc_url) if missing else ({}, 0)
+    cache.set_many(fetched)
+    _record_stats(cache, len(found), len(missing), calls)
+    return SenderLookup({**found, **fetched}, len(found), len(missing), calls)
+
+
+def lookup_senders(tx_hashes: Iterable[str], rpc_url: str, cache: LayeredCache | None = None,
+                   blocks: Iterable[int] | None = None) -> dict[str, str]:
+    """{tx_key: sender} for `tx_hashes` (see `resolve_senders`)."""
+    return resolve_senders(tx_hashes, rpc_url, cache, blocks).senders
+
+
+def prefetch_shared_senders(rpc_url: str, logs_by_pool: dict[str, list[dict]],
+                            cache: LayeredCache | None = None) -> int:
+    """Resolve the tx hashes seen in more than one pool's logs; returns how many."""
+    seen, shared, block_of = set(), set(), {}
+    for logs in logs_by_pool.values():
+        hashes = {tx_key(log["transactionHash"]) for log in logs}
+        shared |= seen & hashes
+        seen |= hashes
+        block_of.update((tx_key(log["transactionHash"]), log["blockNumber"]) for log in logs)
+    if shared:
+        shared = sorted(shared)
+        try:
+            lookup_senders(shared, rpc_url, cache, [block_of[key] for key in shared])
+        except Exception as exc:   # the enrich tasks will look them up themselves
+            log.warning(f"Prefetching {len(shared)} multi-pool tx senders failed: {exc}")
+    return len(shared)
+
+
+def sender_stats(cache: LayeredCache | None = None) -> dict[str, int] | None:
+    """Cumulative cache hits / misses / RPC calls over all workers (None without Redis)."""
+    cache = sender_cache() if cache is None else cache
+    if cache.redis is None:
+        return None
+    try:
+        raw = cache.redis.hgetall(STATS_KEY)
+    except RedisError:
+        return None
+    stats = {"hits": 0, "misses": 0, "rpc_calls": 0}
+    stats.update({field.decode(): int(value) for field, value in raw.items()})
+    return stats
+
+
+def log_sender_stats(before: dict | None, after: dict | None, label: str) -> None:
+    """Hit ratio and saved calls between two `sender_stats()` snapshots."""
+    if before is None or after is None:
+        return
+    hits, misses, calls = (after[k] - before[k] for k in ("hits", "misses", "rpc_calls"))
+    lookups = hits + misses
+    if not lookups:
+        return
+    log.info(f"[{label}] tx senders: {lookups} lookups, hit ratio {hits / lookups:.1%}, "
+             f"{hits} sender lookups saved, {calls} batched RPC round trips")
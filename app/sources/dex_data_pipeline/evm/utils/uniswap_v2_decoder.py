@@ -1,95 +1,141 @@
 # uniswap_v2_decoder.py
 # --------------------------------------------------------------
-# Decode Uni V2‑style Swap events (Aerodrome vAMM, Camelot V2, etc.)
+# Decode Uni V2‑style Swap events (Aerodrome vAMM, Camelot V2, etc.)
 # --------------------------------------------------------------
-from decimal import Decimal
 from app.celery.celery_app import celery_app
+from app.sources.dex_data_pipeline.evm.utils.abi_words import parse_words, topic_address
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch, amount_scaler, ratio_scaler
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Swap(address indexed sender, uint256 amount0In, uint256 amount1In,
+#      uint256 amount0Out, uint256 amount1Out, address indexed to)
+SWAP_ABI = {
+    "anonymous": False,
+    "inputs": [
+        {"indexed": True, "internalType": "address", "name": "sender", "type": "address"},
+        {"indexed": False, "internalType": "uint256", "name": "amount0In", "type": "uint256"},
+        {"indexed": False, "internalType": "uint256", "name": "amount1In", "type": "uint256"},
+        {"indexed": False, "internalType": "uint256", "name": "amount0Out", "type": "uint256"},
+        {"indexed": False, "internalType": "uint256", "name": "amount1Out", "type": "uint256"},
+        {"indexed": True, "internalType": "address", "name": "to", "type": "address"},
+    ],
+    "name": "Swap",
+    "type": "event",
+}
+SWAP_WORDS = 4
+SWAP_TOPICS = 3
+
+
+def decode_swap_args_fast(logs_chunk: list) -> list[dict | None]:
+    """
+    Swap args for a whole chunk, sliced straight from the 4×uint256 payload.
+    Entries are None where the log does not have the V2 Swap layout.
+    """
+    words, topics = parse_words(logs_chunk, SWAP_WORDS, SWAP_TOPICS)
+    return [
+        None if w is None else {
+            "sender": topic_address(t[1]),
+            "to": topic_address(t[2]),
+            "amount0In": w[0],
+            "amount1In": w[1],
+            "amount0Out": w[2],
+            "amount1Out": w[3],
+        }
+        for w, t in zip(words, topics)
+    ]
+
+
+def swap_builder(dec0: int, dec1: int, base_is_token1: bool):
+    """
+    `build(logs_chunk, args_list) -> SwapBatch` for one pool's decimals and
+    orientation, in integer fixed-point math – no Decimal until the DB
+    insert.  Scalers are bound once; see decoder_registry for the cache.
+    """
+    # ------------------------------------------------------------------
+    # Map to base / quote once for the pool
+    # ------------------------------------------------------------------
+    if base_is_token1:                           # token1 = base, token0 = quote
+        base_in_key, base_out_key, dec_base = "amount1In", "amount1Out", dec1
+        quote_in_key, quote_out_key, dec_quote = "amount0In", "amount0Out", dec0
+    else:                                        # token0 = base, token1 = quote
+        base_in_key, base_out_key, dec_base = "amount0In", "amount0Out", dec0
+        quote_in_key, quote_out_key, dec_quote = "amount1In", "amount1Out", dec1
+    scale_base, scale_quote = amount_scaler(dec_base), amount_scaler(dec_quote)
+    # quote per base = (quote raw / 10**dec_quote) / (base raw / 10**dec_base)
+    price = ratio_scaler(dec_base - dec_quote)
+
+    def build(logs_chunk: list, args_list: list[dict]) -> SwapBatch:
+        # Net flows, signed like the V3 decoder's (out of the pool minus
+        # into it); a route paying in with both tokens nets out to the
+        # traded legs.
+        base_delta_raw = [args[base_out_key] - args[base_in_key] for args in args_list]
+        quote_delta_raw = [args[quote_out_key] - args[quote_in_key] for args in args_list]
+        if not all(base_delta_raw) or not all(quote_delta_raw):
+            # no net base or quote moved → no execution price; not a trade
+            keep = [i for i, (b, q) in enumerate(zip(base_delta_raw, quote_delta_raw)) if b and q]
+            logger.debug("skipping %d V2 swaps without a net trade", len(args_list) - len(keep))
+            logs_chunk, args_list = [logs_chunk[i] for i in keep], [args_list[i] for i in keep]
+            base_delta_raw = [base_delta_raw[i] for i in keep]
+            quote_delta_raw = [quote_delta_raw[i] for i in keep]
+        interned = SwapBatch()
+        sender = [interned.intern(args["sender"]) for args in args_list]
+        recipient = [interned.intern(args["to"]) for args in args_list]
+
+        return SwapBatch(
+            interned.addresses,
+            block_number=[log["blockNumber"] for log in logs_chunk],
+            timestamp=[log["timestamp"] for log in logs_chunk],
+            tx_hash=[log["transactionHash"] for log in logs_chunk],
+            log_index=[log["logIndex"] for log in logs_chunk],
+            sender=sender,
+            recipient=recipient,
+            base_delta=[scale_base(d) for d in base_delta_raw],
+            quote_delta=[scale_quote(d) for d in quote_delta_raw],
+            # Execution price: quote moved per base moved
+            price=[price(abs(q), abs(b)) for q, b in zip(quote_delta_raw, base_delta_raw)],
+            # liquidity / tick: not in the V2 event
+            liquidity=[None] * len(args_list),
+            tick=[None] * len(args_list),
+            # Wallet bought base if it *spent* quote (negative quote_delta_raw)
+            is_buy=[d < 0 for d in quote_delta_raw],
+        )
+    return build
+
+
+def swaps_from_args(
+    logs_chunk: list,
+    args_list: list[dict],
+    dec0: int,
+    dec1: int,
+    base_is_token1: bool,
+) -> SwapBatch:
+    """Columnar *raw_swaps* batch from decoded V2 Swap args."""
+    return swap_builder(dec0, dec1, base_is_token1)(logs_chunk, args_list)
+
 
 @celery_app.task(name="uniswap_v2_decode_log_chunk")
 def decode_log_chunk(
     logs_chunk: list,
-    block_cache: dict,
     abi: dict,
     dec0: int,
     dec1: int,
     base_is_token1: bool,
 ):
     """
-    Decode V2 Swap events → per‑swap dicts for *raw_swaps*.
+    Decode V2 Swap events → columnar SwapBatch for *raw_swaps*.
 
     ── No USD conversion here (done downstream).
-    ── Signed flows (pool perspective) preserved so wallet
-       perspective can be inferred later.
+    ── Signed flows with the V3 decoder's convention (token out of the
+       pool minus token into it), so buys and sells read the same.
+    ── Price is net quote moved per net base moved; a swap that moves
+       no net base or quote is not a trade and is skipped.
+    ── Each log carries its block `timestamp` (set by BlockTimestampResolver).
+    ── Data words are sliced directly; `get_event_data` only runs for
+       logs with another layout (and one cross-check per chunk).
     """
-    from web3 import Web3
-    from web3._utils.events import get_event_data
-    codec = Web3().codec
-
-    # Decimal scaling helpers
-    d0 = Decimal(10) ** dec0  # token0 divisor
-    d1 = Decimal(10) ** dec1  # token1 divisor
-
-    out: list[dict] = []
-    for log in logs_chunk:
-        evt  = get_event_data(codec, abi, log)
-        args = evt["args"]
-        bn   = log["blockNumber"]
-
-        # ------------------------------------------------------------------
-        # Extract raw unsigned amounts
-        # ------------------------------------------------------------------
-        amt0_in  = Decimal(args["amount0In"])
-        amt1_in  = Decimal(args["amount1In"])
-        amt0_out = Decimal(args["amount0Out"])
-        amt1_out = Decimal(args["amount1Out"])
-
-        # ------------------------------------------------------------------
-        # Map to base / quote, scale by decimals, compute signed deltas
-        # ------------------------------------------------------------------
-        if base_is_token1:                       # token1 = base
-            base_in   = amt1_in / d1
-            base_out  = amt1_out / d1
-            quote_in  = amt0_in / d0             # token0 = quote
-            quote_out = amt0_out / d0
-        else:                                    # token0 = base
-            base_in   = amt0_in / d0
-            base_out  = amt0_out / d0
-            quote_in  = amt1_in / d1             # token1 = quote
-            quote_out = amt1_out / d1
-
-        base_delta_raw  = base_in  - base_out    # pool perspective
-        quote_delta_raw = quote_in - quote_out
-
-        # Wallet bought base if it *spent* quote (negative quote_delta_raw)
-        is_buy = quote_delta_raw < 0
-
-        # Execution price (quote per base, using abs to ignore sign)
-        price = abs(quote_in + quote_out) / abs(base_in + base_out)
-
-        out.append({
-            # ─── identity & metadata ─────────────────────────────────────
-            "block_number": bn,
-            "timestamp": block_cache[str(bn)],
-            "tx_hash": log["transactionHash"],
-            "log_index": log["logIndex"],
-            "sender": args["sender"],
-            "recipient": args["to"],
-            # ─── numeric flows ───────────────────────────────────────────
-            "base_delta":  base_delta_raw,
-            "quote_delta": quote_delta_raw,
-            "base_vol":    abs(base_delta_raw),
-            "quote_vol":   abs(quote_delta_raw),
-            # ─── price / pool context ───────────────────────────────────
-            "price":       price,
-            "liquidity":   None,   # not available in V2 event
-            "tick":        None,   # not applicable
-            # ─── convenience flag ───────────────────────────────────────
-            "is_buy":      is_buy,
-        })
-
+    from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_for
+    out = plan_for(abi, dec0, dec1, base_is_token1).decode(logs_chunk)
     logger.debug("decoded %d V2 swaps", len(out))
     return out
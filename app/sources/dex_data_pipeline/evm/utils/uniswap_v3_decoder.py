@@ -1,81 +1,143 @@
-from decimal import Decimal
 from app.celery.celery_app import celery_app
+from app.sources.dex_data_pipeline.evm.utils.abi_words import parse_words, to_signed, topic_address
+from app.sources.dex_data_pipeline.utils.swap_batch import SCALE, SwapBatch, amount_scaler, ratio_to_fixed
 import logging
 
 logger = logging.getLogger(__name__)
 
+Q192 = 1 << 192  # (2**96)² – sqrtPriceX96 is a Q64.96 fixed-point number
+# Swap(address indexed sender, address indexed recipient, int256 amount0,
+#      int256 amount1, uint160 sqrtPriceX96, uint128 liquidity, int24 tick)
+SWAP_WORDS = 5
+SWAP_TOPICS = 3
+_MAX_SQRT_PRICE = 1 << 160
+_MAX_LIQUIDITY = 1 << 128
+_TICK_BOUND = 1 << 23
 
-def _price_raw(sqrt_price_x96: int) -> Decimal:
-    """Convert Uniswap V3 sqrtPriceX96 → token1 per token0 as Decimal."""
-    sqrt_price = Decimal(sqrt_price_x96) / (1 << 96)
-    return sqrt_price * sqrt_price  # token1 per token0
+
+def price_fixed(sqrt_price_x96: int, exponent: int) -> int:
+    """
+    sqrtPriceX96 → token1 per token0 × 10**exponent as a 10**18-scaled int,
+    exact: sqrtP² / 2**192 is rounded once (not twice at 28 digits).
+    """
+    return price_scaler(exponent)(sqrt_price_x96)
+
+
+def price_scaler(exponent: int):
+    """`price_fixed` for one pool's exponent; 2**192 divides as a shift."""
+    shift = SCALE + exponent
+    if shift < 0:
+        return lambda sqrt_price: ratio_to_fixed(sqrt_price * sqrt_price, Q192, exponent)
+    mul = 10 ** shift
+
+    def scale(sqrt_price: int) -> int:
+        scaled = sqrt_price * sqrt_price * mul
+        return (scaled >> 192) + ((scaled >> 191) & 1)   # round half up (price ≥ 0)
+    return scale
+
+
+def decode_swap_args_fast(logs_chunk: list) -> list[dict | None]:
+    """
+    Swap args for a whole chunk, sliced straight from the 5-word payload.
+
+    Entries are None where the log does not have the V3 Swap layout (or a
+    value overflows its declared type); those go through the ABI decoder.
+    """
+    words, topics = parse_words(logs_chunk, SWAP_WORDS, SWAP_TOPICS)
+    out = []
+    for w, t in zip(words, topics):
+        if w is None:
+            out.append(None)
+            continue
+        amount0, amount1, sqrt_price, liquidity, tick = w
+        tick = to_signed(tick)
+        if sqrt_price >= _MAX_SQRT_PRICE or liquidity >= _MAX_LIQUIDITY or not -_TICK_BOUND <= tick < _TICK_BOUND:
+            out.append(None)
+            continue
+        out.append({
+            "sender": topic_address(t[1]),
+            "recipient": topic_address(t[2]),
+            "amount0": to_signed(amount0),
+            "amount1": to_signed(amount1),
+            "sqrtPriceX96": sqrt_price,
+            "liquidity": liquidity,
+            "tick": tick,
+        })
+    return out
+
+
+def swap_builder(dec0: int, dec1: int, base_is_token1: bool):
+    """
+    `build(logs_chunk, args_list) -> SwapBatch` for one pool's decimals and
+    orientation, in integer fixed-point math – no Decimal until the DB
+    insert.  Scalers are bound once; see decoder_registry for the cache.
+    """
+    # raw amount → 10**18-scaled int, in base / quote order
+    scale_base = amount_scaler(dec1 if base_is_token1 else dec0)
+    scale_quote = amount_scaler(dec0 if base_is_token1 else dec1)
+    scale_price = price_scaler(dec0 - dec1)
+    base_key, quote_key = ("amount1", "amount0") if base_is_token1 else ("amount0", "amount1")
+
+    def build(logs_chunk: list, args_list: list[dict]) -> SwapBatch:
+        quote_raw = [args[quote_key] for args in args_list]
+        interned = SwapBatch()
+        sender = [interned.intern(args["sender"]) for args in args_list]
+        recipient = [interned.intern(args["recipient"]) for args in args_list]
+
+        # Built column by column: one tight comprehension per column instead
+        # of fourteen appends per swap.
+        return SwapBatch(
+            interned.addresses,
+            block_number=[log["blockNumber"] for log in logs_chunk],
+            timestamp=[log["timestamp"] for log in logs_chunk],
+            tx_hash=[log["transactionHash"] for log in logs_chunk],
+            log_index=[log["logIndex"] for log in logs_chunk],
+            sender=sender,
+            recipient=recipient,
+            # Signed token flows (pool perspective → opposite sign of wallet)
+            base_delta=[scale_base(-args[base_key]) for args in args_list],
+            quote_delta=[scale_quote(-q) for q in quote_raw],
+            price=[scale_price(args["sqrtPriceX96"]) for args in args_list],
+            liquidity=[args.get("liquidity") for args in args_list],
+            tick=[args.get("tick") for args in args_list],
+            # Wallet bought base if it *spent* quote (negative quote_delta)
+            is_buy=[q > 0 for q in quote_raw],
+        )
+    return build
+
+
+def swaps_from_args(
+    logs_chunk: list,
+    args_list: list[dict],
+    dec0: int,
+    dec1: int,
+    base_is_token1: bool,
+) -> SwapBatch:
+    """Columnar *raw_swaps* batch from decoded Swap args."""
+    return swap_builder(dec0, dec1, base_is_token1)(logs_chunk, args_list)
 
 
 @celery_app.task(name="uniswap_decode_log_chunk")
 def decode_log_chunk(
     logs_chunk,
-    block_cache,
     abi,
     dec0: int,
     dec1: int,
     base_is_token1: bool,
 ):
-    """Decode raw Swap events into per‑swap dicts suitable for the *raw_swaps* table.
+    """Decode raw Swap events into a columnar SwapBatch for the *raw_swaps* table.
 
-    ‑‑ No USD‑specific fields are produced.  
+    ‑‑ No USD‑specific fields are produced.
     ‑‑ Signed flows are kept so later analytics can tell buys from sells.
+    ‑‑ Each log carries its block `timestamp` (set by BlockTimestampResolver).
+    ‑‑ Payloads are sliced directly; only logs with an unexpected layout
+       are decoded through the ABI (`get_event_data`).  The first log of
+       every chunk is cross-checked against the ABI, so an `abi` that is
+       not the V3 Swap event sends the whole chunk down the ABI path.
+    ‑‑ Kept for messages that still carry the ABI; new dispatches go
+       through `decode_swap_chunk` with a decoder_registry plan key.
     """
-    from web3 import Web3
-    from web3._utils.events import get_event_data
-    codec = Web3().codec
-
-    # Decimal scaling helpers
-    exponent = dec0 - dec1
-    price_scale = Decimal(10) ** exponent
-    d0 = Decimal(10) ** dec0
-    d1 = Decimal(10) ** dec1
-
-    out: list[dict] = []
-    for log in logs_chunk:
-        evt = get_event_data(codec, abi, log)
-        args = evt["args"]
-
-        bn = log["blockNumber"]
-        price = _price_raw(args["sqrtPriceX96"]) * price_scale
-
-        # ------------------------------------------------------------------
-        # Signed token flows (pool perspective → opposite sign of wallet)
-        # ------------------------------------------------------------------
-        if base_is_token1:
-            base_delta_raw = -Decimal(args["amount1"]) / d1  # token1 is base
-            quote_delta_raw = -Decimal(args["amount0"]) / d0  # token0 is quote
-        else:
-            base_delta_raw = -Decimal(args["amount0"]) / d0  # token0 is base
-            quote_delta_raw = -Decimal(args["amount1"]) / d1  # token1 is quote
-
-        # Wallet bought base if it *spent* quote (negative quote_delta)
-        is_buy = quote_delta_raw < 0
-
-        out.append({
-            # ─── identity & metadata ───────────────────────────────────────
-            "block_number": bn,
-            "timestamp": block_cache[str(bn)],
-            "tx_hash": log["transactionHash"],
-            "log_index": log["logIndex"],
-            "sender": args["sender"],
-            "recipient": args["recipient"],
-            # ─── numeric flows (abs + signed) ──────────────────────────────
-            "base_delta": base_delta_raw,            # signed
-            "quote_delta": quote_delta_raw,          # signed
-            "base_vol": abs(base_delta_raw),        # unsigned (for volume)
-            "quote_vol": abs(quote_delta_raw),
-            # ─── price / pool context ─────────────────────────────────────
-            "price": price,
-            "liquidity": args.get("liquidity"),
-            "tick": args.get("tick"),
-            # ─── convenience flag ─────────────────────────────────────────
-            "is_buy": is_buy,
-        })
-
+    from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_for
+    out = plan_for(abi, dec0, dec1, base_is_token1).decode(logs_chunk)
     logger.debug("decoded %d swaps", len(out))
     return out
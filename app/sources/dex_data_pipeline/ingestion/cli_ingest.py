@@ -1,12 +1,21 @@
 import typer
+from sqlalchemy import func
 from web3 import Web3
 from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.runner import run_uniswap_orchestration
 from app.sources.dex_data_pipeline.evm.arbitrum.dexs.camelot.runner import run_camelot_orchestration
 from app.sources.dex_data_pipeline.evm.base.dexs.uniswap_v3.runner import run_base_uniswap_orchestration
 from app.sources.dex_data_pipeline.evm.base.dexs.pancakeswap.runner import run_base_pancakeswap_orchestration
 from app.sources.dex_data_pipeline.evm.base.dexs.aerodrome.runner import run_base_aerodrome_orchestration
+from app.sources.dex_data_pipeline.evm.utils.chain_orchestrator import run_chain_orchestration
+from app.sources.dex_data_pipeline.evm.utils.stream_orchestrator import run_pool_stream
+from app.sources.dex_data_pipeline.evm.registry import get_dex_spec
 from app.storage.db import SessionLocal
-from app.sources.dex_data_pipeline.config.settings import ARBITRUM_BLOCKS_PER_CALL, BASE_BLOCKS_PER_CALL
+from app.storage.models.pools import Pool
+from app.sources.dex_data_pipeline.config.settings import (
+    ARBITRUM_BLOCKS_PER_CALL,
+    BASE_BLOCKS_PER_CALL,
+    STREAM_QUEUE_SIZE,
+)
 import logging
 
 log = logging.getLogger(__name__)
@@ -72,6 +81,61 @@ def runner(
             db.close()
             log.info("[cli] Database session closed")
 
+@app.command("run-chain")
+def chain_runner(
+    chain: str = typer.Option(..., help="e.g. arbitrum"),
+    days_back: int = typer.Option(1, help="How many days to back-fill"),
+):
+    """
+    Ingest every active pool of a chain with one eth_getLogs crawl.
+    """
+    chain = chain.lower()
+    steps = {"arbitrum": ARBITRUM_BLOCKS_PER_CALL, "base": BASE_BLOCKS_PER_CALL}
+    if chain not in steps:
+        log.info(f"[cli] Unsupported chain: {chain}")
+        return
+    try:
+        with SessionLocal() as db:
+            pools = [
+                (pool.dex.lower(), pool.pair, Web3.to_checksum_address(pool.address))
+                for pool in db.query(Pool).filter(Pool.active.is_(True), func.lower(Pool.chain) == chain).all()
+            ]
+        log.info(f"[cli] Starting chain extraction for {chain}: {len(pools)} active pools")
+        run_chain_orchestration(chain, pools, days_back=days_back, step=steps[chain])
+        log.info("[cli] Extraction completed successfully")
+    except Exception:
+        log.error("Chain extraction failed", exc_info=True)
+
+@app.command("stream")
+def stream_runner(
+    chain: str = typer.Option(..., help="e.g. arbitrum"),
+    dex: str = typer.Option(..., help="e.g. uniswap_v3"),
+    pair: str = typer.Option(..., help="e.g. ARB/USDC"),
+    pool_address: str = typer.Option(..., help="0x..."),
+    days_back: int = typer.Option(1, help="How many days to back-fill"),
+    queue_size: int = typer.Option(STREAM_QUEUE_SIZE, help="Block ranges buffered between stages"),
+):
+    """
+    Back-fill one pool in this process (fetch → decode → enrich → write
+    stream), no Celery workers needed.
+    """
+    chain = chain.lower()
+    dex = dex.lower()
+    steps = {"arbitrum": ARBITRUM_BLOCKS_PER_CALL, "base": BASE_BLOCKS_PER_CALL}
+    try:
+        spec = get_dex_spec(chain, dex)
+    except ValueError as e:
+        log.info(f"[cli] {e}")
+        return
+    try:
+        pool_address = Web3.to_checksum_address(pool_address)
+        log.info(f"[cli] Starting streaming back-fill for {dex} {pool_address}")
+        run_pool_stream(spec.rpc_url, pool_address, spec.swap_topic, spec.swap_abi, chain, dex, pair,
+                        days_back=days_back, step=steps[chain], queue_size=queue_size)
+        log.info("[cli] Extraction completed successfully")
+    except Exception:
+        log.error("Streaming extraction failed", exc_info=True)
+
 def main():
     app()
 
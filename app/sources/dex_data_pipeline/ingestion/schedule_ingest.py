@@ -8,7 +8,7 @@ the **orchestrate** queue, and we pass all parameters as keyword args.
 """
 
 from celery import shared_task
-from app.sources.dex_data_pipeline.ingestion.cli_ingest import runner     # ← your existing Typer command
+from app.sources.dex_data_pipeline.ingestion.cli_ingest import runner, chain_runner     # ← your existing Typer commands
 import logging
 log = logging.getLogger(__name__)
 
@@ -50,3 +50,25 @@ def ingest_pool(
         pool_address=pool_addr,
         days_back=days_back,
     )
+
+
+@shared_task(
+    name="ingest_chain",
+    queue="orchestrate",
+    bind=True
+)
+def ingest_chain(
+    self,
+    *,
+    chain: str,
+    days_back: int = 1,
+) -> None:
+    """
+    Launch one ingestion run for *all* active pools of a chain.
+
+    The pools share each eth_getLogs call (address list + OR of swap
+    topics), so N pools cost one crawl instead of N.  Same Typer path as
+    `python ingest.py run-chain --chain ...`.
+    """
+    log.info(f"🔄  Starting chain ingestion for {chain} for {days_back} days back")
+    chain_runner(chain=chain, days_back=days_back)
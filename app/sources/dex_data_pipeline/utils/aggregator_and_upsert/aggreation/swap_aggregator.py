@@ -1,15 +1,53 @@
 from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
 from decimal import Decimal, getcontext
 from collections import defaultdict
 from decimal import Decimal
+from app.sources.dex_data_pipeline.utils.swap_batch import (
+    MINUTE_COLUMNS,
+    SwapBatch,
+    from_fixed,
+    ratio_to_fixed,
+    to_fixed,
+)
 import logging
 logger = logging.getLogger(__name__)
 
 getcontext().prec = 28  # High precision for price math
 
 
+@lru_cache(maxsize=1 << 14)
+def _minute_start(epoch_minute: int) -> datetime:
+    # one datetime per minute instead of one per swap
+    return datetime.utcfromtimestamp(epoch_minute * 60)
+
+
+def kline_row(minute: datetime, data: dict) -> dict:
+    """One minute's bucket (fixed-point ints) → the kline row upserted, VWAP included."""
+    base, quote = data['total_base_volume'], data['total_quote_volume']
+    vwap = from_fixed(ratio_to_fixed(quote, base)) if base else None
+    return {
+        'minute_start': minute,
+        'open_price': from_fixed(data['open_price']),
+        'high_price': from_fixed(data['high_price']),
+        'low_price': from_fixed(data['low_price']),
+        'close_price': from_fixed(data['close_price']),
+        'avg_price': vwap,
+        'swap_count': data['swap_count'],
+        'total_base_volume': from_fixed(base),
+        'total_quote_volume': from_fixed(quote),
+    }
+
+
 class SwapAggregator: 
+    """
+    Minute OHLCV buckets.  Prices and volumes are kept as fixed-point ints
+    (see swap_batch) and only turned into Decimal by `aggregate()`.
+
+    Swap-at-a-time reference implementation; the aggregate task uses
+    VectorSwapAggregator, which must produce identical rows.
+    """
     def __init__(self):
 
         # Initialize buckets for each minute
@@ -18,24 +56,49 @@ class SwapAggregator:
             'open_ts': None,
             'close_price': None,
             'close_ts': None,
-            'high_price': Decimal('-Infinity'),
-            'low_price': Decimal('Infinity'),
+            'high_price': None,
+            'low_price': None,
             'swap_count': 0,
-            'total_base_volume': Decimal(0),
-            'total_quote_volume': Decimal(0),
+            'total_base_volume': 0,
+            'total_quote_volume': 0,
         })
 
     @staticmethod
     def _minute_key( timestamp: int) -> datetime:
-        return datetime.utcfromtimestamp(timestamp).replace(second=0, microsecond=0)
+        return _minute_start(timestamp // 60)
 
 
     def add(self, swap: dict):
-        ts = swap['timestamp']
-        price = swap['price'] 
-        base_vol = swap['base_vol']  # token0
-        quote_vol  = swap['quote_vol']  # token1
+        """Add one legacy decoder dict (Decimal price / volumes)."""
+        self._add(swap['timestamp'], to_fixed(swap['price']),
+                  to_fixed(swap['base_vol']), to_fixed(swap['quote_vol']))
 
+    def add_batch(self, batch: SwapBatch):
+        for ts, price, base_delta, quote_delta in zip(batch.timestamp, batch.price,
+                                                       batch.base_delta, batch.quote_delta):
+            self._add(ts, price, abs(base_delta), abs(quote_delta))
+
+    def add_partials(self, minutes: dict[str, list[int]]):
+        """Merge per-minute partials (see `minute_partials`) – one step per minute, not per swap."""
+        for (minute, open_ts, open_price, close_ts, close_price, high, low,
+             count, base_vol, quote_vol) in zip(*(minutes[name] for name in MINUTE_COLUMNS)):
+            bucket = self.buckets[_minute_start(minute)]
+            # strict comparisons: on equal timestamps the earlier chunk wins, as with `_add`
+            if bucket['open_ts'] is None or open_ts < bucket['open_ts']:
+                bucket['open_price'] = open_price
+                bucket['open_ts'] = open_ts
+            if bucket['close_ts'] is None or close_ts > bucket['close_ts']:
+                bucket['close_price'] = close_price
+                bucket['close_ts'] = close_ts
+            if bucket['high_price'] is None or high > bucket['high_price']:
+                bucket['high_price'] = high
+            if bucket['low_price'] is None or low < bucket['low_price']:
+                bucket['low_price'] = low
+            bucket['total_base_volume'] += base_vol
+            bucket['total_quote_volume'] += quote_vol
+            bucket['swap_count'] += count
+
+    def _add(self, ts: int, price: int, base_vol: int, quote_vol: int):
         minute = self._minute_key(ts)
         bucket = self.buckets[minute]
 
@@ -49,28 +112,48 @@ class SwapAggregator:
             bucket['close_price'] = price
             bucket['close_ts'] = ts
 
-        bucket['high_price'] = max(bucket['high_price'], price)
-        bucket['low_price'] = min(bucket['low_price'], price)
+        if bucket['high_price'] is None or price > bucket['high_price']:
+            bucket['high_price'] = price
+        if bucket['low_price'] is None or price < bucket['low_price']:
+            bucket['low_price'] = price
         bucket['total_base_volume'] += base_vol
         bucket['total_quote_volume'] += quote_vol
         bucket['swap_count'] += 1
 
     def aggregate(self):
-        result = {}
-        for minute, data in self.buckets.items():
-            vwap = (data['total_quote_volume'] / data['total_base_volume']) if data['total_base_volume'] else None
-            result[minute] = {
-                'minute_start': minute,
-                'open_price': data['open_price'],
-                'high_price': data['high_price'],
-                'low_price': data['low_price'],
-                'close_price': data['close_price'],
-                'avg_price': vwap,
-                'swap_count': data['swap_count'],
-                'total_base_volume': data['total_base_volume'],
-                'total_quote_volume': data['total_quote_volume'],
-            }
-        return result
+        return {minute: kline_row(minute, data) for minute, data in self.buckets.items()}
 
     def reset(self):
         self.buckets.clear()
+
+
+def minute_partials(batch: SwapBatch) -> dict[str, list[int]]:
+    """
+    Per-minute OHLCV partials of one chunk as MINUTE_COLUMNS lists – what
+    `SwapAggregator.add_batch` would put in its buckets, keyed by epoch
+    minute.  Computed where the chunk is decoded.
+    """
+    acc: dict[int, list[int]] = {}
+    for ts, price, base_delta, quote_delta in zip(batch.timestamp, batch.price,
+                                                   batch.base_delta, batch.quote_delta):
+        minute = ts // 60
+        bucket = acc.get(minute)
+        if bucket is None:
+            acc[minute] = [ts, price, ts, price, price, price, 1, abs(base_delta), abs(quote_delta)]
+            continue
+        if ts < bucket[0]:
+            bucket[0], bucket[1] = ts, price
+        if ts > bucket[2]:
+            bucket[2], bucket[3] = ts, price
+        if price > bucket[4]:
+            bucket[4] = price
+        elif price < bucket[5]:
+            bucket[5] = price
+        bucket[6] += 1
+        bucket[7] += abs(base_delta)
+        bucket[8] += abs(quote_delta)
+    rows = list(acc.values())
+    columns = {"minute": list(acc)}
+    for i, name in enumerate(MINUTE_COLUMNS[1:]):
+        columns[name] = [row[i] for row in rows]
+    return columns
@@ -1,11 +1,12 @@
 
 from collections import defaultdict
 from decimal import Decimal, getcontext
-from app.storage.db import WorkerSessionLocal as SessionLocal
 import math
 from collections import defaultdict
 from decimal import Decimal
 
+from app.sources.dex_data_pipeline.utils.swap_batch import SCALE, SwapBatch
+
 getcontext().prec = 28  # High precision for price math
 
 class TradeSizeAggregator:
@@ -25,4 +26,17 @@ class TradeSizeAggregator:
         key = self._bucket_key(quote_vol)
         if key > 6 or key < -2:
             return
-        self.buckets[key] += 1
\ No newline at end of file
+        self.buckets[key] += 1
+
+    @staticmethod
+    def _fixed_bucket_key(quote_vol: int) -> int:
+        """`_bucket_key` for a 10**18-scaled int: floor(log10) is its digit count."""
+        if quote_vol <= 0:
+            return -999
+        return len(str(quote_vol)) - 1 - SCALE
+
+    def add_batch(self, batch: SwapBatch):
+        for quote_delta in batch.quote_delta:
+            key = self._fixed_bucket_key(abs(quote_delta))
+            if -2 <= key <= 6:
+                self.buckets[key] += 1
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Minute OHLCV for whole columnar batches at once.
+
+`SwapAggregator` walks swaps one by one in Python.  Here every swap is a
+one-swap partial row (open = close = high = low = its price) and every
+per-minute partial from decode is a row as it is, so a range's batches
+and partials become one set of columns and a single groupby by minute
+produces the buckets:
+
+* one stable sort by minute (a no-op permutation for time-ordered
+  batches) gives contiguous groups and their boundaries;
+* open / close are, per group, the first row in arrival order holding
+  the group's min / max timestamp (`np.minimum.reduceat` + a first-match
+  search) – the earliest row wins ties, as the reference's strict
+  comparisons do;
+* counts are `np.add.reduceat` sums.
+
+Fixed-point prices and volumes (ints scaled by 10**18) overflow int64,
+so they never become numpy arrays: they are permuted once into group
+order and each group's high / low / volumes come from `max` / `min` /
+`sum` over its slice – C-level loops over Python ints, exact.  Results
+match `SwapAggregator` exactly (see `kline_row` for the row format).
+"""
+from operator import itemgetter
+
+import numpy as np
+
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import (
+    _minute_start,
+    kline_row,
+)
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch
+
+
+def _first_match(values: np.ndarray, targets: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Per group, the position of the first row whose value equals the group's target."""
+    hits = np.flatnonzero(values == np.repeat(targets, sizes))
+    return hits[np.searchsorted(hits, starts)]
+
+
+class VectorSwapAggregator:
+    """Drop-in for SwapAggregator's add_batch / add_partials / aggregate, vectorized."""
+
+    def __init__(self):
+        # MINUTE_COLUMNS-shaped row sets in arrival order
+        self._parts: list[dict[str, list[int]]] = []
+
+    def add_batch(self, batch: SwapBatch):
+        if not len(batch):
+            return
+        ts = np.asarray(batch.timestamp, dtype=np.int64)
+        self._parts.append({
+            "minute": ts // 60,
+            "open_ts": ts, "open_price": batch.price,
+            "close_ts": ts, "close_price": batch.price,
+            "high_price": batch.price, "low_price": batch.price,
+            "swap_count": np.ones(len(batch), dtype=np.int64),
+            "base_volume": list(map(abs, batch.base_delta)),
+            "quote_volume": list(map(abs, batch.quote_delta)),
+        })
+
+    def add_partials(self, minutes: dict[str, list[int]]):
+        """Merge per-minute partials (see `minute_partials`)."""
+        if not minutes["minute"]:
+            return
+        part = dict(minutes)
+        for name in ("minute", "open_ts", "close_ts", "swap_count"):
+            part[name] = np.asarray(minutes[name], dtype=np.int64)
+        self._parts.append(part)
+
+    def reset(self):
+        self._parts.clear()
+
+    def buckets(self) -> dict:
+        """{minute datetime: bucket} in SwapAggregator's bucket format (fixed-point ints)."""
+        if not self._parts:
+            return {}
+        minute, open_ts, close_ts, count = (np.concatenate([part[name] for part in self._parts])
+                                            for name in ("minute", "open_ts", "close_ts", "swap_count"))
+        n = len(minute)
+
+        # one stable sort: groups become contiguous, arrival order kept inside them
+        order = np.argsort(minute, kind="stable")
+        identity = bool((order == np.arange(n)).all())
+        if not identity:
+            minute, open_ts, close_ts, count = minute[order], open_ts[order], close_ts[order], count[order]
+        starts = np.flatnonzero(np.r_[True, minute[1:] != minute[:-1]])
+        ends = np.r_[starts[1:], n]
+        sizes = ends - starts
+
+        first = _first_match(open_ts, np.minimum.reduceat(open_ts, starts), starts, sizes)
+        last = _first_match(close_ts, np.maximum.reduceat(close_ts, starts), starts, sizes)
+        counts = np.add.reduceat(count, starts)
+
+        # a batch's price list stands for open / close / high / low alike: permute it once
+        take = None if identity else itemgetter(*order.tolist())
+        permuted = {}
+
+        def grouped(name: str) -> list[int]:
+            sources = tuple(id(part[name]) for part in self._parts)
+            if sources not in permuted:
+                values = [value for part in self._parts for value in part[name]] if len(self._parts) > 1 \
+                    else self._parts[0][name]
+                permuted[sources] = values if take is None else list(take(values))
+            return permuted[sources]
+
+        open_prices, close_prices = grouped("open_price"), grouped("close_price")
+        highs, lows = grouped("high_price"), grouped("low_price")
+        base, quote = grouped("base_volume"), grouped("quote_volume")
+
+        buckets = {}
+        for g, (start, end, lo, hi) in enumerate(zip(starts.tolist(), ends.tolist(), first.tolist(), last.tolist())):
+            buckets[_minute_start(int(minute[start]))] = {
+                'open_price': open_prices[lo],
+                'open_ts': int(open_ts[lo]),
+                'close_price': close_prices[hi],
+                'close_ts': int(close_ts[hi]),
+                'high_price': max(highs[start:end]),
+                'low_price': min(lows[start:end]),
+                'swap_count': int(counts[g]),
+                'total_base_volume': sum(base[start:end]),
+                'total_quote_volume': sum(quote[start:end]),
+            }
+        return buckets
+
+    def aggregate(self):
+        return {minute: kline_row(minute, data) for minute, data in self.buckets().items()}
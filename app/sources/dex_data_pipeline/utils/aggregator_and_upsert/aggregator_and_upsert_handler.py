@@ -2,12 +2,14 @@ from app.celery.celery_app import celery_app
 from app.storage.db import WorkerSessionLocal as SessionLocal
 from app.utils.constants import SUPPORTED_CONVERSIONS
 import logging
-from datetime import datetime, timezone
-from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import SwapAggregator
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.vector_swap_aggregator import VectorSwapAggregator
 from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.trade_size_aggregator import TradeSizeAggregator
 from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.upsert.upsert_aggregated_klines import upsert_aggregated_klines
 from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.upsert.upsert_aggregated_trade_sizes import upsert_aggregated_trade_sizes
 from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.upsert.upsert_raw_swaps import bulk_insert_swaps
+from app.sources.dex_data_pipeline.evm.utils.coverage import record_coverage
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch, as_batch
+from app.sources.dex_data_pipeline.utils.log_extraction_metrics import extract_pool_slug
 logger = logging.getLogger(__name__)
 
 
@@ -20,24 +22,41 @@ def get_raw_swaps_table_name_from_kline(kl_table_name: str) -> str:
         name="aggregate_and_upsert_handler",
         queue="aggregate",
         )
-def aggregate_and_upsert(decoded_chunks,table,swap_table, quote_pair):
-    swap_aggregator = SwapAggregator()
+def aggregate_and_upsert(decoded_chunks,table,swap_table, quote_pair, from_block=None, to_block=None):
+    """
+    Aggregate a range's decoded swaps (one SwapBatch per chunk) and upsert
+    klines / raw swaps / trade sizes.  Chunks carrying per-minute partials
+    are merged minute by minute instead of swap by swap; either way the
+    minutes come out of one vectorized groupby (VectorSwapAggregator).
+
+    When the crawled [from_block, to_block] is given it is recorded in the
+    coverage ledger in the same transaction, so a range counts as covered
+    only if its swaps were committed.
+    """
+    swap_aggregator = VectorSwapAggregator()
     trade_size_aggregator = TradeSizeAggregator()
-    range_logs = [d for sub in decoded_chunks for d in sub]
-    for log in range_logs:
-        swap_aggregator.add(log)
-        if quote_pair in SUPPORTED_CONVERSIONS:
-            trade_size_aggregator.add(log)
-        log['timestamp']  = datetime.fromtimestamp(log['timestamp'] , tz=timezone.utc)
+    chunks = [as_batch(chunk) for chunk in decoded_chunks]
+    batch = SwapBatch.concat(chunks)
+    if all(chunk.minutes is not None for chunk in chunks):
+        # decode already bucketed each chunk by minute – merge those partials
+        for chunk in chunks:
+            swap_aggregator.add_partials(chunk.minutes)
+    else:
+        swap_aggregator.add_batch(batch)
+    if quote_pair in SUPPORTED_CONVERSIONS:
+        trade_size_aggregator.add_batch(batch)
     minutes = swap_aggregator.aggregate()
 
     #Upsert Aggs 
-    if minutes:
+    if minutes or from_block is not None:
         with SessionLocal() as db:
-            upsert_aggregated_klines(db, table, minutes)
-            bulk_insert_swaps(db,swap_table, range_logs)
-            if quote_pair in SUPPORTED_CONVERSIONS:
-                upsert_aggregated_trade_sizes(db, pool_name=table, buckets=trade_size_aggregator.buckets)
+            if minutes:
+                upsert_aggregated_klines(db, table, minutes)
+                bulk_insert_swaps(db,swap_table, batch.rows())
+                if quote_pair in SUPPORTED_CONVERSIONS:
+                    upsert_aggregated_trade_sizes(db, pool_name=table, buckets=trade_size_aggregator.buckets)
+            if from_block is not None:
+                record_coverage(db, extract_pool_slug(table), from_block, to_block)
 
             db.commit()
 
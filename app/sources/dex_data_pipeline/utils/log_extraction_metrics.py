@@ -12,19 +12,41 @@ def extract_pool_slug(table_name: str) -> str:
     return table_name.rsplit("_", 2)[0]
 
 
+def summarize_range_stats(range_stats: list[dict]) -> tuple[int, float | None]:
+    """
+    Total timestamp RPCs and the overall cache hit rate across ranges.
+    Hit rate is None when no range used the block cache (interpolation mode).
+    """
+    rpc_calls = sum(r["rpc_calls"] for r in range_stats)
+    cached = [r for r in range_stats if r.get("cache_hits") is not None]
+    blocks = sum(r["blocks"] for r in cached)
+    if not blocks:
+        return rpc_calls, None
+    return rpc_calls, round(sum(r["cache_hits"] for r in cached) / blocks, 4)
+
+
 def log_extraction_metrics(
     db: Session,
     block_range: str,
     log_count: int,
     duration_seconds: float,
-    table_name: str
+    table_name: str,
+    range_stats: list[dict] | None = None,
 ):
-    insert_stmt = pg_insert(extraction_metrics_table).values(
+    values = dict(
         block_range=block_range,
         log_count=log_count,
         duration_seconds=round(duration_seconds, 2),
         pool_slug=extract_pool_slug(table_name)
     )
+    if range_stats is not None:
+        rpc_calls, hit_rate = summarize_range_stats(range_stats)
+        values.update(
+            timestamp_rpc_calls=rpc_calls,
+            timestamp_cache_hit_rate=hit_rate,
+            range_stats=range_stats,
+        )
+    insert_stmt = pg_insert(extraction_metrics_table).values(**values)
     db.execute(insert_stmt)
 
 
@@ -0,0 +1,179 @@
+"""
+Bounded, threaded stage pipeline.
+
+    source → [q] → stage 1 → [q] → stage 2 → … → stage N
+
+Every stage runs on its own thread and hands items to the next one
+through a `queue.Queue(maxsize=queue_size)`, so a slow stage blocks the
+ones upstream instead of letting work pile up: at most
+`(len(stages) + 1) * (queue_size + 1)` items exist at any time, however
+long the source is.  Items keep their source order.
+
+A stage function takes an item and returns the item for the next stage;
+returning None drops it.  The first exception stops the pipeline and is
+re-raised by `run()`.  `snapshot()` reports per-stage throughput and
+queue depth while the pipeline runs.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, NamedTuple
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[[Any], Any]
+    # units of work in an item (logs, swaps …) for the throughput figures
+    units: Callable[[Any], int] | None = None
+
+
+class StageStats:
+    __slots__ = ("items", "units", "busy", "max_depth")
+
+    def __init__(self):
+        self.items = 0
+        self.units = 0
+        self.busy = 0.0
+        self.max_depth = 0
+
+
+class StreamPipeline:
+    def __init__(self, stages: list[Stage], queue_size: int = 4, source_name: str = "source",
+                 source_units: Callable[[Any], int] | None = None):
+        if queue_size < 1:
+            raise ValueError(f"queue_size must be >= 1, got {queue_size}")
+        self.source_name = source_name
+        self.source_units = source_units
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        # queues[i] feeds stages[i]
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self.stats = {name: StageStats() for name in [source_name] + [s.name for s in self.stages]}
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._started: float | None = None
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+    def run(self, source: Iterable, report_every: float | None = None) -> None:
+        """Drain `source` through every stage; blocks until done or failed."""
+        self._started = time.monotonic()
+        threads = [threading.Thread(target=self._pump, args=(source,), name=f"stream-{self.source_name}",
+                                    daemon=True)]
+        for i, stage in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._work, args=(i, stage), name=f"stream-{stage.name}",
+                                            daemon=True))
+        for thread in threads:
+            thread.start()
+        last_report = time.monotonic()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+                if report_every is not None and time.monotonic() - last_report >= report_every:
+                    self.report()
+                    last_report = time.monotonic()
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, q: queue.Queue, item, stats: StageStats | None = None) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            if stats is not None:
+                stats.max_depth = max(stats.max_depth, q.qsize())
+            return True
+        return False
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _pump(self, source: Iterable) -> None:
+        stats = self.stats[self.source_name]
+        first = self.queues[0] if self.queues else None
+        first_stats = self.stats[self.stages[0].name] if self.stages else None
+        try:
+            items = iter(source)
+            while not self._stop.is_set():
+                t0 = time.monotonic()
+                item = next(items, _DONE)
+                stats.busy += time.monotonic() - t0
+                if item is _DONE:
+                    break
+                stats.items += 1
+                if self.source_units is not None:
+                    stats.units += self.source_units(item)
+                if first is not None and not self._put(first, item, first_stats):
+                    return
+        except BaseException as exc:
+            log.exception(f"[stream] {self.source_name} failed")
+            self._fail(exc)
+            return
+        if first is not None:
+            self._put(first, _DONE)
+
+    def _work(self, index: int, stage: Stage) -> None:
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        out_stats = self.stats[self.stages[index + 1].name] if outbox is not None else None
+        stats = self.stats[stage.name]
+        while not self._stop.is_set():
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                if outbox is not None:
+                    self._put(outbox, _DONE)
+                return
+            t0 = time.monotonic()
+            try:
+                result = stage.fn(item)
+            except BaseException as exc:
+                log.exception(f"[stream] stage {stage.name} failed")
+                self._fail(exc)
+                return
+            stats.busy += time.monotonic() - t0
+            stats.items += 1
+            if stage.units is not None and result is not None:
+                stats.units += stage.units(result)
+            if result is not None and outbox is not None and not self._put(outbox, result, out_stats):
+                return
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def snapshot(self) -> dict[str, dict]:
+        """Per stage: items, units, busy seconds, rates and input queue depth."""
+        elapsed = max(time.monotonic() - self._started, 1e-9) if self._started else 0.0
+        depth = {stage.name: q.qsize() for stage, q in zip(self.stages, self.queues)}
+        out = {}
+        for name, stats in self.stats.items():
+            busy = max(stats.busy, 1e-9)
+            out[name] = {
+                "items": stats.items,
+                "units": stats.units,
+                "busy_s": stats.busy,
+                "utilisation": stats.busy / elapsed if elapsed else 0.0,
+                "items_per_s": stats.items / busy,
+                "units_per_s": stats.units / busy,
+                "queue_depth": depth.get(name),
+                "max_queue_depth": stats.max_depth if name in depth else None,
+            }
+        return out
+
+    def report(self) -> None:
+        for name, s in self.snapshot().items():
+            queue_info = f", queue {s['queue_depth']}/{self.queue_size} (max {s['max_queue_depth']})" \
+                if s["queue_depth"] is not None else ""
+            log.info(f"[stream] {name:<10} {s['items']} items, {s['units']} units, "
+                     f"{s['units_per_s']:.0f} units/s busy, {s['utilisation']:.0%} busy{queue_info}")
@@ -0,0 +1,281 @@
+"""
+Columnar (struct-of-arrays) swap batch passed from decode → enrich → aggregate.
+
+A chunk of swaps used to travel as a list of 17-key dicts: every key
+repeated per swap on the wire, every Decimal JSON-encoded as a string,
+and every stage looping over dicts again.  A `SwapBatch` keeps one list
+per column instead:
+
+• amounts and prices are fixed-point ints at the raw-swap column scale
+  (NUMERIC(38, 18) → 10**18), rounded half away from zero like Postgres;
+• addresses are interned – sender / recipient / caller hold indexes into
+  `addresses`, so a router seen 5k times is stored once;
+• base_vol / quote_vol are |delta| and are derived, not stored;
+• `minutes` optionally carries the chunk's per-minute OHLCV partials
+  (MINUTE_COLUMNS, filled at decode time) so the aggregate step merges
+  one row per minute instead of re-reading every swap.
+
+Decimals and datetimes are only produced at the DB boundary (`rows()`).
+"""
+from datetime import datetime, timezone
+from decimal import Context, Decimal, ROUND_HALF_UP
+from typing import Iterable
+
+SCALE = 18
+ONE = 10 ** SCALE
+_EXACT = Context(prec=100, rounding=ROUND_HALF_UP)
+_ONE_DEC = Decimal(ONE)
+
+INT_COLUMNS = ("block_number", "timestamp", "log_index", "sender", "recipient",
+               "base_delta", "quote_delta", "price", "liquidity", "tick")
+COLUMNS = INT_COLUMNS + ("tx_hash", "is_buy", "caller", "router_tag")
+# per-minute partial aggregate: epoch minute, first / last swap, extremes, totals
+MINUTE_COLUMNS = ("minute", "open_ts", "open_price", "close_ts", "close_price",
+                  "high_price", "low_price", "swap_count", "base_volume", "quote_volume")
+
+
+def to_fixed(value: Decimal) -> int:
+    """Decimal → int scaled by 10**18, rounded half away from zero (as NUMERIC does)."""
+    return int(_EXACT.multiply(value, _ONE_DEC).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_fixed(value: int) -> Decimal:
+    """Int scaled by 10**18 → exact Decimal (no context rounding)."""
+    return Decimal(f"{value}e-{SCALE}")
+
+
+def div_half_up(num: int, den: int) -> int:
+    """num / den (den > 0) rounded half away from zero, in exact integer math."""
+    q, r = divmod(abs(num), den)
+    if 2 * r >= den:
+        q += 1
+    return q if num >= 0 else -q
+
+
+def ratio_to_fixed(num: int, den: int, exponent: int = 0) -> int:
+    """Fixed-point value of num / den × 10**exponent, rounded once."""
+    shift = SCALE + exponent
+    if shift >= 0:
+        return div_half_up(num * 10 ** shift, den)
+    return div_half_up(num, den * 10 ** -shift)
+
+
+def ratio_scaler(exponent: int = 0):
+    """`ratio_to_fixed` with the exponent bound, for per-swap loops."""
+    shift = SCALE + exponent
+    if shift < 0:
+        return lambda num, den: ratio_to_fixed(num, den, exponent)
+    mul = 10 ** shift
+
+    def ratio(num: int, den: int) -> int:
+        scaled = num * mul
+        if scaled < 0:
+            return div_half_up(scaled, den)
+        q, r = divmod(scaled, den)
+        return q + 1 if 2 * r >= den else q
+    return ratio
+
+
+def amount_scaler(decimals: int):
+    """Raw token amount → fixed-point (amount / 10**decimals) for a token's decimals."""
+    if decimals <= SCALE:
+        mul = 10 ** (SCALE - decimals)
+        return lambda amount: amount * mul
+    div = 10 ** (decimals - SCALE)
+    return lambda amount: div_half_up(amount, div)
+
+
+class SwapBatch:
+    __slots__ = ("addresses", "_address_index", "minutes") + COLUMNS
+
+    def __init__(self, addresses: list[str] | None = None, minutes: dict[str, list[int]] | None = None,
+                 **columns):
+        self.addresses: list[str] = list(addresses or ())
+        self.minutes = minutes
+        self._address_index = {a: i for i, a in enumerate(self.addresses)}
+        n = len(columns.get("block_number", ()))
+        for name in COLUMNS:
+            values = columns.get(name)
+            if values is None and name in ("caller", "router_tag"):  # filled by enrich
+                values = [None] * n
+            setattr(self, name, list(values) if values is not None else [])
+
+    def __len__(self) -> int:
+        return len(self.block_number)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SwapBatch) and self.rows(raw=True) == other.rows(raw=True)
+
+    def __repr__(self) -> str:
+        return f"SwapBatch({len(self)} swaps, {len(self.addresses)} addresses)"
+
+    # ------------------------------------------------------------------
+    # Address interning
+    # ------------------------------------------------------------------
+    def intern(self, address: str | None) -> int | None:
+        if address is None:
+            return None
+        index = self._address_index.get(address)
+        if index is None:
+            index = self._address_index[address] = len(self.addresses)
+            self.addresses.append(address)
+        return index
+
+    def address_at(self, index: int | None) -> str | None:
+        return None if index is None else self.addresses[index]
+
+    # ------------------------------------------------------------------
+    # Building / combining
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "SwapBatch":
+        """Batch from legacy decoder dicts (Decimal amounts, int timestamps)."""
+        batch = cls()
+        for row in rows:
+            batch.block_number.append(row["block_number"])
+            batch.timestamp.append(row["timestamp"])
+            batch.tx_hash.append(row["tx_hash"])
+            batch.log_index.append(row["log_index"])
+            batch.sender.append(batch.intern(row["sender"]))
+            batch.recipient.append(batch.intern(row["recipient"]))
+            batch.caller.append(batch.intern(row.get("caller")))
+            batch.router_tag.append(row.get("router_tag"))
+            batch.base_delta.append(to_fixed(row["base_delta"]))
+            batch.quote_delta.append(to_fixed(row["quote_delta"]))
+            batch.price.append(to_fixed(row["price"]))
+            batch.liquidity.append(row.get("liquidity"))
+            batch.tick.append(row.get("tick"))
+            batch.is_buy.append(row["is_buy"])
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable["SwapBatch"]) -> "SwapBatch":
+        """One batch holding every swap of `batches`, addresses re-interned (no minute partials)."""
+        out = cls()
+        for batch in batches:
+            remap = [out.intern(a) for a in batch.addresses]
+            for name in COLUMNS:
+                column = getattr(batch, name)
+                if name in ("sender", "recipient", "caller"):
+                    column = [None if i is None else remap[i] for i in column]
+                getattr(out, name).extend(column)
+        return out
+
+    # ------------------------------------------------------------------
+    # DB boundary
+    # ------------------------------------------------------------------
+    def rows(self, raw: bool = False) -> list[dict]:
+        """
+        Per-swap dicts for the *raw_swaps* insert: Decimal amounts and
+        UTC datetimes.  `raw=True` keeps fixed-point ints / epoch seconds.
+        """
+        amount = (lambda v: v) if raw else from_fixed
+        if raw:
+            when = lambda ts: ts
+        else:   # one datetime per distinct second, not per swap
+            when = {ts: datetime.fromtimestamp(ts, tz=timezone.utc) for ts in set(self.timestamp)}.__getitem__
+        addr = self.addresses
+        return [
+            {
+                "block_number": self.block_number[i],
+                "timestamp": when(self.timestamp[i]),
+                "tx_hash": self.tx_hash[i],
+                "log_index": self.log_index[i],
+                "sender": addr[self.sender[i]],
+                "recipient": addr[self.recipient[i]],
+                "caller": self.address_at(self.caller[i]),
+                "router_tag": self.router_tag[i],
+                "base_delta": amount(self.base_delta[i]),
+                "quote_delta": amount(self.quote_delta[i]),
+                "base_vol": amount(abs(self.base_delta[i])),
+                "quote_vol": amount(abs(self.quote_delta[i])),
+                "price": amount(self.price[i]),
+                "liquidity": self.liquidity[i],
+                "tick": self.tick[i],
+                "is_buy": self.is_buy[i],
+            }
+            for i in range(len(self))
+        ]
+
+    # ------------------------------------------------------------------
+    # Wire format (see app/celery/serialization.py)
+    # ------------------------------------------------------------------
+    def to_payload(self) -> dict:
+        """Plain msgpack-able dict: ints as fixed-width blobs, hashes as one blob."""
+        payload = {"n": len(self), "addresses": self.addresses,
+                   "is_buy": bytes(self.is_buy), "router_tag": self.router_tag}
+        for name in INT_COLUMNS:
+            payload[name] = _pack_ints(getattr(self, name))
+        payload["caller"] = _pack_ints(self.caller)
+        payload["tx_hash"] = _pack_hashes(self.tx_hash)
+        if self.minutes is not None:
+            payload["minutes"] = {name: _pack_ints(self.minutes[name]) for name in MINUTE_COLUMNS}
+            payload["n_minutes"] = len(self.minutes["minute"])
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "SwapBatch":
+        n = payload["n"]
+        columns = {name: _unpack_ints(payload[name], n) for name in INT_COLUMNS + ("caller",)}
+        columns["tx_hash"] = _unpack_hashes(payload["tx_hash"])
+        columns["is_buy"] = [bool(b) for b in payload["is_buy"]]
+        columns["router_tag"] = payload["router_tag"]
+        minutes = payload.get("minutes")
+        if minutes is not None:
+            minutes = {name: _unpack_ints(minutes[name], payload["n_minutes"]) for name in MINUTE_COLUMNS}
+        return cls(payload["addresses"], minutes=minutes, **columns)
+
+
+def as_batch(chunk) -> SwapBatch:
+    """Accept a SwapBatch or a legacy list of decoder dicts (in-flight messages)."""
+    return chunk if isinstance(chunk, SwapBatch) else SwapBatch.from_rows(chunk)
+
+
+# ----------------------------------------------------------------------
+# Column packing
+# ----------------------------------------------------------------------
+def _pack_ints(values: list) -> dict | None:
+    """
+    Int column → {"w": width, "b": little-endian signed blob}; an all-None
+    column → None.  A column mixing ints and None also gets "null", one
+    byte per row (1 = None), with None rows stored as 0 in the blob.
+    """
+    nulls = bytes([v is None for v in values])
+    if all(nulls):
+        return None
+    present = [v for v in values if v is not None] if any(nulls) else values
+    lo, hi = min(present), max(present)
+    width = max(1, (max(hi.bit_length(), (~lo).bit_length()) + 8) // 8)
+    packed = {"w": width, "b": b"".join([(v or 0).to_bytes(width, "little", signed=True) for v in values])}
+    if any(nulls):
+        packed["null"] = nulls
+    return packed
+
+
+def _unpack_ints(packed, n: int) -> list:
+    if packed is None:
+        return [None] * n
+    if isinstance(packed, list):      # in-flight messages from before the null mask
+        return packed
+    width, blob = packed["w"], packed["b"]
+    from_bytes = int.from_bytes
+    values = [from_bytes(blob[i:i + width], "little", signed=True) for i in range(0, len(blob), width)]
+    nulls = packed.get("null")
+    if nulls is not None:
+        values = [None if null else v for v, null in zip(values, nulls)]
+    return values
+
+
+def _pack_hashes(hashes: list[str]) -> bytes | list[str]:
+    """64-hex tx hashes → one 32-byte-per-hash blob (anything else stays a list)."""
+    try:
+        blob = b"".join([bytes.fromhex(h) for h in hashes])
+    except ValueError:
+        return list(hashes)
+    return blob if len(blob) == 32 * len(hashes) else list(hashes)
+
+
+def _unpack_hashes(packed) -> list[str]:
+    if isinstance(packed, list):
+        return packed
+    return [packed[i:i + 32].hex() for i in range(0, len(packed), 32)]
@@ -0,0 +1,15 @@
+from sqlalchemy import Table, Column, BigInteger, Text, TIMESTAMP, MetaData, PrimaryKeyConstraint, func
+
+metadata = MetaData()
+
+# Coverage ledger: every block range whose swaps were committed for a pool.
+# Rows may overlap; readers merge them into disjoint intervals.
+block_coverage_table = Table(
+    "block_coverage",
+    metadata,
+    Column("pool_slug", Text, nullable=False),
+    Column("from_block", BigInteger, nullable=False),
+    Column("to_block", BigInteger, nullable=False),
+    Column("created_at", TIMESTAMP(timezone=True), server_default=func.now()),
+    PrimaryKeyConstraint("pool_slug", "from_block", "to_block"),
+)
@@ -0,0 +1,14 @@
+from sqlalchemy import Table, Column, BigInteger, Text, MetaData, PrimaryKeyConstraint
+
+metadata = MetaData()
+
+# Per-chain block height ↔ unix timestamp checkpoints collected while
+# searching for blocks by time. Rows are immutable once a block is final.
+block_time_index_table = Table(
+    "block_time_index",
+    metadata,
+    Column("chain", Text, nullable=False),
+    Column("block_number", BigInteger, nullable=False),
+    Column("timestamp", BigInteger, nullable=False),
+    PrimaryKeyConstraint("chain", "block_number"),
+)
@@ -1,4 +1,5 @@
 from sqlalchemy import Table, Column, Integer, Numeric, Text, TIMESTAMP, MetaData, func
+from sqlalchemy.dialects.postgresql import JSONB
 
 # Define the table schema (can be placed in a separate models file)
 metadata = MetaData()
@@ -11,5 +12,9 @@ extraction_metrics_table = Table(
     Column("block_range", Text),
     Column("pool_slug", Text, nullable=True),  # new, nullable for legacy rows
     Column("log_count", Integer, nullable=False),
-    Column("duration_seconds", Numeric(10, 2))
+    Column("duration_seconds", Numeric(10, 2)),
+    # block-timestamp resolution cost (nullable for legacy rows)
+    Column("timestamp_rpc_calls", Integer, nullable=True),
+    Column("timestamp_cache_hit_rate", Numeric(5, 4), nullable=True),
+    Column("range_stats", JSONB, nullable=True),  # per crawled range
 )
@@ -0,0 +1,229 @@
+"""
+Offline stand-in for an EVM JSON-RPC node.
+
+Timestamps follow a piecewise block-time schedule (plus a small wobble) so
+the chain looks like Arbitrum / Base without hitting Alchemy.  Every call is
+counted, and an optional per-call latency makes wall-time numbers meaningful.
+"""
+import math
+import time
+from types import SimpleNamespace
+
+# (first_block, seconds_per_block) – rough history of each chain's cadence
+ARBITRUM_SCHEDULE = [(0, 1.0), (22_000_000, 0.26), (150_000_000, 0.25)]
+BASE_SCHEDULE = [(0, 2.0)]
+
+ARBITRUM_GENESIS_TS = 1_622_240_000
+BASE_GENESIS_TS = 1_686_789_347
+
+
+class FakeChain:
+    def __init__(
+        self,
+        schedule,
+        latest_block: int,
+        genesis_ts: int,
+        wobble: float = 0.0,
+        latency: float = 0.0,
+    ):
+        self.schedule = sorted(schedule)
+        self.latest_block = latest_block
+        self.genesis_ts = genesis_ts
+        self.wobble = wobble
+        self.latency = latency
+        self.calls = 0
+        self.eth = _FakeEth(self)
+
+        # cumulative seconds at the start of every schedule segment
+        self._offsets = []
+        acc = 0.0
+        for i, (start, bt) in enumerate(self.schedule):
+            self._offsets.append(acc)
+            if i + 1 < len(self.schedule):
+                acc += (self.schedule[i + 1][0] - start) * bt
+
+    def timestamp(self, block: int) -> int:
+        for i in range(len(self.schedule) - 1, -1, -1):
+            start, bt = self.schedule[i]
+            if block >= start:
+                seconds = self._offsets[i] + (block - start) * bt
+                break
+        # bounded wobble keeps timestamps non-decreasing while making
+        # individual block times irregular
+        seconds += self.wobble * math.sin(block / 997.0)
+        return self.genesis_ts + int(seconds)
+
+    def first_block_at_or_after(self, ts: int) -> int:
+        lo, hi = 0, self.latest_block + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _hit(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def block(self, number) -> dict:
+        if number == "latest":
+            number = self.latest_block
+        if number > self.latest_block:
+            return None
+        ts = self.timestamp(number)
+        return {"number": number, "timestamp": ts}
+
+
+class _FakeEth:
+    def __init__(self, chain: FakeChain):
+        self._chain = chain
+
+    @property
+    def block_number(self) -> int:
+        self._chain._hit()
+        return self._chain.latest_block
+
+    def get_block(self, number, full_transactions: bool = False):
+        self._chain._hit()
+        blk = self._chain.block(number)
+        if blk is None:
+            raise ValueError(f"block {number} not found")
+        return _AttrDict(blk)
+
+
+class _AttrDict(dict):
+    __getattr__ = dict.__getitem__
+
+
+def arbitrum_chain(**kw) -> FakeChain:
+    return FakeChain(ARBITRUM_SCHEDULE, 300_000_000, ARBITRUM_GENESIS_TS, **kw)
+
+
+def base_chain(**kw) -> FakeChain:
+    return FakeChain(BASE_SCHEDULE, 30_000_000, BASE_GENESIS_TS, **kw)
+
+
+def fake_w3(chain: FakeChain):
+    return SimpleNamespace(eth=chain.eth)
+
+
+class FakeRpcServer:
+    """Answers JSON-RPC batches (eth_getBlockByNumber) the way `requests.post` would."""
+
+    def __init__(self, chain: FakeChain):
+        self.chain = chain
+        self.round_trips = 0
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.round_trips += 1
+        if self.chain.latency:
+            time.sleep(self.chain.latency)
+        replies = []
+        for req in json:
+            self.calls += 1
+            assert req["method"] == "eth_getBlockByNumber"
+            blk = self.chain.block(int(req["params"][0], 16))
+            result = None if blk is None else {
+                "number": hex(blk["number"]),
+                "timestamp": hex(blk["timestamp"]),
+            }
+            replies.append({"jsonrpc": "2.0", "id": req["id"], "result": result})
+        return _FakeResponse(replies)
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the few Redis calls the caches and throttles make."""
+
+    def __init__(self, fail: bool = False):
+        self.store = {}
+        self.ttls = {}
+        self.zsets = {}
+        self.lists = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            from redis.exceptions import ConnectionError
+            raise ConnectionError("redis stand-in is down")
+
+    def mget(self, keys):
+        self._check()
+        return [self.store.get(k) for k in keys]
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.store[key] = str(value).encode()
+        self.ttls[key] = ex
+
+    def zadd(self, key, mapping):
+        self._check()
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zrem(self, key, *members):
+        self._check()
+        zset = self.zsets.get(key, {})
+        return sum(zset.pop(m, None) is not None for m in members)
+
+    def zremrangebyscore(self, key, low, high):
+        self._check()
+        low, high = float(low), float(high)
+        zset = self.zsets.get(key, {})
+        gone = [m for m, score in zset.items() if low <= score <= high]
+        for member in gone:
+            del zset[member]
+        return len(gone)
+
+    def zcard(self, key):
+        self._check()
+        return len(self.zsets.get(key, {}))
+
+    def hincrby(self, key, field, amount=1):
+        self._check()
+        fields = self.store.setdefault(key, {})
+        fields[field.encode()] = str(int(fields.get(field.encode(), b"0")) + amount).encode()
+        return int(fields[field.encode()])
+
+    def hgetall(self, key):
+        self._check()
+        return dict(self.store.get(key, {}))
+
+    def llen(self, key):
+        self._check()
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    """Queues calls and runs them against the FakeRedis on execute()."""
+
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        ops, self._ops = self._ops, []
+        return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in ops]
@@ -0,0 +1,73 @@
+"""
+Synthetic Swap logs shaped exactly like the orchestrator's `sanitize_log`
+output, for decoder and payload tests that must not hit an RPC node.
+"""
+import random
+
+from eth_abi import encode
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_TOPIC as V3_SWAP_TOPIC
+from app.sources.dex_data_pipeline.evm.utils.uniswap_v2_decoder import SWAP_ABI as V2_SWAP_ABI
+from app.utils.log_utils import sanitize_log
+
+POOL = "0xC31E54c7a869B9FcBEcc14363CF510d1c41fa443"
+V2_POOL = "0xcDAC0d6c6C59727a65F871236188350531885C43"  # Aerodrome vAMM WETH/USDC
+
+V2_SWAP_TOPIC = event_abi_to_log_topic(V2_SWAP_ABI)
+
+
+def _topic_address(rng: random.Random) -> HexBytes:
+    return HexBytes(b"\0" * 12 + rng.randbytes(20))
+
+
+def _log(address: str, topic: bytes, data: bytes, rng: random.Random, block: int, log_index: int) -> dict:
+    return sanitize_log(AttributeDict({
+        "address": address,
+        "topics": [HexBytes(topic), _topic_address(rng), _topic_address(rng)],
+        "data": HexBytes(data),
+        "blockNumber": block,
+        "transactionHash": HexBytes(rng.randbytes(32)),
+        "transactionIndex": rng.randint(0, 200),
+        "blockHash": HexBytes(rng.randbytes(32)),
+        "logIndex": log_index,
+        "removed": False,
+    }))
+
+
+def v3_swap_log(rng: random.Random, block: int, log_index: int) -> dict:
+    amount0 = rng.randint(10**14, 10**20) * rng.choice((1, -1))
+    amount1 = -amount0 // 10**9 * rng.randint(2_500, 3_500)  # ~3k USDC per WETH
+    data = encode(
+        ["int256", "int256", "uint160", "uint128", "int24"],
+        [amount0, amount1, rng.randint(2**60, 2**100), rng.randint(10**15, 10**22), rng.randint(-887_272, 887_272)],
+    )
+    return _log(POOL, V3_SWAP_TOPIC, data, rng, block, log_index)
+
+
+def v3_swap_logs(n: int, first_block: int, span: int, seed: int = 1) -> list[dict]:
+    """`n` swaps spread over blocks [first_block, first_block + span), block-ordered."""
+    rng = random.Random(seed)
+    blocks = sorted(rng.randrange(first_block, first_block + span) for _ in range(n))
+    return [v3_swap_log(rng, b, i) for i, b in enumerate(blocks)]
+
+
+def v2_swap_log(rng: random.Random, block: int, log_index: int) -> dict:
+    weth = rng.randint(10**14, 10**20)
+    usdc = weth // 10**9 * rng.randint(2_500, 3_500)
+    if rng.random() < 0.5:   # WETH in, USDC out
+        amounts = [weth, 0, 0, usdc]
+    else:                     # USDC in, WETH out
+        amounts = [0, usdc, weth, 0]
+    if rng.random() < 0.05:  # aggregator routes sometimes pay in both tokens
+        amounts[0] += rng.randint(1, 10**12)
+    return _log(V2_POOL, V2_SWAP_TOPIC, encode(["uint256"] * 4, amounts), rng, block, log_index)
+
+
+def v2_swap_logs(n: int, first_block: int, span: int, seed: int = 1) -> list[dict]:
+    """`n` V2 swaps spread over blocks [first_block, first_block + span), block-ordered."""
+    rng = random.Random(seed)
+    blocks = sorted(rng.randrange(first_block, first_block + span) for _ in range(n))
+    return [v2_swap_log(rng, b, i) for i, b in enumerate(blocks)]
@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.sources.dex_data_pipeline.evm.utils.block_index import BlockTimeIndex
+from app.sources.dex_data_pipeline.evm.utils.blocks import BlockClient
+from app.storage.models.block_time_index import block_time_index_table
+from chain_stand_in import arbitrum_chain, base_chain, fake_w3
+
+DAY = 86_400
+TICK = 30 * 60  # dispatcher cadence
+
+
+def test_bracket_returns_straddling_checkpoints():
+    index = BlockTimeIndex("arbitrum", [(100, 1_000), (200, 1_050), (300, 1_100)])
+
+    assert index.bracket(1_050) == ((100, 1_000), (200, 1_050))
+    assert index.bracket(1_051) == ((200, 1_050), (300, 1_100))
+    assert index.bracket(999) == (None, (100, 1_000))
+    assert index.bracket(2_000) == ((300, 1_100), None)
+
+
+def test_add_tracks_only_new_points_for_flush():
+    index = BlockTimeIndex("base", [(10, 500)])
+    index.add(10, 500)
+    index.add(20, 520)
+
+    assert len(index) == 2
+    assert index._pending == {20: 520}
+    assert index.get(20) == 520
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+
+
+def test_flush_keeps_checkpoints_near_the_head_pending():
+    index = BlockTimeIndex("base", safe_seconds=600)
+    index.add(100, 1_000)
+    index.add(350, 1_500)
+    index.add_head(400, 1_600)      # head may still be reorged
+    db = _RecordingSession()
+
+    assert index.flush(db) == 1
+    assert index._pending == {350: 1_500, 400: 1_600}
+    [stmt] = db.statements
+    assert stmt.compile().params["block_number_m0"] == 100
+
+    index.add_head(1_000, 2_200)    # head moved on: the older ones are now safe
+    assert index.flush(db) == 2
+    assert index._pending == {1_000: 2_200}
+
+
+def test_load_reads_only_the_window_and_one_neighbour_each_side():
+    engine = create_engine("sqlite://")
+    block_time_index_table.metadata.create_all(engine)
+    points = [(b, 1_000 + 10 * b) for b in range(0, 100, 10)]
+    with Session(engine) as db:
+        db.execute(block_time_index_table.insert(), [
+            {"chain": "arbitrum", "block_number": b, "timestamp": ts} for b, ts in points
+        ] + [{"chain": "base", "block_number": 50, "timestamp": 1_500}])
+
+        windowed = BlockTimeIndex.load(db, "arbitrum", from_ts=1_350, to_ts=1_600)
+        everything = BlockTimeIndex.load(db, "arbitrum")
+
+    assert windowed._blocks == [30, 40, 50, 60, 70]
+    assert everything._blocks == [b for b, _ in points]
+    assert windowed._pending == {}
+
+
+@pytest.mark.parametrize("make_chain", [arbitrum_chain, base_chain])
+def test_indexed_search_matches_full_bisection(make_chain):
+    chain = make_chain(wobble=30)
+    head_ts = chain.timestamp(chain.latest_block)
+    index = BlockTimeIndex("test")
+    indexed = BlockClient(fake_w3(chain), index=index)
+    plain = BlockClient(fake_w3(chain))
+
+    for days in (1, 7, 30):
+        for tick in range(3):
+            target = head_ts - days * DAY + tick * TICK
+            found = indexed.find_block_by_timestamp(target)
+            expected = plain.find_block_by_timestamp(target)
+            # blocks sharing a second are interchangeable for an exact match
+            assert chain.timestamp(found) == chain.timestamp(expected)
+            assert chain.timestamp(found - 1) <= target <= chain.timestamp(found)
+
+
+def _resolve_windows(client: BlockClient, head_ts: int, shift: int) -> None:
+    for days in (1, 7, 30):
+        client.find_block_by_timestamp(head_ts - days * DAY + shift)
+
+
+@pytest.mark.parametrize("make_chain", [arbitrum_chain, base_chain])
+def test_index_saves_rpcs_on_later_ticks(make_chain):
+    """RPCs to resolve 1/7/30-day windows over successive dispatcher ticks."""
+    chain = make_chain(wobble=30)
+    head_ts = chain.timestamp(chain.latest_block)
+    index = BlockTimeIndex("test")
+
+    rpcs = {}
+    for label, make_client in (
+        ("bisect", lambda: BlockClient(fake_w3(chain))),
+        ("indexed", lambda: BlockClient(fake_w3(chain), index=index)),
+    ):
+        per_tick = []
+        for tick in range(4):
+            client = make_client()
+            client.get_latest_block()
+            _resolve_windows(client, head_ts, tick * TICK)
+            per_tick.append(client.rpc_calls)
+        rpcs[label] = per_tick
+
+    assert sum(rpcs["indexed"][1:]) < sum(rpcs["bisect"][1:])
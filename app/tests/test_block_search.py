@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from app.sources.dex_data_pipeline.evm.utils.block_index import BlockTimeIndex
+from app.sources.dex_data_pipeline.evm.utils import blocks
+from app.sources.dex_data_pipeline.evm.utils.blocks import BlockClient
+from chain_stand_in import FakeChain, FakeRpcServer, arbitrum_chain, base_chain, fake_w3
+
+DAY = 86_400
+
+# Cadence jumps between 0.1 s and 2 s blocks – far from the 0.25 s estimate.
+IRREGULAR_SCHEDULE = [(i * 1_000_000, (0.1, 0.25, 2.0, 0.5)[i % 4]) for i in range(40)]
+
+
+def irregular_chain(**kw) -> FakeChain:
+    return FakeChain(IRREGULAR_SCHEDULE, 40_000_000, 1_700_000_000, wobble=20, **kw)
+
+
+def _interpolating(chain: FakeChain, block_time: float, **kw) -> BlockClient:
+    return BlockClient(fake_w3(chain), search_mode="interpolate", block_time=block_time, **kw)
+
+
+@pytest.mark.parametrize(
+    "make_chain,block_time",
+    [(arbitrum_chain, 0.25), (base_chain, 2.0), (irregular_chain, 0.25)],
+)
+def test_interpolation_finds_first_block_at_target(make_chain, block_time):
+    chain = make_chain()
+    client = _interpolating(chain, block_time)
+    head_ts = chain.timestamp(chain.latest_block)
+    rng = random.Random(7)
+
+    targets = [head_ts - rng.randint(0, head_ts - chain.genesis_ts) for _ in range(40)]
+    targets += [head_ts - d * DAY for d in (1, 7, 30)]
+    for target in targets:
+        assert client.find_block_by_timestamp(target) == chain.first_block_at_or_after(target)
+
+
+def test_interpolation_out_of_range_targets():
+    chain = base_chain()
+    client = _interpolating(chain, 2.0)
+
+    assert client.find_block_by_timestamp(chain.genesis_ts - 10) == 0
+    assert client.find_block_by_timestamp(chain.timestamp(chain.latest_block) + 10) == chain.latest_block + 1
+
+
+def test_interpolation_uses_index_bracket():
+    chain = arbitrum_chain(wobble=30)
+    index = BlockTimeIndex("arbitrum")
+    client = _interpolating(chain, 0.25, index=index)
+    head_ts = chain.timestamp(chain.latest_block)
+
+    client.find_block_by_timestamp(head_ts - DAY)
+    before = client.rpc_calls
+    found = client.find_block_by_timestamp(head_ts - DAY + 1_800)
+
+    assert found == chain.first_block_at_or_after(head_ts - DAY + 1_800)
+    assert client.rpc_calls - before <= 8
+
+
+@pytest.mark.parametrize(
+    "name,make_chain,block_time",
+    [("arbitrum", arbitrum_chain, 0.25), ("base", base_chain, 2.0), ("irregular", irregular_chain, 0.25)],
+)
+def test_interpolation_rpc_savings(name, make_chain, block_time):
+    chain = make_chain(**({} if name == "irregular" else {"wobble": 30}))
+    head_ts = chain.timestamp(chain.latest_block)
+
+    counts = {}
+    for mode in ("bisect", "interpolate"):
+        per_search = []
+        for days in (1, 7, 30):
+            client = BlockClient(fake_w3(chain), search_mode=mode, block_time=block_time)
+            client.find_block_by_timestamp(head_ts - days * DAY)
+            per_search.append(client.rpc_calls)
+        counts[mode] = per_search
+    print(f"\n[{name}] RPCs per 1/7/30-day search  bisect={counts['bisect']}  interpolate={counts['interpolate']}")
+
+    if name == "irregular":
+        assert sum(counts["interpolate"]) < sum(counts["bisect"])
+    else:
+        assert sum(counts["interpolate"]) * 3 < sum(counts["bisect"])
+        assert max(counts["interpolate"]) <= 8
+
+
+@pytest.fixture
+def rpc_server(monkeypatch):
+    def install(chain: FakeChain) -> FakeRpcServer:
+        server = FakeRpcServer(chain)
+        monkeypatch.setattr(blocks.requests, "post", server.post)
+        return server
+    return install
+
+
+def _batched(chain: FakeChain, block_time=None, **kw) -> BlockClient:
+    return BlockClient(
+        fake_w3(chain), search_mode="batched", block_time=block_time, rpc_url="http://stand-in", **kw
+    )
+
+
+@pytest.mark.parametrize("block_time", [None, 0.25])
+def test_batched_search_finds_first_block_at_target(rpc_server, block_time):
+    chain = irregular_chain()
+    rpc_server(chain)
+    client = _batched(chain, block_time)
+    head_ts = chain.timestamp(chain.latest_block)
+    rng = random.Random(11)
+
+    for _ in range(25):
+        target = head_ts - rng.randint(0, head_ts - chain.genesis_ts)
+        assert client.find_block_by_timestamp(target) == chain.first_block_at_or_after(target)
+    assert client.find_block_by_timestamp(chain.genesis_ts - 1) == 0
+
+
+def test_batched_search_round_trips(rpc_server):
+    """Round trips to resolve 1/7/30-day targets on a 300M-block chain."""
+    chain = arbitrum_chain(wobble=30)
+    server = rpc_server(chain)
+    head_ts = chain.timestamp(chain.latest_block)
+
+    trips = {}
+    for label, make_client in (
+        ("bisect", lambda: BlockClient(fake_w3(chain))),
+        ("k-ary", lambda: _batched(chain)),
+        ("k-ary+estimate", lambda: _batched(chain, 0.25)),
+    ):
+        per_search = []
+        for days in (1, 7, 30):
+            client = make_client()
+            target = head_ts - days * DAY
+            found = client.find_block_by_timestamp(target)
+            assert chain.timestamp(found) == chain.timestamp(chain.first_block_at_or_after(target))
+            per_search.append((client.round_trips, client.rpc_calls))
+        trips[label] = per_search
+        print(f"\n[arbitrum] {label:15s} (round trips, rpc calls) per 1/7/30-day search: {per_search}")
+
+    assert server.round_trips > 0
+    assert max(rt for rt, _ in trips["k-ary"]) <= 7
+    assert max(rt for rt, _ in trips["k-ary+estimate"]) <= 4
+    assert all(rt >= 25 for rt, _ in trips["bisect"])
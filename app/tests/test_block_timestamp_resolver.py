@@ -0,0 +1,250 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from app.sources.dex_data_pipeline.evm.utils import blocks as blocks_mod
+from app.sources.dex_data_pipeline.evm.utils.blocks import BlockTimestampResolver
+from app.utils.layered_cache import LayeredCache
+from chain_stand_in import FakeRedis, FakeRpcServer, arbitrum_chain, fake_w3
+
+
+def _resolver(segments=()) -> BlockTimestampResolver:
+    resolver = BlockTimestampResolver(w3=None, rpc_url="http://stand-in")
+    if segments:
+        resolver.add_segments(list(segments))
+    return resolver
+
+
+def _linear_estimate(ranges, block_number: int) -> int:
+    """The original per-log scan, kept as the reference implementation."""
+    for start, end, ts_start, slope in ranges:
+        if start <= block_number <= end:
+            return int(ts_start + (block_number - start) * slope)
+    raise ValueError(f"Block {block_number} not in any cached range")
+
+
+def _crawl_segments(n: int, width: int = 250, first_block: int = 200_000_000):
+    """`n` back-to-back segments like a long backfill produces."""
+    rng = random.Random(3)
+    segments, ts = [], 1_700_000_000
+    for k in range(n):
+        b0 = first_block + k * width
+        t1 = ts + rng.randint(50, 80)
+        segments.append((b0, b0 + width, ts, (t1 - ts) / width))
+        ts = t1
+    return segments
+
+
+def test_add_segments_keeps_ranges_sorted_and_disjoint():
+    resolver = _resolver()
+    resolver.add_segments([(300, 400, 3_000, 1.0)])
+    resolver.add_segments([(100, 200, 1_000, 1.0)])
+    resolver.add_segments([(200, 300, 2_000, 10.0)])
+
+    # the newest run owns both of its endpoints
+    assert [r[:2] for r in resolver.ranges] == [(100, 200), (200, 300), (301, 400)]
+    assert resolver._starts == [100, 200, 301]
+    assert resolver.estimate_timestamp(200) == 2_000
+    assert resolver.estimate_timestamp(300) == 3_000
+    assert resolver.estimate_timestamp(301) == 3_001
+
+
+def test_overlapping_insert_trims_and_splits_old_segments():
+    resolver = _resolver([(0, 1_000, 0, 1.0)])
+    resolver.add_segments([(400, 500, 10_000, 2.0), (500, 600, 10_200, 2.0)])
+
+    assert resolver.ranges == [
+        (0, 400, 0, 1.0),
+        (400, 500, 10_000, 2.0),
+        (500, 600, 10_200, 2.0),
+        (601, 1_000, 601.0, 1.0),
+    ]
+    assert resolver.estimate_timestamp(399) == 399
+    assert resolver.estimate_timestamp(450) == 10_100
+    assert resolver.estimate_timestamp(601) == 601
+
+    # a span that swallows several segments replaces them outright
+    resolver.add_segments([(300, 700, 5_000, 0.5)])
+    assert [r[:2] for r in resolver.ranges] == [(0, 300), (300, 700), (701, 1_000)]
+
+
+def test_covers_requires_contiguous_segments():
+    resolver = _resolver([(100, 200, 0, 1.0), (200, 300, 100, 1.0), (350, 400, 250, 1.0)])
+
+    assert resolver.covers(120, 290)
+    assert resolver.covers(100, 300)
+    assert not resolver.covers(250, 360)
+    assert not resolver.covers(50, 150)
+    assert not resolver.covers(390, 401)
+
+
+def test_estimate_raises_outside_segments():
+    resolver = _resolver([(100, 200, 0, 1.0)])
+
+    with pytest.raises(ValueError):
+        resolver.estimate_timestamp(99)
+    with pytest.raises(ValueError):
+        resolver.estimate_timestamps(np.array([150, 201]))
+
+
+def test_vectorised_estimates_match_linear_scan():
+    segments = _crawl_segments(500)
+    resolver = _resolver(segments)
+    rng = random.Random(5)
+    blocks = [rng.randint(segments[0][0], segments[-1][1]) for _ in range(5_000)]
+
+    vectorised = resolver.estimate_timestamps(np.array(blocks)).tolist()
+    assert vectorised == [_linear_estimate(segments, b) for b in blocks]
+    assert vectorised == [resolver.estimate_timestamp(b) for b in blocks]
+
+
+def test_assign_timestamps_stamps_logs_without_refetching(monkeypatch):
+    segments = _crawl_segments(10)
+    resolver = _resolver(segments)
+    monkeypatch.setattr(resolver, "batch_get_block_timestamps", lambda *_: pytest.fail("covered span refetched"))
+    logs = [{"blockNumber": b} for b in (segments[2][0] + 7, segments[5][0], segments[2][0] + 7)]
+
+    block_ts = resolver.assign_timestamps(logs)
+
+    assert [log["timestamp"] for log in logs] == [_linear_estimate(segments, log["blockNumber"]) for log in logs]
+    assert block_ts == {log["blockNumber"]: log["timestamp"] for log in logs}
+
+
+@pytest.mark.benchmark
+def test_benchmark_assign_timestamps_100k_logs_10k_segments(monkeypatch):
+    """Per-batch cost of stamping 100k logs once 10k segments have been crawled."""
+    segments = _crawl_segments(10_000)
+    resolver = _resolver(segments)
+    monkeypatch.setattr(resolver, "batch_get_block_timestamps", lambda *_: pytest.fail("covered span refetched"))
+    rng = random.Random(9)
+    lo, hi = segments[0][0], segments[-1][1]
+    logs = [{"blockNumber": rng.randint(lo, hi)} for _ in range(100_000)]
+
+    # the linear scan is far too slow for 100k logs – time a sample and scale
+    sample = logs[:500]
+    t0 = time.perf_counter()
+    expected = [_linear_estimate(segments, log["blockNumber"]) for log in sample]
+    linear = (time.perf_counter() - t0) * len(logs) / len(sample)
+
+    t0 = time.perf_counter()
+    for log in logs:
+        resolver.estimate_timestamp(log["blockNumber"])
+    bisected = time.perf_counter() - t0
+
+    blocks = np.array([log["blockNumber"] for log in logs])
+    t0 = time.perf_counter()
+    resolver.estimate_timestamps(blocks)
+    vectorised = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    resolver.assign_timestamps(logs)
+    assigned = time.perf_counter() - t0
+
+    print(
+        f"\n100k logs / 10k segments  linear≈{linear * 1000:8.1f} ms (extrapolated)"
+        f"  bisect={bisected * 1000:6.1f} ms  numpy={vectorised * 1000:6.1f} ms"
+        f"  assign_timestamps={assigned * 1000:6.1f} ms"
+    )
+    assert [log["timestamp"] for log in sample] == expected
+    assert bisected * 10 < linear
+    assert vectorised * 3 < bisected
+    assert assigned * 10 < linear
+
+
+# ---------------------------------------------------------------------------
+# Exact mode
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def rpc_server(monkeypatch):
+    def install(chain, drop=()):
+        server = FakeRpcServer(chain)
+        post = server.post
+
+        def lossy_post(url, json=None, timeout=None):
+            resp = post(url, json=json, timeout=timeout)
+            for reply in resp.json():
+                if int(json[reply["id"]]["params"][0], 16) in drop:
+                    reply["result"] = None
+            return resp
+
+        monkeypatch.setattr(blocks_mod.requests, "post", lossy_post)
+        return server
+    return install
+
+
+def _exact(chain, redis=None, **kw) -> BlockTimestampResolver:
+    cache = LayeredCache("blockts:arbitrum", redis=redis)
+    return BlockTimestampResolver(fake_w3(chain), rpc_url="http://stand-in", exact=True, cache=cache, **kw)
+
+
+def _swap_logs(first_block: int, n_blocks: int, per_block: int = 2):
+    return [{"blockNumber": first_block + i} for i in range(n_blocks) for _ in range(per_block)]
+
+
+def test_exact_mode_fetches_each_block_once_in_chunked_batches(rpc_server):
+    chain = arbitrum_chain(wobble=30)
+    server = rpc_server(chain)
+    resolver = _exact(chain, rpc_batch_size=100)
+    logs = _swap_logs(250_000_000, 250)
+
+    resolver.assign_timestamps(logs)
+
+    assert all(log["timestamp"] == chain.timestamp(log["blockNumber"]) for log in logs)
+    assert (server.round_trips, server.calls) == (3, 250)
+    assert resolver.last_stats == {"blocks": 250, "cache_hits": 0, "rpc_calls": 250, "round_trips": 3}
+
+    # the next range overlaps the last 50 blocks – only the new ones are fetched
+    resolver.assign_timestamps(_swap_logs(250_000_200, 100))
+    assert resolver.last_stats == {"blocks": 100, "cache_hits": 50, "rpc_calls": 50, "round_trips": 1}
+
+
+def test_exact_mode_shares_blocks_through_redis(rpc_server):
+    chain = arbitrum_chain()
+    server = rpc_server(chain)
+    redis = FakeRedis()
+    logs = _swap_logs(250_000_000, 40)
+
+    _exact(chain, redis).assign_timestamps(logs)
+    worker = _exact(chain, redis)  # fresh LRU, e.g. another process
+    worker.assign_timestamps([dict(log) for log in logs])
+
+    assert server.calls == 40
+    assert worker.last_stats["rpc_calls"] == 0
+    assert worker.last_stats["cache_hits"] == 40
+
+
+def test_exact_mode_rescues_null_replies_with_web3(rpc_server):
+    chain = arbitrum_chain()
+    rpc_server(chain, drop={250_000_003})
+    resolver = _exact(chain)
+    logs = _swap_logs(250_000_000, 5)
+
+    resolver.assign_timestamps(logs)
+
+    assert logs[6]["timestamp"] == chain.timestamp(250_000_003)
+    assert chain.calls == 1  # single Web3 get_block for the dropped block
+
+
+def test_exact_mode_keeps_swaps_in_their_minute(rpc_server):
+    """Interpolated timestamps drift across minute boundaries; exact ones do not."""
+    chain = arbitrum_chain(wobble=30)
+    rpc_server(chain)
+    rng = random.Random(2)
+    first = 250_000_000
+    logs = [{"blockNumber": first + rng.randint(0, 20_000)} for _ in range(2_000)]
+
+    def wrong_minutes(resolver):
+        stamped = [dict(log) for log in logs]
+        resolver.assign_timestamps(stamped)
+        return sum(
+            log["timestamp"] // 60 != chain.timestamp(log["blockNumber"]) // 60 for log in stamped
+        )
+
+    interpolated = wrong_minutes(BlockTimestampResolver(fake_w3(chain), rpc_url="http://stand-in"))
+    exact = wrong_minutes(_exact(chain))
+    print(f"\nswaps bucketed into the wrong minute: interpolated={interpolated} exact={exact}")
+
+    assert exact == 0
+    assert interpolated > 0
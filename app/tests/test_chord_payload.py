@@ -0,0 +1,41 @@
+from kombu.utils.json import dumps
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils.uniswap_v3_decoder import decode_log_chunk
+from app.utils.log_utils import chunk_logs
+from chain_stand_in import arbitrum_chain
+from swap_logs import v3_swap_logs
+
+
+def _stamped_range(n_logs: int = 5_000, span: int = 10_000):
+    chain = arbitrum_chain(wobble=30)
+    logs = v3_swap_logs(n_logs, 250_000_000, span)
+    for log in logs:
+        log["timestamp"] = chain.timestamp(log["blockNumber"])
+    return chain, logs
+
+
+def test_decoder_reads_timestamp_from_each_log():
+    chain, logs = _stamped_range(50, 100)
+
+    swaps = decode_log_chunk(logs, SWAP_ABI, 18, 6, False)
+
+    assert swaps.timestamp == [chain.timestamp(log["blockNumber"]) for log in logs]
+
+
+def test_chord_header_payload_bytes_per_10k_block_range():
+    """JSON bytes of every decode-task signature for one busy 10k-block range."""
+    _, logs = _stamped_range()
+    chunks = chunk_logs(logs, n_chunks=8)
+    block_cache = {str(log["blockNumber"]): log["timestamp"] for log in logs}
+
+    before = sum(len(dumps([chunk, block_cache, SWAP_ABI, 18, 6, False])) for chunk in chunks)
+    after = sum(len(dumps([chunk, SWAP_ABI, 18, 6, False])) for chunk in chunks)
+    cache_bytes = len(dumps(block_cache))
+
+    print(
+        f"\n10k-block range, {len(logs)} logs in {len(chunks)} chunks: "
+        f"before={before / 1024:.0f} KiB  after={after / 1024:.0f} KiB  "
+        f"(block_cache {cache_bytes / 1024:.0f} KiB × {len(chunks)} tasks dropped)"
+    )
+    assert before - after >= cache_bytes * len(chunks)
@@ -0,0 +1,124 @@
+import logging
+
+from app.sources.dex_data_pipeline.evm.utils.chord_throttle import GLOBAL_SLOTS_KEY, ChordThrottle
+from chain_stand_in import FakeRedis
+
+
+class FakeResult:
+    def __init__(self, fail=False):
+        self.done = False
+        self.fail = fail
+
+    def ready(self):
+        return self.done
+
+    def failed(self):
+        return self.done and self.fail
+
+
+class Workers:
+    """Virtual clock: chords finish in dispatch order, one every `per_chord` seconds."""
+
+    def __init__(self, per_chord=0.5):
+        self.now = 0.0
+        self.per_chord = per_chord
+        self.queue = []
+        self._credit = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self._credit += seconds
+        while self.queue and self._credit >= self.per_chord:
+            self.queue.pop(0).done = True
+            self._credit -= self.per_chord
+
+    def dispatch(self, fail=False):
+        result = FakeResult(fail)
+        self.queue.append(result)
+        return result
+
+
+def _crawl(throttle, workers, n_ranges, fetch_seconds=0.1):
+    for i in range(n_ranges):
+        workers.sleep(fetch_seconds)          # eth_getLogs + stamping
+        throttle.submit(i * 100, i * 100 + 99, workers.dispatch)
+    throttle.drain()
+
+
+def test_per_pool_cap_blocks_the_fetch_loop():
+    unthrottled, throttled = Workers(), Workers()
+    free = ChordThrottle("pool", max_in_flight=10_000, global_max=None,
+                         clock=unthrottled.clock, sleep=unthrottled.sleep, poll_interval=0.1)
+    capped = ChordThrottle("pool", max_in_flight=8, global_max=None,
+                           clock=throttled.clock, sleep=throttled.sleep, poll_interval=0.1)
+
+    _crawl(free, unthrottled, 200)
+    _crawl(capped, throttled, 200)
+
+    print(f"\nchords in flight, fetch 10 ranges/s vs workers 2 ranges/s: "
+          f"unthrottled peak={free.peak_in_flight}, capped peak={capped.peak_in_flight}; "
+          f"lag p50 {free.summary()['lag_p50']:.0f}s → {capped.summary()['lag_p50']:.0f}s")
+    assert capped.peak_in_flight == 8 < free.peak_in_flight
+    assert capped.completed == free.completed == 200 and not capped.in_flight
+    assert capped.waited > 0 and free.waited == 0
+    # lag is fetched → committed; the cap keeps it near 8 chords' worth of work
+    assert capped.summary()["lag_max"] <= 8 * 0.5 + 1
+    assert free.summary()["lag_max"] > 50
+
+
+def test_global_cap_is_shared_between_orchestrators():
+    redis, workers = FakeRedis(), Workers()
+    kwargs = dict(global_max=4, redis=redis, clock=workers.clock, sleep=workers.sleep, poll_interval=0.1)
+    a = ChordThrottle("pool_a", max_in_flight=8, **kwargs)
+    b = ChordThrottle("pool_b", max_in_flight=8, **kwargs)
+
+    for i in range(3):
+        a.submit(i, i, workers.dispatch)
+    b.submit(10, 10, workers.dispatch)
+    assert len(redis.zsets[GLOBAL_SLOTS_KEY]) == 4 and workers.now == 0
+
+    b.submit(11, 11, workers.dispatch)          # waits until a's first chord finished
+    assert workers.now >= 0.5 and b.waited > 0
+    a.drain(), b.drain()
+    assert redis.zsets[GLOBAL_SLOTS_KEY] == {}
+
+
+def test_slots_of_a_dead_orchestrator_expire():
+    redis, workers = FakeRedis(), Workers()
+    redis.zadd(GLOBAL_SLOTS_KEY, {f"crashed:{i}": 1.0 for i in range(4)})   # expired long ago
+    throttle = ChordThrottle("pool", global_max=4, redis=redis, clock=workers.clock, sleep=workers.sleep)
+
+    throttle.submit(0, 99, workers.dispatch)
+
+    assert throttle.waited == 0
+    assert list(redis.zsets[GLOBAL_SLOTS_KEY]) == [next(iter(throttle.in_flight)).slot]
+
+
+def test_failed_chords_and_queue_depth_are_reported(caplog):
+    broker, workers = FakeRedis(), Workers()
+    broker.lists = {"celery": [b"m"] * 12, "enrich": [b"m"] * 3}
+    throttle = ChordThrottle("pool", global_max=None, broker=broker, clock=workers.clock, sleep=workers.sleep)
+
+    with caplog.at_level(logging.INFO):
+        throttle.submit(0, 99, lambda: workers.dispatch(fail=True))
+        throttle.submit(100, 199, workers.dispatch)
+        assert throttle.drain()
+
+    assert (throttle.completed, throttle.failed) == (1, 1)
+    assert throttle.queue_depths() == {"celery": 12, "enrich": 3, "aggregate": 0}
+    assert "range 0-99 failed" in caplog.text
+    assert "range 100-199 committed" in caplog.text and "celery=12" in caplog.text
+
+
+def test_redis_outage_keeps_the_per_pool_cap_only():
+    workers = Workers()
+    throttle = ChordThrottle("pool", max_in_flight=2, global_max=1, redis=FakeRedis(fail=True),
+                             broker=FakeRedis(fail=True), clock=workers.clock, sleep=workers.sleep)
+
+    _crawl(throttle, workers, 10)
+
+    assert throttle.redis is None
+    assert throttle.peak_in_flight == 2 and throttle.completed == 10
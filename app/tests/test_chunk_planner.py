@@ -0,0 +1,171 @@
+import time
+
+import pytest
+
+from app.celery import serialization
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import chunk_planner
+from app.sources.dex_data_pipeline.evm.utils.chunk_planner import DecodeCostModel, chunk_count, plan_chunks
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_for
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import (
+    SwapAggregator,
+    minute_partials,
+)
+from app.utils.log_utils import chunk_logs, partition_logs
+from swap_logs import v3_swap_logs
+from test_swap_decoders import _stamp
+
+PLAN = plan_for(SWAP_ABI, 18, 6, False)
+
+
+def _range(n_logs: int, blocks: int, seed: int = 3) -> list[dict]:
+    # 4 blocks per second → `blocks` / 240 minutes
+    return _stamp(v3_swap_logs(n_logs, 250_000_000, blocks, seed=seed))
+
+
+def _minutes(chunk):
+    return {log["timestamp"] // 60 for log in chunk}
+
+
+def test_partition_never_splits_a_minute_and_stays_balanced():
+    logs = _range(6_000, 24_000)          # ~100 minutes
+
+    chunks = partition_logs(logs, 8)
+
+    assert [log for chunk in chunks for log in chunk] == logs
+    assert len(chunks) == 8
+    for left, right in zip(chunks, chunks[1:]):
+        assert not _minutes(left) & _minutes(right)
+    assert max(map(len, chunks)) <= 1.3 * len(logs) / 8
+    # the equal-slice split cuts through minutes
+    equal = chunk_logs(logs, 8)
+    assert any(_minutes(a) & _minutes(b) for a, b in zip(equal, equal[1:]))
+
+
+def test_partition_falls_back_to_blocks_and_single_runs():
+    logs = v3_swap_logs(500, 1_000, 50)
+    chunks = partition_logs(logs, 4)
+    for left, right in zip(chunks, chunks[1:]):
+        assert left[-1]["blockNumber"] != right[0]["blockNumber"]
+
+    one_minute = [dict(log, timestamp=60) for log in logs]
+    assert partition_logs(one_minute, 4) == [one_minute]
+
+
+def test_chunk_count_follows_cost_and_workers():
+    assert chunk_count(100, workers=8, seconds_per_log=40e-6) == 1
+    assert chunk_count(1_000, workers=8, seconds_per_log=40e-6) == 2
+    assert chunk_count(100_000, workers=8, seconds_per_log=40e-6) == 8
+    assert chunk_count(100_000, workers=32, seconds_per_log=40e-6) == 32
+    assert chunk_count(1_000, workers=8, seconds_per_log=400e-6) == 8
+
+    cost = DecodeCostModel(40e-6, alpha=0.5)
+    cost.observe(1_000, 0.08)               # measured 80 µs/log
+    assert cost.seconds_per_log == pytest.approx(60e-6)
+
+
+def test_decode_workers_are_cached_and_fall_back(monkeypatch):
+    calls = []
+
+    def unreachable():
+        calls.append(1)
+        raise ConnectionError("no broker")
+
+    monkeypatch.setattr(chunk_planner, "_workers", None)
+    monkeypatch.setattr(chunk_planner, "_inspect_decode_workers", unreachable)
+    assert chunk_planner.decode_workers() == chunk_planner.DECODE_WORKERS
+    assert chunk_planner.decode_workers() == chunk_planner.DECODE_WORKERS
+    assert len(calls) == 1
+
+    monkeypatch.setattr(chunk_planner, "_workers", None)
+    monkeypatch.setattr(chunk_planner, "_inspect_decode_workers", lambda: 24)
+    assert len(plan_chunks(_range(20_000, 40_000))) == 24
+
+
+@pytest.mark.parametrize("split", [partition_logs, chunk_logs])
+def test_merged_partials_equal_per_swap_aggregation(split):
+    logs = _range(3_000, 6_000)
+    # ties: several swaps per second, so open / close pick among equal timestamps
+    chunks = [PLAN.decode(chunk) for chunk in split(logs, 6)]
+
+    merged, per_swap = SwapAggregator(), SwapAggregator()
+    for chunk in chunks:
+        merged.add_partials(chunk.minutes)
+        per_swap.add_batch(chunk)
+
+    assert merged.aggregate() == per_swap.aggregate()
+    assert dict(merged.buckets) == dict(per_swap.buckets)
+
+
+def test_partials_travel_with_the_batch():
+    batch = PLAN.decode(_range(400, 2_000))
+
+    restored = serialization.loads(serialization.dumps([batch]))[0]
+
+    assert restored.minutes == batch.minutes == minute_partials(batch)
+    assert restored == batch
+
+
+def test_aggregate_body_merges_partials(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg2://stand-in@localhost/db")
+    from app.sources.dex_data_pipeline.utils.aggregator_and_upsert import aggregator_and_upsert_handler as handler
+
+    written = []
+
+    class Session:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def commit(self):
+            pass
+
+    monkeypatch.setattr(handler, "SessionLocal", Session)
+    monkeypatch.setattr(handler, "upsert_aggregated_klines", lambda db, table, minutes: written.append(minutes))
+    monkeypatch.setattr(handler, "bulk_insert_swaps", lambda db, table, rows: None)
+    monkeypatch.setattr(handler, "record_coverage", lambda *args: None)
+    monkeypatch.setattr(handler.VectorSwapAggregator, "add_batch",
+                        lambda self, batch: pytest.fail("re-aggregated raw swaps"))
+    logs = _range(1_500, 3_000)
+    chunks = [PLAN.decode(chunk) for chunk in partition_logs(logs, 4)]
+
+    handler.aggregate_and_upsert(chunks, "t_1m_klines", "t_raw_swaps", "weth/usdc", 1, 2)
+
+    monkeypatch.undo()
+    reference = SwapAggregator()
+    reference.add_batch(PLAN.decode(logs))
+    assert written == [reference.aggregate()]
+
+
+@pytest.mark.benchmark
+def test_benchmark_chunk_skew_and_body_work():
+    """Minutes split across chunks, and the aggregate body's work: per swap vs per minute partial."""
+    logs = _range(20_000, 60_000)
+    equal, aligned = chunk_logs(logs, 8), partition_logs(logs, 8)
+    straddling = sum(bool(_minutes(a) & _minutes(b)) for a, b in zip(equal, equal[1:]))
+    chunks = [PLAN.decode(chunk) for chunk in aligned]
+
+    runs = {"per swap": [], "partials": []}
+    for _ in range(5):
+        agg = SwapAggregator()
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            agg.add_batch(chunk)
+        agg.aggregate()
+        runs["per swap"].append(time.perf_counter() - t0)
+        agg = SwapAggregator()
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            agg.add_partials(chunk.minutes)
+        agg.aggregate()
+        runs["partials"].append(time.perf_counter() - t0)
+    per_swap, partials = min(runs["per swap"]), min(runs["partials"])
+
+    sizes = [len(c) for c in aligned]
+    print(f"\n20k swaps / {len(agg.buckets)} minutes: equal slices split {straddling} of 7 cuts mid-minute, "
+          f"aligned chunks {min(sizes)}–{max(sizes)} logs; aggregate body "
+          f"{per_swap * 1000:.1f} ms per swap → {partials * 1000:.1f} ms from partials")
+    assert straddling > 0
+    assert partials * 3 < per_swap
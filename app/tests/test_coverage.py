@@ -0,0 +1,143 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.sources.dex_data_pipeline.evm.utils import events
+from app.sources.dex_data_pipeline.evm.utils.blocks import BlockClient
+from app.sources.dex_data_pipeline.evm.utils.coverage import IntervalSet
+from chain_stand_in import (
+    ARBITRUM_GENESIS_TS,
+    ARBITRUM_SCHEDULE,
+    BASE_GENESIS_TS,
+    BASE_SCHEDULE,
+    FakeChain,
+    base_chain,
+    fake_w3,
+)
+
+DAY = 86_400
+
+
+def test_interval_set_merges_overlapping_and_adjacent():
+    covered = IntervalSet([(10, 19), (30, 39)])
+    covered.add(20, 25)   # adjacent to the first
+    covered.add(35, 50)   # overlaps the second
+    covered.add(60, 60)
+
+    assert list(covered) == [(10, 25), (30, 50), (60, 60)]
+    covered.add(0, 100)
+    assert list(covered) == [(0, 100)]
+
+
+def test_interval_set_missing_and_contains():
+    covered = IntervalSet([(10, 19), (30, 39), (45, 45)])
+
+    assert covered.missing(0, 50) == [(0, 9), (20, 29), (40, 44), (46, 50)]
+    assert covered.missing(12, 35) == [(20, 29)]
+    assert covered.missing(31, 38) == []
+    assert IntervalSet().missing(5, 7) == [(5, 7)]
+    assert covered.contains(11, 19)
+    assert not covered.contains(18, 31)
+
+
+def test_walk_block_ranges_includes_end_block():
+    client = BlockClient(fake_w3(base_chain()))
+
+    assert list(client.walk_block_ranges(0, 2_000, step=1_000)) == [(0, 999), (1_000, 1_999), (2_000, 2_000)]
+    assert list(client.walk_block_ranges(7, 7)) == [(7, 7)]
+
+
+def test_fetch_logs_returns_none_after_retries(monkeypatch):
+    monkeypatch.setattr("backoff._sync.time.sleep", lambda _: None)
+    calls = []
+
+    class FlakyEth:
+        def get_logs(self, params):
+            calls.append(params)
+            raise TimeoutError("upstream timeout")
+
+    class W3:
+        eth = FlakyEth()
+
+    assert events.fetch_logs(W3(), "0xpool", 1, 2, ["0xtopic"]) is None
+    assert len(calls) == 3
+
+
+def test_rerun_crawls_only_the_holes():
+    """A failed range stays out of the ledger and is the only thing refetched."""
+    # head at wall-clock now, since the gap search looks back from utcnow()
+    chain = FakeChain(BASE_SCHEDULE, (int(time.time()) - BASE_GENESIS_TS) // 2, BASE_GENESIS_TS)
+    client = BlockClient(fake_w3(chain))
+    coverage = IntervalSet()
+    head = chain.latest_block
+    first = chain.first_block_at_or_after(int(time.time()) - DAY)
+    coverage.add(first - 5_000, first + 10_000)  # seeded from an earlier run
+
+    resume = first + 10_001
+    failing = {(resume + 10_000, resume + 10_999), (resume + 21_000, resume + 21_999)}
+    crawled = []
+    for lo, hi in client.compute_missing_block_ranges(None, "base_pool_1m_klines", 1, coverage=coverage):
+        for from_block, to_block in client.walk_block_ranges(lo, hi, step=1_000):
+            crawled.append((from_block, to_block))
+            if (from_block, to_block) not in failing:
+                coverage.add(from_block, to_block)
+
+    assert crawled[0][0] == resume
+    assert crawled[-1][1] == head
+
+    rerun = client.compute_missing_block_ranges(None, "base_pool_1m_klines", 1, coverage=coverage)
+    # (the head may also have moved on a live chain – the stand-in's has not)
+    assert sorted(rerun) == sorted(failing)
+
+
+class _KlineMinutes:
+    """Stand-in session for the kline table queries: MIN/MAX and the distinct minutes."""
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+
+    def execute(self, stmt, params=None):
+        rows = [SimpleNamespace(ts=m) for m in self.minutes if params is None or m >= params["from_ts"]]
+        return SimpleNamespace(
+            one=lambda: SimpleNamespace(min_ts=min(self.minutes), max_ts=max(self.minutes)),
+            all=lambda: rows,
+        )
+
+
+def _live_chain(schedule, genesis_ts) -> FakeChain:
+    """Stand-in chain whose head is at wall-clock now (the gap search looks back from utcnow())."""
+    probe = FakeChain(schedule, 0, genesis_ts)
+    start, block_time = schedule[-1]
+    head = start + int((time.time() - probe.timestamp(start)) / block_time)
+    return FakeChain(schedule, head, genesis_ts)
+
+
+@pytest.mark.parametrize("schedule,genesis_ts", [(BASE_SCHEDULE, BASE_GENESIS_TS),
+                                                 (ARBITRUM_SCHEDULE, ARBITRUM_GENESIS_TS)])
+def test_first_run_seeds_only_the_kline_minute_runs(schedule, genesis_ts):
+    chain = _live_chain(schedule, genesis_ts)
+    client = BlockClient(fake_w3(chain))
+    start = (int(time.time()) - DAY // 2) // 60 * 60
+    run_a = [start + 60 * i for i in (0, 1, 4)]       # minutes 2, 3: a quiet pool's empty minutes
+    run_b = [start + 60 * i for i in range(11, 13)]   # minutes 5…10 hold no klines: a hole
+    coverage = IntervalSet()
+
+    client.compute_missing_block_ranges(_KlineMinutes(run_a + run_b), "pool_1m_klines", 1, coverage=coverage)
+
+    # exact first blocks: several Arbitrum blocks share each second
+    block = chain.first_block_at_or_after
+    assert list(coverage) == [
+        (block(run_a[0]), block(run_a[-1] + 60) - 1),
+        (block(run_b[0]), block(run_b[-1] + 60) - 1),
+    ]
+    assert coverage.missing(block(run_a[0]), block(run_b[-1])) == [(block(start + 300), block(start + 660) - 1)]
+
+
+def test_first_block_search_is_exact_when_blocks_share_a_second():
+    chain = _live_chain(ARBITRUM_SCHEDULE, ARBITRUM_GENESIS_TS)
+    client = BlockClient(fake_w3(chain))
+    start = (chain.timestamp(chain.latest_block) - DAY) // 60 * 60
+
+    for minute in range(start, start + 200 * 60, 60):
+        assert client.find_first_block_at_or_after(minute) == chain.first_block_at_or_after(minute)
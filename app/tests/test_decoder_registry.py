@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from app.celery import serialization
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.camelot.config import SWAP_ABI as CAMELOT_SWAP_ABI
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI as V3_SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import decoder_registry
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import (
+    DecodePlan,
+    decode_swap_chunk,
+    get_plan,
+    plan_key,
+)
+from app.sources.dex_data_pipeline.evm.utils.uniswap_v3_decoder import swap_builder
+from swap_logs import V2_SWAP_ABI, v2_swap_logs, v3_swap_logs
+from test_swap_decoders import _stamp, as_db_rows, reference_v2, reference_v3
+
+
+def test_plan_key_names_the_pool_shape():
+    key = plan_key(V3_SWAP_ABI, 18, 6, False)
+
+    topic, digest, dec0, dec1, base_is_token1 = key.split(":")
+    assert (topic, dec0, dec1, base_is_token1) == ("c42079f9", "18", "6", "0")
+    assert len(key) < 40
+    # same event, different JSON formatting → same plan
+    assert plan_key(CAMELOT_SWAP_ABI, 18, 6, False) == key
+    assert plan_key(V3_SWAP_ABI, 18, 6, True) != key
+    # the key replaces the ABI and decimals in every decode message
+    assert len(serialization.dumps([key])) * 10 < len(serialization.dumps([V3_SWAP_ABI, 18, 6, False]))
+
+
+def test_fresh_worker_resolves_known_abis_and_builds_each_plan_once(monkeypatch):
+    monkeypatch.setattr(decoder_registry, "_PLANS", {})
+    builds = []
+    real_init = DecodePlan.__init__
+    monkeypatch.setattr(DecodePlan, "__init__", lambda self, *a: builds.append(a[0]) or real_init(self, *a))
+    key = "c42079f9:" + decoder_registry.abi_hash(V3_SWAP_ABI) + ":18:6:0"
+
+    plans = [get_plan(key) for _ in range(5)]
+
+    assert builds == [key]
+    assert all(plan is plans[0] for plan in plans)
+
+
+@pytest.mark.parametrize("abi,logs,reference", [
+    (V3_SWAP_ABI, lambda: _stamp(v3_swap_logs(300, 250_000_000, 1_000)), reference_v3),
+    (V2_SWAP_ABI, lambda: _stamp(v2_swap_logs(300, 30_000_000, 1_000)), reference_v2),
+])
+def test_decode_swap_chunk_matches_reference(abi, logs, reference):
+    logs = logs()
+    for dec0, dec1, base_is_token1 in [(18, 6, False), (6, 18, True)]:
+        swaps = decode_swap_chunk(logs, plan_key(abi, dec0, dec1, base_is_token1))
+        assert swaps.rows() == as_db_rows(reference(logs, abi, dec0, dec1, base_is_token1))
+
+
+def test_unknown_abi_or_event_is_rejected():
+    with pytest.raises(ValueError, match="Unknown swap ABI"):
+        get_plan("c42079f9:000000000000:18:6:0")
+    sync_abi = {"name": "Sync", "type": "event", "anonymous": False,
+                "inputs": [{"name": "reserve0", "type": "uint112", "indexed": False},
+                           {"name": "reserve1", "type": "uint112", "indexed": False}]}
+    with pytest.raises(ValueError, match="No swap decoder"):
+        get_plan(plan_key(sync_abi, 18, 6, False))
+
+
+@pytest.mark.benchmark
+def test_benchmark_per_task_setup_and_message_size():
+    """What every decode task rebuilt (web3 codec, scalers) vs a plan lookup, and the args bytes."""
+    key = plan_key(V3_SWAP_ABI, 18, 6, False)
+    get_plan(key)
+    n = 500
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        from web3 import Web3
+        Web3().codec
+        swap_builder(18, 6, False)
+    rebuild_us = (time.perf_counter() - t0) * 1e6 / n
+    t0 = time.perf_counter()
+    for _ in range(n):
+        get_plan(key)
+    cached_us = (time.perf_counter() - t0) * 1e6 / n
+
+    abi_args = len(serialization.dumps([V3_SWAP_ABI, 18, 6, False]))
+    key_args = len(serialization.dumps([key]))
+    print(f"\nper-task decoder setup: rebuilt={rebuild_us:,.0f} µs, cached plan={cached_us:.2f} µs;"
+          f" decoder args per message {abi_args} B → {key_args} B")
+    assert cached_us * 100 < rebuild_us
@@ -0,0 +1,294 @@
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Context, Decimal, localcontext
+from fractions import Fraction
+from math import isqrt
+
+import pytest
+from eth_abi import encode
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI as V3_SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import uniswap_v2_decoder as v2, uniswap_v3_decoder as v3
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import SwapAggregator
+from app.sources.dex_data_pipeline.utils.swap_batch import (
+    amount_scaler,
+    div_half_up,
+    from_fixed,
+    ratio_to_fixed,
+)
+from swap_logs import V2_SWAP_ABI, v2_swap_logs, v3_swap_logs
+from test_swap_decoders import as_db_rows, reference_v2, reference_v3
+
+# What the decoders and aggregators used to run under (getcontext().prec = 28)
+DECIMAL_28 = Context(prec=28)
+
+
+def realistic_v3_logs(n: int, seed: int) -> list[dict]:
+    """V3 swaps whose sqrtPriceX96 matches their amounts (~3k USDC per WETH)."""
+    logs = v3_swap_logs(n, 250_000_000, n * 4, seed=seed)
+    rng = random.Random(seed)
+    for log in logs:
+        args = v3.decode_swap_args_fast([log])[0]
+        amount0, amount1 = args["amount0"], args["amount1"]
+        sqrt_price = isqrt(abs(amount1) * v3.Q192 // abs(amount0))
+        log["data"] = encode(
+            ["int256", "int256", "uint160", "uint128", "int24"],
+            [amount0, amount1, sqrt_price, rng.randint(10**15, 10**22), rng.randint(-887_272, 887_272)],
+        ).hex()
+        log["timestamp"] = 1_700_000_000 + (log["blockNumber"] - 250_000_000) // 4
+    return logs
+
+
+def _stamp(logs):
+    for log in logs:
+        log["timestamp"] = 1_700_000_000 + log["blockNumber"] // 4
+    return logs
+
+
+def exact_fixed(value: Fraction) -> int:
+    """Fraction → 10**18-scaled int, rounded half away from zero."""
+    scaled = value * 10**18
+    return div_half_up(scaled.numerator, scaled.denominator)
+
+
+# ---------------------------------------------------------------------------
+# Integer helpers
+# ---------------------------------------------------------------------------
+def test_div_half_up_rounds_half_away_from_zero():
+    assert [div_half_up(n, 4) for n in (5, 6, 7, -5, -6, -7, 0)] == [1, 2, 2, -1, -2, -2, 0]
+    assert div_half_up(2**255, 3) == (2**255 + 1) // 3
+
+
+def test_ratio_to_fixed_is_exact():
+    rng = random.Random(1)
+    for _ in range(2_000):
+        num, den, exponent = rng.randint(-(2**200), 2**200), rng.randint(1, 2**200), rng.randint(-30, 30)
+        assert ratio_to_fixed(num, den, exponent) == exact_fixed(Fraction(num, den) * Fraction(10) ** exponent)
+
+
+@pytest.mark.parametrize("decimals", [0, 6, 8, 18, 24])
+def test_amount_scaler_is_exact(decimals):
+    scale = amount_scaler(decimals)
+    for amount in (0, 1, -1, 5 * 10**5, -5 * 10**5, 123_456_789_012_345_678_901, -(10**30) - 1):
+        assert scale(amount) == exact_fixed(Fraction(amount, 10**decimals))
+
+
+def test_v3_price_is_exact_for_any_sqrt_price():
+    rng = random.Random(2)
+    for _ in range(2_000):
+        sqrt_price, exponent = rng.randint(1, 2**160 - 1), rng.choice((-12, 0, 10, 12))
+        assert v3.price_fixed(sqrt_price, exponent) == \
+            exact_fixed(Fraction(sqrt_price * sqrt_price, v3.Q192) * Fraction(10) ** exponent)
+
+
+# ---------------------------------------------------------------------------
+# Against what NUMERIC(38, 18) stored from the 28-digit Decimal path
+# ---------------------------------------------------------------------------
+AMOUNTS = ("base_delta", "quote_delta", "base_vol", "quote_vol", "price")
+ULP = Decimal("1e-18")
+
+
+def assert_matches_decimal_columns(new: list[dict], exact: list[dict], old: list[dict]) -> int:
+    """
+    `new` rows are the exactly rounded NUMERIC(38, 18) values, and equal
+    the old 28-digit rows except where the old math was short itself:
+    one unit off after rounding twice (28 digits, then 18 decimals), or
+    off in digits past the 28th (values ≥ 1e10).  Returns the number of
+    values that differ.
+    """
+    assert new == exact
+    differ = near_tie = 0
+    for n, o in zip(new, old):
+        assert {k: v for k, v in n.items() if k not in AMOUNTS} == {k: v for k, v in o.items() if k not in AMOUNTS}
+        for k in AMOUNTS:
+            if n[k] != o[k]:
+                differ += 1
+                assert abs(n[k] - o[k]) <= max(ULP, abs(o[k]) * Decimal("1e-26"))
+                near_tie += abs(o[k]) < Decimal("1e8")   # 18 decimals fit with digits to spare
+    assert near_tie <= len(new) * len(AMOUNTS) // 500
+    return differ
+
+
+@pytest.mark.parametrize("dec0,dec1,base_is_token1", [(18, 6, False), (6, 18, True), (18, 18, False)])
+def test_v3_realistic_pools_match_decimal_columns(dec0, dec1, base_is_token1):
+    logs = realistic_v3_logs(2_000, seed=dec0 + dec1)
+
+    assert_matches_decimal_columns(
+        v3.decode_log_chunk(logs, V3_SWAP_ABI, dec0, dec1, base_is_token1).rows(),
+        as_db_rows(reference_v3(logs, V3_SWAP_ABI, dec0, dec1, base_is_token1)),
+        as_db_rows(reference_v3(logs, V3_SWAP_ABI, dec0, dec1, base_is_token1, context=DECIMAL_28)),
+    )
+
+
+@pytest.mark.parametrize("dec0,dec1,base_is_token1", [(18, 6, False), (6, 18, True), (18, 18, False)])
+def test_v2_pools_match_decimal_columns(dec0, dec1, base_is_token1):
+    logs = _stamp(v2_swap_logs(2_000, 30_000_000, 5_000, seed=9))
+
+    assert_matches_decimal_columns(
+        v2.decode_log_chunk(logs, V2_SWAP_ABI, dec0, dec1, base_is_token1).rows(),
+        as_db_rows(reference_v2(logs, V2_SWAP_ABI, dec0, dec1, base_is_token1)),
+        as_db_rows(reference_v2(logs, V2_SWAP_ABI, dec0, dec1, base_is_token1, context=DECIMAL_28)),
+    )
+
+
+def test_prices_beyond_28_digits_are_the_exact_rounding():
+    """Prices ≥ 1e10 left the old 28-digit math short of 18 decimals."""
+    logs = _stamp(v3_swap_logs(2_000, 250_000_000, 5_000, seed=4))
+    new = v3.decode_log_chunk(logs, V3_SWAP_ABI, 18, 6, False).rows()
+
+    for row, args in zip(new, v3.decode_swap_args_fast(logs)):
+        assert row["price"] == from_fixed(exact_fixed(Fraction(args["sqrtPriceX96"] ** 2, v3.Q192) * 10**12))
+    assert assert_matches_decimal_columns(
+        new,
+        as_db_rows(reference_v3(logs, V3_SWAP_ABI, 18, 6, False)),
+        as_db_rows(reference_v3(logs, V3_SWAP_ABI, 18, 6, False, context=DECIMAL_28)),
+    )
+
+
+def test_vwap_is_the_exactly_rounded_ratio():
+    batch = v3.decode_log_chunk(realistic_v3_logs(5_000, seed=7), V3_SWAP_ABI, 18, 6, False)
+    aggregator = SwapAggregator()
+    aggregator.add_batch(batch)
+
+    for bucket in aggregator.aggregate().values():
+        vwap = Fraction(bucket["total_quote_volume"]) / Fraction(bucket["total_base_volume"])
+        assert bucket["avg_price"] == from_fixed(exact_fixed(vwap))
+        with localcontext(DECIMAL_28):
+            old = bucket["total_quote_volume"] / bucket["total_base_volume"]
+        assert abs(bucket["avg_price"] - old) <= max(ULP, old * Decimal("1e-26"))
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+def decimal_swaps_v3(logs_chunk, args_list, dec0, dec1):
+    """The old per-swap Decimal loop of the V3 decoder (token0 = base), minus the ABI decoding."""
+    with localcontext(DECIMAL_28):
+        price_scale, d0, d1 = Decimal(10) ** (dec0 - dec1), Decimal(10) ** dec0, Decimal(10) ** dec1
+        out = []
+        for log, args in zip(logs_chunk, args_list):
+            sqrt_price = Decimal(args["sqrtPriceX96"]) / (1 << 96)
+            base_delta, quote_delta = -Decimal(args["amount0"]) / d0, -Decimal(args["amount1"]) / d1
+            out.append({
+                "block_number": log["blockNumber"], "timestamp": log["timestamp"],
+                "tx_hash": log["transactionHash"], "log_index": log["logIndex"],
+                "sender": args["sender"], "recipient": args["recipient"],
+                "base_delta": base_delta, "quote_delta": quote_delta,
+                "base_vol": abs(base_delta), "quote_vol": abs(quote_delta),
+                "price": sqrt_price * sqrt_price * price_scale,
+                "liquidity": args.get("liquidity"), "tick": args.get("tick"),
+                "is_buy": quote_delta < 0,
+            })
+        return out
+
+
+def decimal_swaps_v2(logs_chunk, args_list, dec0, dec1):
+    """The per-swap Decimal loop of the V2 reference decoder (token0 = base), minus the ABI decoding."""
+    with localcontext(DECIMAL_28):
+        d0, d1 = Decimal(10) ** dec0, Decimal(10) ** dec1
+        out = []
+        for log, args in zip(logs_chunk, args_list):
+            base_in, base_out = Decimal(args["amount0In"]) / d0, Decimal(args["amount0Out"]) / d0
+            quote_in, quote_out = Decimal(args["amount1In"]) / d1, Decimal(args["amount1Out"]) / d1
+            base_delta, quote_delta = base_out - base_in, quote_out - quote_in
+            if not base_delta or not quote_delta:
+                continue
+            out.append({
+                "block_number": log["blockNumber"], "timestamp": log["timestamp"],
+                "tx_hash": log["transactionHash"], "log_index": log["logIndex"],
+                "sender": args["sender"], "recipient": args["to"],
+                "base_delta": base_delta, "quote_delta": quote_delta,
+                "base_vol": abs(base_delta), "quote_vol": abs(quote_delta),
+                "price": abs(quote_delta) / abs(base_delta),
+                "liquidity": None, "tick": None,
+                "is_buy": quote_delta < 0,
+            })
+        return out
+
+
+class DecimalSwapAggregator:
+    """The old Decimal minute aggregator (add / aggregate), for the benchmark."""
+
+    def __init__(self):
+        self.buckets = defaultdict(lambda: {
+            "open_price": None, "open_ts": None, "close_price": None, "close_ts": None,
+            "high_price": Decimal("-Infinity"), "low_price": Decimal("Infinity"),
+            "swap_count": 0, "total_base_volume": Decimal(0), "total_quote_volume": Decimal(0),
+        })
+
+    def add(self, swap: dict):
+        ts, price = swap["timestamp"], swap["price"]
+        bucket = self.buckets[datetime.utcfromtimestamp(ts).replace(second=0, microsecond=0)]
+        if bucket["open_ts"] is None or ts < bucket["open_ts"]:
+            bucket["open_price"], bucket["open_ts"] = price, ts
+        if bucket["close_ts"] is None or ts > bucket["close_ts"]:
+            bucket["close_price"], bucket["close_ts"] = price, ts
+        bucket["high_price"] = max(bucket["high_price"], price)
+        bucket["low_price"] = min(bucket["low_price"], price)
+        bucket["total_base_volume"] += swap["base_vol"]
+        bucket["total_quote_volume"] += swap["quote_vol"]
+        bucket["swap_count"] += 1
+
+    def aggregate(self):
+        with localcontext(DECIMAL_28):
+            return {minute: b["total_quote_volume"] / b["total_base_volume"] if b["total_base_volume"] else None
+                    for minute, b in self.buckets.items()}
+
+
+def _rate(fn, n: int) -> float:
+    """Best of three runs, swaps/s."""
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return n / best
+
+
+@pytest.mark.benchmark
+def test_benchmark_swaps_per_second_per_core():
+    """Swap math + minute aggregation on one core: 28-digit Decimal vs fixed-point ints."""
+    n = 50_000
+    v3_logs = realistic_v3_logs(n, seed=11)
+    v2_logs = _stamp(v2_swap_logs(n, 30_000_000, n * 4, seed=11))
+    v3_args, v2_args = v3.decode_swap_args_fast(v3_logs), v2.decode_swap_args_fast(v2_logs)
+
+    def old_v3():
+        agg = DecimalSwapAggregator()
+        for swap in decimal_swaps_v3(v3_logs, v3_args, 18, 6):
+            agg.add(swap)
+        return agg.aggregate()
+
+    def new_v3():
+        agg = SwapAggregator()
+        agg.add_batch(v3.swaps_from_args(v3_logs, v3_args, 18, 6, False))
+        return agg.aggregate()
+
+    def old_v2():
+        agg = DecimalSwapAggregator()
+        for swap in decimal_swaps_v2(v2_logs, v2_args, 18, 6):
+            agg.add(swap)
+        return agg.aggregate()
+
+    def new_v2():
+        agg = SwapAggregator()
+        agg.add_batch(v2.swaps_from_args(v2_logs, v2_args, 18, 6, False))
+        return agg.aggregate()
+
+    rates = {
+        "V3 swap math": (_rate(lambda: decimal_swaps_v3(v3_logs, v3_args, 18, 6), n),
+                         _rate(lambda: v3.swaps_from_args(v3_logs, v3_args, 18, 6, False), n)),
+        "V2 swap math": (_rate(lambda: decimal_swaps_v2(v2_logs, v2_args, 18, 6), n),
+                         _rate(lambda: v2.swaps_from_args(v2_logs, v2_args, 18, 6, False), n)),
+        "V3 math + minutes": (_rate(old_v3, n), _rate(new_v3, n)),
+        "V2 math + minutes": (_rate(old_v2, n), _rate(new_v2, n)),
+    }
+
+    print()
+    for name, (decimal_rate, fixed_rate) in rates.items():
+        print(f"{name:>18}: Decimal={decimal_rate:>10,.0f} swaps/s  fixed={fixed_rate:>10,.0f} swaps/s "
+              f"({fixed_rate / decimal_rate:.1f}×)")
+    assert rates["V3 math + minutes"][1] > rates["V3 math + minutes"][0]
+    assert rates["V2 math + minutes"][1] > rates["V2 math + minutes"][0]
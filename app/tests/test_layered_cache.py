@@ -0,0 +1,50 @@
+from app.utils.layered_cache import LayeredCache
+from chain_stand_in import FakeRedis
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LayeredCache("t", maxsize=2)
+    cache.set_many({1: 10, 2: 20})
+    cache.get_many([1])
+    cache.set_many({3: 30})
+
+    assert cache.get_many([1, 2, 3]) == {1: 10, 3: 30}
+    assert len(cache) == 2
+
+
+def test_redis_shares_values_between_instances():
+    redis = FakeRedis()
+    writer = LayeredCache("blockts:base", redis=redis)
+    reader = LayeredCache("blockts:base", redis=redis)
+    writer.set_many({100: 1_700_000_000})
+
+    assert redis.store == {"blockts:base:100": b"1700000000"}
+    assert reader.get_many([100, 101]) == {100: 1_700_000_000}
+    assert (reader.local_hits, reader.shared_hits, reader.misses) == (0, 1, 1)
+    # promoted into the local LRU
+    assert reader.get_many([100]) == {100: 1_700_000_000}
+    assert reader.local_hits == 1
+    assert reader.hit_rate == 2 / 3
+
+
+def test_ttl_is_passed_to_redis():
+    redis = FakeRedis()
+    LayeredCache("tx", redis=redis, ttl=3_600).set_many({"0xabc": 1})
+
+    assert redis.ttls == {"tx:0xabc": 3_600}
+
+
+def test_redis_outage_degrades_to_local_cache():
+    cache = LayeredCache("t", redis=FakeRedis(fail=True))
+    cache.set_many({1: 10})
+
+    assert cache.get_many([1, 2]) == {1: 10}
+    assert cache.misses == 1
+
+
+def test_decode_reads_back_non_int_values():
+    redis = FakeRedis()
+    LayeredCache("txfrom", redis=redis).set_many({"ab12": "0xsender"})
+    reader = LayeredCache("txfrom", redis=redis, decode=bytes.decode)
+
+    assert reader.get_many(["ab12"]) == {"ab12": "0xsender"}
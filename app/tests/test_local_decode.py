@@ -0,0 +1,121 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from celery import group
+
+from app.celery.celery_app import celery_app
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import local_decode
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import decode_swap_chunk, plan_key
+from app.utils.log_utils import chunk_logs
+from swap_logs import v3_swap_logs
+
+KEY = plan_key(SWAP_ABI, 18, 6, False)
+
+
+def _range_chunks(n_logs: int, seed: int = 1) -> list[list[dict]]:
+    logs = v3_swap_logs(n_logs, 250_000_000, n_logs * 4, seed=seed)
+    for log in logs:
+        log["timestamp"] = 1_700_000_000 + (log["blockNumber"] - 250_000_000) // 4
+    return chunk_logs(logs, n_chunks=min(8, max(1, (n_logs + 99) // 200)))
+
+
+@pytest.fixture
+def decode_pool(monkeypatch):
+    monkeypatch.setattr(local_decode, "LOCAL_DECODE_PROCESSES", 2)
+    yield local_decode
+    local_decode.shutdown()
+
+
+def test_process_pool_decode_matches_inline(decode_pool):
+    chunks = _range_chunks(1_200)
+
+    pooled = decode_pool.decode_chunks(chunks, KEY)
+
+    assert decode_pool._executor is not None
+    assert pooled == [decode_pool.decode_chunk(chunk, KEY) for chunk in chunks]
+
+
+def test_daemonic_worker_decodes_inline_without_a_pool(decode_pool, monkeypatch):
+    """A Celery prefork child is daemonic: the pool is never started there."""
+    monkeypatch.setattr(local_decode.multiprocessing, "current_process", lambda: SimpleNamespace(daemon=True))
+    chunks = _range_chunks(600)
+
+    assert local_decode.decode_chunks(chunks, KEY) == [local_decode.decode_chunk(c, KEY) for c in chunks]
+    assert local_decode._executor is None
+    assert local_decode.worker_count() == 1
+
+
+@pytest.mark.parametrize("n_logs,local", [(800, True), (12_000, False)])
+def test_dispatch_range_picks_mode_by_log_count(monkeypatch, n_logs, local):
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg2://stand-in@localhost/db")
+    from app.sources.dex_data_pipeline.evm.utils import orchestrator
+
+    from app.sources.dex_data_pipeline.evm.utils import chunk_planner
+    monkeypatch.setattr(chunk_planner, "_workers", (time.monotonic(), 8))
+    monkeypatch.setattr(chunk_planner.decode_cost, "seconds_per_log", 40e-6)
+
+    sent = []
+    monkeypatch.setattr(orchestrator, "chord", lambda header, body: sent.append((header, body)) or type(
+        "Chord", (), {"apply_async": lambda self: None})())
+    monkeypatch.setattr("celery.canvas._chain.apply_async",
+                        lambda self, args=(): sent.append((list(args[0]), self)))
+    monkeypatch.setattr(local_decode, "decode_chunks", lambda chunks, key: [f"batch:{len(c)}" for c in chunks])
+    pool = orchestrator.PoolContext("0xpool", "t_1m_klines", "t_raw_swaps", "WETH/USDC", 18, 6, False)
+    logs = [log for chunk in _range_chunks(n_logs) for log in chunk]
+
+    orchestrator.dispatch_range(pool, logs, KEY, "http://stand-in", 1, 2)
+
+    [(header, body)] = sent
+    # enrich runs once per range, in front of the aggregate step
+    assert [t.task for t in body.tasks] == ["enrich_range", "aggregate_and_upsert_handler"]
+    if local:
+        assert header and all(batch.startswith("batch:") for batch in header)
+    else:
+        assert [sig.task for sig in header] == ["decode_swap_chunk"] * 8
+
+
+@pytest.mark.benchmark
+def test_benchmark_range_latency_celery_vs_local(monkeypatch):
+    """
+    Decode latency per range: a Celery task per chunk (in-memory broker,
+    so a lower bound – Redis adds network round trips) vs local decoding
+    with this machine's LOCAL_DECODE_PROCESSES.
+    """
+    from celery.contrib.testing.worker import start_worker
+    # the worker imports every task module, and with them the DB engine
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg2://stand-in@localhost/db")
+
+    saved = {k: celery_app.conf[k] for k in ("broker_url", "result_backend", "broker_transport_options")}
+    celery_app.conf.update(broker_url="memory://", result_backend="cache+memory://",
+                           broker_transport_options={"polling_interval": 0.001})
+    sizes = (200, 1_000, 4_000)
+    ranges = {n: _range_chunks(n, seed=n) for n in sizes}
+    local_decode.decode_chunks(ranges[1_000], KEY)   # warm the pool's processes
+    latency = {}
+    try:
+        with start_worker(celery_app, pool="solo", perform_ping_check=False, loglevel="WARNING"):
+            for n, chunks in ranges.items():
+                runs = []
+                for _ in range(3):
+                    t0 = time.perf_counter()
+                    group(decode_swap_chunk.s(chunk, KEY) for chunk in chunks)().get(timeout=60, interval=0.001)
+                    runs.append(time.perf_counter() - t0)
+                latency[n] = [min(runs)]
+    finally:
+        celery_app.conf.update(saved)
+    for n, chunks in ranges.items():
+        runs = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            local_decode.decode_chunks(chunks, KEY)
+            runs.append(time.perf_counter() - t0)
+        latency[n].append(min(runs))
+    local_decode.shutdown()
+
+    print(f"\nlocal decode processes: {local_decode.LOCAL_DECODE_PROCESSES}")
+    for n, (celery_s, local_s) in latency.items():
+        print(f"{n:>6} logs/range: celery fan-out={celery_s * 1000:7.1f} ms  local={local_s * 1000:7.1f} ms "
+              f"({celery_s / local_s:.1f}×)")
+    assert all(local_s < celery_s for celery_s, local_s in latency.values())
@@ -0,0 +1,114 @@
+import itertools
+import random
+
+from app.sources.dex_data_pipeline.evm.utils.coverage import IntervalSet
+from app.sources.dex_data_pipeline.evm.utils.events import fetch_logs
+from app.sources.dex_data_pipeline.evm.utils.log_demux import demux_logs, normalize_topic, route_range
+from app.sources.dex_data_pipeline.evm.utils.range_planner import AdaptiveRangePlanner
+from swap_logs import V3_SWAP_TOPIC, v3_swap_logs
+
+POOLS = [f"0x{i:040x}" for i in range(1, 6)]
+MINT_TOPIC = "0x7a53080ba414158be7ec69b987b5fb7d07dee101fe85488f0853ae16239d0bde"
+FIRST_BLOCK = 300_000_000
+
+
+def _pool_logs(address: str, n: int, span: int, seed: int) -> list[dict]:
+    return [{**log, "address": address} for log in v3_swap_logs(n, FIRST_BLOCK, span, seed=seed)]
+
+
+class FakeMultiPoolProvider:
+    """eth_getLogs honouring an address list and OR-ed topic[0] alternatives."""
+
+    def __init__(self, logs: list[dict]):
+        self.logs = sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+        self.calls = 0
+
+    def get_logs(self, params):
+        self.calls += 1
+        addresses = params["address"]
+        addresses = {a.lower() for a in ([addresses] if isinstance(addresses, str) else addresses)}
+        topic0 = params["topics"][0]
+        topic0 = {normalize_topic(t) for t in ([topic0] if isinstance(topic0, (str, bytes)) else topic0)}
+        return [
+            log for log in self.logs
+            if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]
+            and log["address"].lower() in addresses
+            and normalize_topic(log["topics"][0]) in topic0
+        ]
+
+    @property
+    def eth(self):
+        return self
+
+
+def _chain_logs(span: int = 200_000) -> list[dict]:
+    logs = []
+    for seed, (address, n) in enumerate(zip(POOLS, (3_000, 1_200, 400, 150, 40)), start=1):
+        logs += _pool_logs(address, n, span, seed)
+    # a Mint from a tracked pool and a swap from an untracked one
+    noise = _pool_logs(POOLS[0], 50, span, seed=99)
+    for log in noise:
+        log["topics"] = [MINT_TOPIC, *log["topics"][1:]]
+    return logs + noise + _pool_logs("0x" + "ff" * 20, 200, span, seed=98)
+
+
+def test_demux_splits_by_address_and_drops_foreign_logs():
+    logs = _chain_logs()
+    topic_by_address = dict.fromkeys(POOLS, V3_SWAP_TOPIC)
+
+    by_pool = demux_logs(logs, topic_by_address)
+
+    assert sorted(by_pool) == POOLS
+    assert [len(by_pool[a]) for a in POOLS] == [3_000, 1_200, 400, 150, 40]
+    assert all(normalize_topic(log["topics"][0]) == normalize_topic(V3_SWAP_TOPIC)
+               for pool_logs in by_pool.values() for log in pool_logs)
+
+
+def test_normalize_topic_accepts_bytes_and_hex():
+    assert normalize_topic(V3_SWAP_TOPIC) == normalize_topic("0x" + bytes(V3_SWAP_TOPIC).hex().upper())
+
+
+def test_interval_overlap():
+    covered = IntervalSet([(10, 20), (30, 40), (50, 60)])
+
+    assert covered.overlap(15, 55) == [(15, 20), (30, 40), (50, 55)]
+    assert covered.overlap(21, 29) == []
+    assert covered.overlap(0, 100) == [(10, 20), (30, 40), (50, 60)]
+    assert covered.overlap(40, 40) == [(40, 40)]
+
+
+def test_route_range_only_hands_pools_their_own_gaps():
+    logs = [{"blockNumber": b} for b in (100, 150, 250, 350)]
+    gaps = {"a": IntervalSet([(0, 1_000)]), "b": IntervalSet([(140, 260)]), "c": IntervalSet([(900, 950)])}
+
+    routed = route_range({"a": logs, "b": logs}, gaps, 100, 400)
+
+    assert routed["a"] == [(100, 400, logs)]
+    assert routed["b"] == [(140, 260, logs[1:3])]
+    assert "c" not in routed
+
+
+def _crawl_calls(provider, addresses, start, end, step=5_000):
+    planner = AdaptiveRangePlanner(step, target_logs=2_000)
+    fetch = lambda lo, hi: fetch_logs(provider, addresses, lo, hi, ["0x" + normalize_topic(V3_SWAP_TOPIC)])
+    pieces = list(itertools.chain.from_iterable(planner.fetch(lo, hi, fetch) for lo, hi in planner.plan(start, end)))
+    return planner.calls, [log for *_, logs in pieces for log in logs]
+
+
+def test_one_multi_address_crawl_replaces_one_crawl_per_pool():
+    """eth_getLogs calls to backfill 5 pools of one chain over the same window."""
+    span = 200_000
+    provider = FakeMultiPoolProvider(_chain_logs(span))
+    end = FIRST_BLOCK + span - 1
+
+    per_pool_calls, per_pool_logs = 0, {}
+    for address in POOLS:
+        calls, logs = _crawl_calls(provider, address, FIRST_BLOCK, end)
+        per_pool_calls += calls
+        per_pool_logs[address] = logs
+
+    multi_calls, multi_logs = _crawl_calls(provider, POOLS, FIRST_BLOCK, end)
+    demuxed = demux_logs(multi_logs, dict.fromkeys(POOLS, V3_SWAP_TOPIC))
+
+    assert all(demuxed[a] == per_pool_logs[a] for a in POOLS)
+    assert multi_calls * 2 < per_pool_calls
@@ -0,0 +1,105 @@
+import itertools
+
+import pytest
+
+from app.sources.dex_data_pipeline.evm.utils.events import LogRangeTooLarge, fetch_logs, is_range_too_large
+from app.sources.dex_data_pipeline.evm.utils.range_planner import AdaptiveRangePlanner
+
+PROVIDER_LOG_CAP = 10_000
+
+
+class FakeLogProvider:
+    """eth_getLogs over a piecewise log density, refusing > PROVIDER_LOG_CAP results."""
+
+    def __init__(self, density):
+        self.density = density  # [(first_block, logs_per_block), …]
+        self.calls = 0
+
+    def count(self, lo: int, hi: int) -> int:
+        total = 0
+        bounds = [start for start, _ in self.density[1:]] + [float("inf")]
+        for (start, rate), end in zip(self.density, bounds):
+            a, b = max(lo, start), min(hi, end - 1)
+            if a <= b:
+                total += int((b + 1) * rate) - int(a * rate)
+        return total
+
+    def get_logs(self, params):
+        self.calls += 1
+        n = self.count(params["fromBlock"], params["toBlock"])
+        if n > PROVIDER_LOG_CAP:
+            raise ValueError({"code": -32602, "message": "Log response size exceeded. You can make eth_getLogs "
+                              "requests with up to a 2K block range and no limit on the response size"})
+        return [{"blockNumber": params["fromBlock"]}] * n
+
+    @property
+    def eth(self):
+        return self
+
+
+def _crawl(planner, provider, start, end):
+    fetch = lambda lo, hi: fetch_logs(provider, "0xpool", lo, hi, ["0xtopic"])
+    return list(itertools.chain.from_iterable(planner.fetch(lo, hi, fetch) for lo, hi in planner.plan(start, end)))
+
+
+def test_provider_size_errors_are_recognised():
+    assert is_range_too_large(ValueError("query returned more than 10000 results"))
+    assert is_range_too_large(ValueError({"message": "Log response size exceeded."}))
+    assert not is_range_too_large(ValueError("429 Too Many Requests: rate limit exceeded"))
+
+    with pytest.raises(LogRangeTooLarge):
+        fetch_logs(FakeLogProvider([(0, 50.0)]), "0xpool", 0, 1_000, ["0xtopic"])
+
+
+def test_pieces_cover_range_in_order_after_splits():
+    provider = FakeLogProvider([(0, 0.01), (40_000, 30.0), (41_000, 0.01)])
+    planner = AdaptiveRangePlanner(50_000, target_logs=2_000)
+
+    pieces = _crawl(planner, provider, 0, 99_999)
+
+    assert pieces[0][0] == 0 and pieces[-1][1] == 99_999
+    assert all(a[1] + 1 == b[0] for a, b in zip(pieces, pieces[1:]))
+    assert all(logs is not None for *_, logs in pieces)
+    assert sum(len(logs) for *_, logs in pieces) == provider.count(0, 99_999)
+    assert planner.splits > 0 and planner.failed == 0
+
+
+def test_planner_grows_on_quiet_pools_and_shrinks_on_busy_ones():
+    quiet = AdaptiveRangePlanner(1_000, target_logs=2_000, max_step=500_000)
+    _crawl(quiet, FakeLogProvider([(0, 0.002)]), 0, 2_000_000)
+    busy = AdaptiveRangePlanner(100_000, target_logs=2_000)
+    _crawl(busy, FakeLogProvider([(0, 4.0)]), 0, 200_000)
+
+    assert quiet.step == 500_000
+    assert busy.step == 500  # 2 000 logs at 4 logs/block
+    assert busy.summary()["logs_per_call"] > 1_000
+
+
+@pytest.mark.parametrize(
+    "name,density",
+    [
+        ("quiet", [(0, 0.004)]),
+        ("bursty", [(0, 0.05), (1_000_000, 3.0), (1_100_000, 0.05)]),
+    ],
+)
+def test_adaptive_step_needs_fewer_calls_and_loses_no_range(name, density):
+    """Calls and failed ranges for one Arbitrum day-ish (2.4M blocks) of history."""
+    start, end = 0, 2_399_999
+    # the old loop: fixed windows, an oversized window is simply lost
+    fixed_provider = FakeLogProvider(density)
+    fixed_lost = 0
+    for lo in range(start, end + 1, 10_000):
+        try:
+            fetch_logs(fixed_provider, "0xpool", lo, lo + 9_999, ["0xtopic"])
+        except LogRangeTooLarge:
+            fixed_lost += 1
+
+    provider = FakeLogProvider(density)
+    adaptive = AdaptiveRangePlanner(10_000, target_logs=2_000, block_time=0.25)
+    pieces = _crawl(adaptive, provider, start, end)
+
+    assert all(logs is not None for *_, logs in pieces)
+    assert sum(len(logs) for *_, logs in pieces) == provider.count(start, end)
+    assert adaptive.calls < fixed_provider.calls
+    if name == "bursty":
+        assert fixed_lost > 0
@@ -0,0 +1,127 @@
+import copy
+import time
+from json import dumps as json_dumps
+
+import pytest
+import requests
+from web3._utils.method_formatters import log_entry_formatter
+from web3.datastructures import AttributeDict
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI, SWAP_TOPIC
+from app.sources.dex_data_pipeline.evm.utils import events
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_for
+from app.sources.dex_data_pipeline.evm.utils.events import LogRangeTooLarge, fetch_logs_raw, normalize_raw_logs
+from app.utils.log_utils import sanitize_log
+from swap_logs import v3_swap_logs
+from test_swap_decoders import _stamp
+
+
+def as_rpc_json(log: dict) -> dict:
+    """A sanitized fixture log as the node sends it in an eth_getLogs response."""
+    return {
+        "address": log["address"].lower(),
+        "topics": ["0x" + bytes(t).hex() for t in log["topics"]],
+        "data": "0x" + log["data"],
+        "blockNumber": hex(log["blockNumber"]),
+        "transactionHash": "0x" + log["transactionHash"],
+        "transactionIndex": hex(log["transactionIndex"]),
+        "blockHash": "0x" + log["blockHash"],
+        "logIndex": hex(log["logIndex"]),
+        "removed": False,
+    }
+
+
+class FakeNode:
+    """requests.Session stand-in answering eth_getLogs from a list of RPC-JSON logs."""
+
+    def __init__(self, logs=(), error=None, fail=0, status=200):
+        self.logs = list(logs)
+        self.error = error
+        self.fail = fail
+        self.status = status
+        self.requests = []
+
+    def post(self, url, json, timeout):
+        self.requests.append(json)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("connection reset")
+        body = {"jsonrpc": "2.0", "id": json["id"]}
+        if self.error:
+            body["error"] = {"code": -32602, "message": self.error}
+        else:
+            lo, hi = (int(json["params"][0][k], 16) for k in ("fromBlock", "toBlock"))
+            body["result"] = [copy.deepcopy(log) for log in self.logs if lo <= int(log["blockNumber"], 16) <= hi]
+        response = requests.Response()
+        response.status_code, response._content = self.status, json_dumps(body).encode()
+        return response
+
+
+@pytest.fixture
+def node(monkeypatch):
+    monkeypatch.setattr("backoff._sync.time.sleep", lambda _: None)
+
+    def install(**kwargs):
+        fake = FakeNode(**kwargs)
+        monkeypatch.setattr(events, "_http", lambda: fake)
+        return fake
+    return install
+
+
+def test_raw_logs_decode_like_sanitized_web3_logs(node):
+    sanitized = v3_swap_logs(300, 1_000, 200, seed=5)
+    node(logs=[as_rpc_json(log) for log in sanitized])
+
+    raw = fetch_logs_raw("http://node", "0xpool", 1_000, 1_199, [SWAP_TOPIC])
+
+    assert [log["blockNumber"] for log in raw] == [log["blockNumber"] for log in sanitized]
+    assert raw[0]["transactionHash"] == sanitized[0]["transactionHash"]
+    plan = plan_for(SWAP_ABI, 18, 6, False)
+    assert plan.decode(_stamp(raw)).rows() == plan.decode(_stamp(sanitized)).rows()
+
+
+def test_filter_is_sent_as_json_rpc_quantities_and_hex(node):
+    fake = node()
+
+    assert fetch_logs_raw("http://node", ["0xa", "0xb"], 16, 255, [[SWAP_TOPIC, "ab" * 32]]) == []
+
+    [request] = fake.requests
+    assert request["method"] == "eth_getLogs"
+    assert request["params"] == [{"fromBlock": "0x10", "toBlock": "0xff", "address": ["0xa", "0xb"],
+                                  "topics": [["0x" + SWAP_TOPIC.hex(), "0x" + "ab" * 32]]}]
+
+
+def test_provider_errors_split_or_fail_the_range(node):
+    node(error="Log response size exceeded. You can make eth_getLogs requests with up to a 2K block range")
+    with pytest.raises(LogRangeTooLarge):
+        fetch_logs_raw("http://node", "0xpool", 0, 10_000, [SWAP_TOPIC])
+
+    flaky = node(fail=2, logs=[as_rpc_json(log) for log in v3_swap_logs(3, 5, 1)])
+    assert len(fetch_logs_raw("http://node", "0xpool", 0, 10, [SWAP_TOPIC])) == 3
+    node(status=400, error="query returned more than 10000 results")
+    with pytest.raises(LogRangeTooLarge):
+        fetch_logs_raw("http://node", "0xpool", 0, 10_000, [SWAP_TOPIC])
+
+    down = node(fail=10)
+    assert fetch_logs_raw("http://node", "0xpool", 0, 10, [SWAP_TOPIC]) is None
+    assert (len(flaky.requests), len(down.requests)) == (3, 3)
+
+
+@pytest.mark.benchmark
+def test_benchmark_per_log_overhead_100k():
+    """web3 formatting + sanitize_log vs in-place normalisation of the node's JSON."""
+    template = [as_rpc_json(log) for log in v3_swap_logs(1_000, 1_000, 5_000, seed=9)]
+    batches = [copy.deepcopy(template) for _ in range(100)]   # 100k logs, parsed JSON
+
+    t0 = time.perf_counter()
+    for batch in batches:     # builds new dicts, leaves `batches` as parsed
+        [sanitize_log(AttributeDict.recursive(log_entry_formatter(log))) for log in batch]
+    web3_us = (time.perf_counter() - t0) * 1e6 / 100_000
+    t0 = time.perf_counter()
+    for batch in batches:
+        normalize_raw_logs(batch)
+    raw_us = (time.perf_counter() - t0) * 1e6 / 100_000
+
+    print(f"\nper-log overhead: web3 + sanitize_log={web3_us:.2f} µs, raw JSON-RPC={raw_us:.2f} µs "
+          f"({web3_us / raw_us:.0f}×; {(web3_us - raw_us) / 10:.1f} s saved per 100k logs)")
+    assert raw_us * 5 < web3_us
@@ -0,0 +1,124 @@
+import json
+import statistics
+import time
+
+import httpx
+import pytest
+import requests
+
+from app.sources.dex_data_pipeline.evm.utils import rpc_batcher
+from app.sources.dex_data_pipeline.evm.utils.events import RpcError
+from app.sources.dex_data_pipeline.evm.utils.rpc_batcher import RateBudget, RpcBatcher
+from test_tx_senders import LocalNode
+
+
+class FlakyNode:
+    """httpx transport handler: echoes params, failing chosen sub-requests / whole posts a few times."""
+
+    def __init__(self, flaky_ids=(), error_rounds=1, http_errors=0):
+        self.flaky = {i: error_rounds for i in flaky_ids}
+        self.http_errors = http_errors
+        self.sent = []
+
+    def __call__(self, request):
+        batch = json.loads(request.content)
+        self.sent.append([call["params"][0] for call in batch])
+        if self.http_errors:
+            self.http_errors -= 1
+            return httpx.Response(503)
+        out = []
+        for call in batch:
+            value = call["params"][0]
+            if self.flaky.get(value):
+                self.flaky[value] -= 1
+                out.append({"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32005, "message": "rate limited"}})
+            else:
+                out.append({"jsonrpc": "2.0", "id": call["id"], "result": None if value < 0 else value * 2})
+        return httpx.Response(200, json=out)
+
+
+def _batcher(node, **kwargs):
+    kwargs.setdefault("batch_size", 10)
+    return RpcBatcher("http://node", client=httpx.Client(transport=httpx.MockTransport(node)),
+                      budget=RateBudget(1e9), retry_delay=0, **kwargs)
+
+
+def test_only_failed_sub_requests_are_resent():
+    node = FlakyNode(flaky_ids={3, 17, 42})
+
+    outcome = _batcher(node).call_many([("eth_echo", [i]) for i in range(50)] + [("eth_echo", [-1])])
+
+    assert outcome.results == [i * 2 for i in range(50)] + [None]      # null result is an answer
+    assert (outcome.posts, outcome.retried) == (7, 3)
+    assert node.sent[-1] == [3, 17, 42]
+
+
+def test_failed_posts_are_resent_and_persistent_errors_raise():
+    node = FlakyNode(http_errors=1)
+    outcome = _batcher(node).call_many([("eth_echo", [i]) for i in range(5)])
+    assert outcome.results == [0, 2, 4, 6, 8] and outcome.retried == 5
+
+    stuck = FlakyNode(flaky_ids={1}, error_rounds=10)
+    with pytest.raises(RpcError, match="1 of 5 sub-requests still failing after 3 attempts"):
+        _batcher(stuck).call_many([("eth_echo", [i]) for i in range(5)])
+    assert stuck.sent[1:] == [[1], [1]]
+
+
+def test_rate_budget_paces_sub_requests():
+    now = [0.0]
+    budget = RateBudget(100, clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+
+    for _ in range(5):
+        budget.acquire(100)
+
+    assert now[0] == pytest.approx(4.0)       # first second's worth is the burst
+    assert budget.waited == pytest.approx(4.0)
+
+
+def _percentiles(samples):
+    cuts = statistics.quantiles(samples, n=20)
+    return statistics.median(samples), cuts[18]
+
+
+@pytest.mark.benchmark
+def test_benchmark_enrich_chunk_latency_sequential_vs_pooled(monkeypatch):
+    """p50 / p95 per 1,000-hash chunk: serialized requests.post vs concurrent batches on kept-alive connections."""
+    local = LocalNode(n_blocks=100, txs_per_block=80, request_seconds=50e-6, call_seconds=0.01,
+                      connect_seconds=0.01)
+    monkeypatch.setattr(rpc_batcher, "_clients", {})
+    monkeypatch.setattr(rpc_batcher, "rate_budget", lambda url: RateBudget(1e9))
+    chunks = [list(local.txs)[i:i + 1_000] for i in range(0, 8_000, 1_000)]
+
+    def sequential(keys):          # the enrich loop before: one fresh connection per batch
+        found = {}
+        for i in range(0, len(keys), 100):
+            payload = [{"jsonrpc": "2.0", "id": j, "method": "eth_getTransactionByHash", "params": ["0x" + key]}
+                       for j, key in enumerate(keys[i:i + 100])]
+            resp = requests.post(local.url, json=payload, timeout=10)
+            resp.raise_for_status()
+            found.update((item["result"]["hash"], item["result"]["from"]) for item in resp.json())
+        return found
+
+    def pooled(keys):
+        outcome = rpc_batcher.rpc_batcher(local.url).call_many(
+            [("eth_getTransactionByHash", ["0x" + key]) for key in keys])
+        return {res["hash"]: res["from"] for res in outcome.results}
+
+    timings, connections = {}, {}
+    try:
+        for name, fetch in (("sequential", sequential), ("pooled", pooled)):
+            local.connections, timings[name] = 0, []
+            for keys in chunks * 2:
+                t0 = time.perf_counter()
+                assert len(fetch(keys)) == len(keys)
+                timings[name].append(time.perf_counter() - t0)
+            connections[name] = local.connections
+    finally:
+        local.close()
+
+    (seq_p50, seq_p95), (pool_p50, pool_p95) = _percentiles(timings["sequential"]), _percentiles(timings["pooled"])
+    print(f"\nenrich chunk (1,000 hashes, 10 batches): sequential p50 {seq_p50 * 1000:.0f} ms / "
+          f"p95 {seq_p95 * 1000:.0f} ms, {connections['sequential']} connections → pooled p50 "
+          f"{pool_p50 * 1000:.0f} ms / p95 {pool_p95 * 1000:.0f} ms, {connections['pooled']} connections")
+    assert connections["pooled"] <= rpc_batcher.RPC_MAX_CONCURRENCY < connections["sequential"]
+    assert pool_p50 * 2 < seq_p50
@@ -0,0 +1,137 @@
+import itertools
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_key
+from app.sources.dex_data_pipeline.utils.stream_pipeline import Stage, StreamPipeline
+from swap_logs import v3_swap_logs
+from test_swap_decoders import _stamp
+
+
+def test_items_flow_through_every_stage_in_order():
+    seen = []
+    pipeline = StreamPipeline([
+        Stage("double", lambda x: x * 2, lambda x: 1),
+        Stage("odd_out", lambda x: None if x % 3 == 0 else x),
+        Stage("sink", seen.append),
+    ], queue_size=2)
+
+    pipeline.run(range(100))
+
+    assert seen == [x * 2 for x in range(100) if (x * 2) % 3]
+    stats = pipeline.snapshot()
+    assert stats["source"]["items"] == 100
+    assert stats["double"]["items"] == stats["double"]["units"] == 100
+    assert stats["sink"]["items"] == len(seen)
+
+
+def test_slow_sink_bounds_work_in_flight():
+    lock = threading.Lock()
+    counts = {"produced": 0, "written": 0, "peak": 0}
+
+    def source():
+        for i in range(300):
+            with lock:
+                counts["produced"] += 1
+                counts["peak"] = max(counts["peak"], counts["produced"] - counts["written"])
+            yield i
+
+    def sink(item):
+        time.sleep(0.001)
+        with lock:
+            counts["written"] += 1
+
+    pipeline = StreamPipeline([Stage("a", lambda x: x), Stage("b", lambda x: x), Stage("sink", sink)],
+                              queue_size=3)
+    pipeline.run(source())
+
+    stats = pipeline.snapshot()
+    assert counts["written"] == 300
+    # three queues of 3 plus one item held by each stage thread and the source
+    assert counts["peak"] <= 3 * 3 + 4
+    assert all(stats[name]["max_queue_depth"] <= 3 for name in ("a", "b", "sink"))
+    assert stats["sink"]["max_queue_depth"] == 3   # the slow stage is the one with a full queue
+
+
+def test_stage_error_stops_an_endless_source():
+    def explode(x):
+        if x == 50:
+            raise RuntimeError("decode failed")
+        return x
+
+    pipeline = StreamPipeline([Stage("decode", explode), Stage("sink", lambda x: x)], queue_size=2)
+    with pytest.raises(RuntimeError, match="decode failed"):
+        pipeline.run(itertools.count())
+
+
+def test_memory_stays_flat_with_history_length():
+    def peak_bytes(n_ranges):
+        ranges = (bytearray(200_000) for _ in range(n_ranges))
+        pipeline = StreamPipeline([Stage("decode", bytes), Stage("write", len)], queue_size=2)
+        tracemalloc.start()
+        pipeline.run(ranges)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    short, long = peak_bytes(20), peak_bytes(400)
+
+    print(f"\npeak memory: 20 ranges {short / 1e6:.1f} MB, 400 ranges {long / 1e6:.1f} MB")
+    assert long < short * 1.5
+
+
+@pytest.fixture
+def stream_orchestrator(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg2://stand-in@localhost/db")
+    from app.sources.dex_data_pipeline.evm.utils import stream_orchestrator
+    return stream_orchestrator
+
+
+def test_pool_stages_decode_enrich_and_write_every_range(stream_orchestrator, monkeypatch):
+    from app.sources.dex_data_pipeline.evm.utils.orchestrator import PoolContext
+
+    written, enrich_calls = [], []
+
+    def enrich(batches, rpc_url):
+        enrich_calls.append(len(batches))
+        if len(enrich_calls) == 1:
+            raise ConnectionError("provider hiccup")
+        for batch in batches:
+            batch.caller[:] = [batch.intern("0xcaller")] * len(batch)
+        return batches
+
+    monkeypatch.setattr(stream_orchestrator, "enrich_batches", enrich)
+    monkeypatch.setattr(stream_orchestrator, "aggregate_and_upsert",
+                        lambda batches, *args: written.append((args, batches)))
+
+    class Resolver:
+        last_stats = {"blocks": 0, "rpc_calls": 0, "round_trips": 0, "cache_hits": None}
+
+        def assign_timestamps(self, logs):
+            _stamp(logs)
+
+    pool = PoolContext("0xpool", "t_1m_klines", "t_raw_swaps", "WETH/USDC", 18, 6, False)
+    key = plan_key(SWAP_ABI, 18, 6, False)
+    range_stats = []
+    stages = stream_orchestrator.pool_stages(pool, key, "http://stand-in", Resolver(), range_stats,
+                                             retry_delay=0)
+    ranges = [
+        stream_orchestrator.RangeWork(0, 99, v3_swap_logs(500, 0, 100, seed=1)),
+        stream_orchestrator.RangeWork(100, 199, []),
+        stream_orchestrator.RangeWork(200, 299, v3_swap_logs(50, 200, 100, seed=2)),
+    ]
+
+    pipeline = StreamPipeline(stages, queue_size=1)
+    pipeline.run(ranges)
+
+    assert [args for args, _ in written] == [
+        ("t_1m_klines", "t_raw_swaps", "weth/usdc", lo, hi) for lo, hi in [(0, 99), (100, 199), (200, 299)]]
+    assert [sum(len(b) for b in batches) for _, batches in written] == [500, 0, 50]
+    assert all(set(b.addresses[i] for i in b.caller) == {"0xcaller"} for _, bs in written for b in bs)
+    assert len(range_stats) == 2
+    assert len(enrich_calls) == 4                # one lookup per range, plus the retry
+    assert pipeline.snapshot()["write"]["units"] == 550
@@ -0,0 +1,185 @@
+import json
+import math
+import time
+from decimal import Decimal
+
+import httpx
+import pytest
+from kombu.utils.json import dumps as json_dumps, loads as json_loads
+
+from app.celery import serialization
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import enrich_tx_batch as enrich_mod, rpc_batcher, tx_senders
+from app.sources.dex_data_pipeline.evm.utils.uniswap_v3_decoder import decode_log_chunk
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import SwapAggregator
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.trade_size_aggregator import (
+    TradeSizeAggregator,
+)
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch, from_fixed, to_fixed
+from app.utils.layered_cache import LayeredCache
+from swap_logs import v3_swap_logs
+
+
+def _batch(n: int = 2_000, seed: int = 3) -> SwapBatch:
+    logs = v3_swap_logs(n, 250_000_000, n * 4, seed=seed)
+    for log in logs:
+        log["timestamp"] = 1_700_000_000 + (log["blockNumber"] - 250_000_000) // 4
+    return decode_log_chunk(logs, SWAP_ABI, 18, 6, False)
+
+
+def test_fixed_point_rounds_half_away_from_zero():
+    assert to_fixed(Decimal("1.0000000000000000005")) == 10**18 + 1
+    assert to_fixed(Decimal("-1.0000000000000000005")) == -(10**18 + 1)
+    assert to_fixed(Decimal("123456789012.123456789012345678")) == 123456789012123456789012345678
+    assert from_fixed(-(10**18 + 1)) == Decimal("-1.000000000000000001")
+    assert from_fixed(10**40) == Decimal(10**22)  # no 28-digit context rounding
+
+
+def test_msgpack_round_trip_keeps_every_column():
+    batch = _batch()
+    batch.caller[::3] = [batch.intern(f"0x{i:040x}") for i in range(len(batch.caller[::3]))]
+    batch.router_tag[::2] = ["EOA"] * len(batch.router_tag[::2])
+    batch.liquidity[0] = 2**127 + 1  # wider than msgpack's 64-bit ints
+
+    wire = serialization.dumps({"args": [batch, Decimal("1.5")], "n": None})
+    back = serialization.loads(wire)
+
+    assert back["args"][0] == batch
+    assert back["args"][0].addresses == batch.addresses
+    assert back["args"][1] == Decimal("1.5")
+
+
+def test_msgpack_round_trip_wide_ints_next_to_none():
+    batch = _batch(50)
+    batch.liquidity[0] = 2**127 + 1
+    batch.liquidity[1] = None
+    batch.price[2:4] = [None, -(2**90)]
+
+    back = serialization.loads(serialization.dumps({"args": [batch]}))["args"][0]
+
+    assert back == batch
+    assert back.liquidity[:2] == [2**127 + 1, None]
+    assert back.price[2:4] == [None, -(2**90)]
+
+
+def test_concat_reinterns_addresses():
+    a, b = _batch(50, seed=1), _batch(50, seed=2)
+    b.sender[0] = b.intern(a.addresses[a.sender[0]])
+
+    merged = SwapBatch.concat([a, b])
+
+    assert merged.rows(raw=True) == a.rows(raw=True) + b.rows(raw=True)
+    assert len(merged.addresses) == len(set(a.addresses) | set(b.addresses))
+
+
+def test_legacy_dict_chunks_convert_losslessly():
+    batch = _batch(200)
+    legacy = batch.rows()
+    for row in legacy:
+        row["timestamp"] = int(row["timestamp"].timestamp())
+
+    assert SwapBatch.from_rows(legacy) == batch
+
+
+def test_batch_aggregation_matches_per_dict_aggregation():
+    batch = _batch()
+    by_dict, by_batch = SwapAggregator(), SwapAggregator()
+    sizes_dict, sizes_batch = TradeSizeAggregator(), TradeSizeAggregator()
+    for row in batch.rows():
+        row["timestamp"] = int(row["timestamp"].timestamp())
+        by_dict.add(row)
+        sizes_dict.add(row)
+    by_batch.add_batch(batch)
+    sizes_batch.add_batch(batch)
+
+    assert by_batch.aggregate() == by_dict.aggregate()
+    assert sizes_batch.buckets == sizes_dict.buckets
+
+
+def test_fixed_trade_size_bucket_is_exact_floor_log10():
+    for value in ("0.01", "0.099999999999999999", "1", "151", "999.999999999999999999", "1000000"):
+        fixed = to_fixed(Decimal(value))
+        assert TradeSizeAggregator._fixed_bucket_key(fixed) == math.floor(Decimal(value).log10())
+
+
+def test_enrich_fills_caller_and_tag_columns(monkeypatch):
+    batch = _batch(30)
+    router = "0x68b3465833fb72a70ecdf485e0e4c7bd8665fc45"
+    batch.sender[0] = batch.intern("0x68b3465833fB72A70ecDF485E0e4C7bD8665Fc45")
+    callers = {h: batch.addresses[batch.sender[i]].lower() if i % 2 else f"0x{i:040x}"
+               for i, h in enumerate(batch.tx_hash)}
+
+    def node(request):
+        return httpx.Response(200, json=[
+            {"id": c["id"], "result": {"hash": "0x" + c["params"][0][2:], "from": callers[c["params"][0][2:]]}}
+            for c in json.loads(request.content)])
+
+    monkeypatch.setattr(rpc_batcher, "http_client", lambda url: httpx.Client(transport=httpx.MockTransport(node)))
+    monkeypatch.setattr(tx_senders, "_cache", LayeredCache("txfrom", decode=bytes.decode))
+
+    out = enrich_mod.enrich_tx_batch(batch, "http://stand-in")
+
+    rows = out.rows()
+    assert rows[0]["router_tag"] == "Uniswap V3 router" and router in enrich_mod.ROUTER_MAP
+    assert all(r["router_tag"] == "EOA" for i, r in enumerate(rows) if i % 2)
+    assert all(r["router_tag"] == "router/agg" for i, r in enumerate(rows) if i % 2 == 0 and i)
+    assert [r["caller"] for r in rows] == [callers[h] for h in batch.tx_hash]
+
+
+def _enriched_batch(n: int) -> SwapBatch:
+    batch = _batch(n, seed=5)
+    for i in range(len(batch)):
+        batch.caller[i] = batch.intern(f"0x{i % 3_000:040x}")
+        batch.router_tag[i] = ("EOA", "router/agg", "1inch router")[i % 3]
+    return batch
+
+
+def _via_json(batch: SwapBatch):
+    """The old wire format: JSON list-of-dicts, aggregated row by row."""
+    dicts = batch.rows()
+    for row in dicts:
+        row["timestamp"] = int(row["timestamp"].timestamp())
+    wire = json_dumps(dicts)
+    agg = SwapAggregator()
+    for row in json_loads(wire):
+        agg.add({**row, **{k: Decimal(row[k]) for k in ("price", "base_vol", "quote_vol")}})
+    return wire, agg.aggregate()
+
+
+def _via_msgpack(batch: SwapBatch):
+    wire = serialization.dumps([batch])
+    [received] = serialization.loads(wire)
+    agg = SwapAggregator()
+    agg.add_batch(received)
+    return wire, agg.aggregate()
+
+
+def test_msgpack_batch_aggregates_like_json_dicts_in_a_third_of_the_bytes():
+    batch = _enriched_batch(10_000)
+
+    json_wire, by_dict = _via_json(batch)
+    msgpack_wire, by_batch = _via_msgpack(batch)
+
+    assert by_batch == by_dict
+    assert len(msgpack_wire) * 3 < len(json_wire)
+
+
+@pytest.mark.benchmark
+def test_benchmark_wire_bytes_and_cpu_per_10k_swaps():
+    """Bytes and CPU for 10k swaps: JSON list-of-dicts vs msgpack SwapBatch."""
+    batch = _enriched_batch(10_000)
+
+    t0 = time.perf_counter()
+    json_wire, _ = _via_json(batch)
+    json_cpu = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    msgpack_wire, _ = _via_msgpack(batch)
+    msgpack_cpu = time.perf_counter() - t0
+
+    print(
+        f"\n10k swaps  JSON dicts: {len(json_wire) / 1024:,.0f} KiB, {json_cpu * 1000:.0f} ms"
+        f"  |  msgpack SwapBatch: {len(msgpack_wire) / 1024:,.0f} KiB, {msgpack_cpu * 1000:.0f} ms"
+        f"  (encode + decode + aggregate)"
+    )
+    assert msgpack_cpu * 2 < json_cpu
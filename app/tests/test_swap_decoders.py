@@ -0,0 +1,252 @@
+import random
+import time
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Context, Decimal, localcontext
+
+import pytest
+from eth_abi import encode
+from web3.exceptions import MismatchedABI
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI as V3_SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import abi_words
+from app.sources.dex_data_pipeline.evm.utils.uniswap_v2_decoder import decode_log_chunk as decode_v2
+from app.sources.dex_data_pipeline.evm.utils.uniswap_v3_decoder import decode_log_chunk as decode_v3
+from app.sources.dex_data_pipeline.utils.swap_batch import to_fixed
+from swap_logs import V2_SWAP_ABI, v2_swap_log, v2_swap_logs, v3_swap_log, v3_swap_logs
+
+
+def _stamp(logs):
+    for log in logs:
+        log["timestamp"] = 1_700_000_000 + log["blockNumber"] // 4
+    return logs
+
+
+def as_db_rows(reference: list[dict]) -> list[dict]:
+    """What NUMERIC(38, 18) columns store for the reference decoder's dicts."""
+    step, numeric = Decimal("1e-18"), Context(prec=38)
+    return [
+        {
+            **row,
+            **{k: row[k].quantize(step, rounding=ROUND_HALF_UP, context=numeric)
+               for k in ("base_delta", "quote_delta", "base_vol", "quote_vol", "price")},
+            "timestamp": datetime.fromtimestamp(row["timestamp"], tz=timezone.utc),
+            "caller": None,
+            "router_tag": None,
+        }
+        for row in reference
+    ]
+
+
+def as_fixed_rows(reference: list[dict]) -> list[dict]:
+    """Reference dicts as 10**18-scaled ints (values beyond NUMERIC(38, 18) included)."""
+    amounts = ("base_delta", "quote_delta", "base_vol", "quote_vol", "price")
+    return [{**row, **{k: to_fixed(row[k]) for k in amounts}, "caller": None, "router_tag": None}
+            for row in reference]
+
+
+# The original per-log decoders, kept as references.  By default they run
+# under a 400-digit context so their Decimals are the exact values; with
+# `context=Context(prec=28)` they reproduce the old production math (see
+# test_fixed_point.py).
+EXACT = Context(prec=400)
+
+
+def reference_v3(logs_chunk, abi, dec0, dec1, base_is_token1, context=EXACT):
+    with localcontext(context):
+        return _reference_v3(logs_chunk, abi, dec0, dec1, base_is_token1)
+
+
+def _reference_v3(logs_chunk, abi, dec0, dec1, base_is_token1):
+    from web3 import Web3
+    from web3._utils.events import get_event_data
+    codec = Web3().codec
+    price_scale = Decimal(10) ** (dec0 - dec1)
+    d0, d1 = Decimal(10) ** dec0, Decimal(10) ** dec1
+    out = []
+    for log in logs_chunk:
+        args = get_event_data(codec, abi, log)["args"]
+        sqrt_price = Decimal(args["sqrtPriceX96"]) / (1 << 96)
+        price = sqrt_price * sqrt_price * price_scale
+        if base_is_token1:
+            base_delta, quote_delta = -Decimal(args["amount1"]) / d1, -Decimal(args["amount0"]) / d0
+        else:
+            base_delta, quote_delta = -Decimal(args["amount0"]) / d0, -Decimal(args["amount1"]) / d1
+        out.append({
+            "block_number": log["blockNumber"], "timestamp": log["timestamp"],
+            "tx_hash": log["transactionHash"], "log_index": log["logIndex"],
+            "sender": args["sender"], "recipient": args["recipient"],
+            "base_delta": base_delta, "quote_delta": quote_delta,
+            "base_vol": abs(base_delta), "quote_vol": abs(quote_delta),
+            "price": price, "liquidity": args.get("liquidity"), "tick": args.get("tick"),
+            "is_buy": quote_delta < 0,
+        })
+    return out
+
+
+@pytest.mark.parametrize("dec0,dec1,base_is_token1", [(18, 6, False), (6, 18, True), (8, 8, False)])
+def test_fast_v3_decoder_matches_abi_decoder(dec0, dec1, base_is_token1):
+    logs = _stamp(v3_swap_logs(2_000, 250_000_000, 5_000, seed=4))
+
+    assert decode_v3(logs, V3_SWAP_ABI, dec0, dec1, base_is_token1).rows() == \
+        as_db_rows(reference_v3(logs, V3_SWAP_ABI, dec0, dec1, base_is_token1))
+
+
+def test_fast_v3_decoder_handles_extreme_words():
+    rng = random.Random(6)
+    logs = _stamp([v3_swap_log(rng, 250_000_000 + i, i) for i in range(4)])
+    extremes = [
+        [-(2**255), 2**255 - 1, 2**160 - 1, 2**128 - 1, -887_272],
+        [0, 0, 1, 0, 887_272],
+        [-1, 1, 2**96, 1, -1],
+        [2**200, -(2**200), 2**159, 2**127, 0],
+    ]
+    for log, values in zip(logs, extremes):
+        log["data"] = encode(["int256", "int256", "uint160", "uint128", "int24"], values).hex()
+
+    assert decode_v3(logs, V3_SWAP_ABI, 18, 6, False).rows(raw=True) == \
+        as_fixed_rows(reference_v3(logs, V3_SWAP_ABI, 18, 6, False))
+
+
+def test_unexpected_layout_falls_back_to_abi(monkeypatch):
+    logs = _stamp(v3_swap_logs(20, 250_000_000, 100))
+    logs[3]["data"] = "0x" + logs[3]["data"]          # 0x-prefixed still parses fast
+    logs[7]["data"] = logs[7]["data"] + "00" * 32      # trailing word → ABI path
+    abi_calls = []
+    real_abi = abi_words.decode_args_abi
+    monkeypatch.setattr(abi_words, "decode_args_abi",
+                        lambda chunk, abi: abi_calls.append(len(chunk)) or real_abi(chunk, abi))
+
+    swaps = decode_v3(logs, V3_SWAP_ABI, 18, 6, False)
+
+    assert abi_calls == [1, 1]  # first-log cross-check + the odd log
+    assert swaps.rows() == as_db_rows(reference_v3(logs, V3_SWAP_ABI, 18, 6, False))
+
+
+@pytest.mark.benchmark
+def test_benchmark_v3_decode_100k_logs():
+    """logs/sec of the original ABI decoder vs the sliced fast path."""
+    logs = _stamp(v3_swap_logs(100_000, 250_000_000, 400_000, seed=8))
+
+    # the ABI path is slow – time a sample and scale
+    sample = logs[:10_000]
+    t0 = time.perf_counter()
+    expected = reference_v3(sample, V3_SWAP_ABI, 18, 6, False)
+    abi_rate = len(sample) / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    swaps = decode_v3(logs, V3_SWAP_ABI, 18, 6, False)
+    fast_rate = len(logs) / (time.perf_counter() - t0)
+
+    print(f"\nV3 decode, 100k logs: get_event_data={abi_rate:,.0f} logs/s  fast={fast_rate:,.0f} logs/s "
+          f"({fast_rate / abi_rate:.1f}×)")
+    assert swaps.rows()[:len(sample)] == as_db_rows(expected)
+    assert fast_rate > abi_rate * 5
+
+
+# ---------------------------------------------------------------------------
+# V2 (Aerodrome vAMM, Camelot V2, PancakeSwap V2)
+#
+# The get_event_data loop of the original decoder, with its flows signed
+# like V3's and its price taken from the net legs.
+# ---------------------------------------------------------------------------
+def reference_v2(logs_chunk, abi, dec0, dec1, base_is_token1, context=EXACT):
+    with localcontext(context):
+        return _reference_v2(logs_chunk, abi, dec0, dec1, base_is_token1)
+
+
+def _reference_v2(logs_chunk, abi, dec0, dec1, base_is_token1):
+    from web3 import Web3
+    from web3._utils.events import get_event_data
+    codec = Web3().codec
+    d0, d1 = Decimal(10) ** dec0, Decimal(10) ** dec1
+    out = []
+    for log in logs_chunk:
+        args = get_event_data(codec, abi, log)["args"]
+        amt0_in, amt1_in = Decimal(args["amount0In"]), Decimal(args["amount1In"])
+        amt0_out, amt1_out = Decimal(args["amount0Out"]), Decimal(args["amount1Out"])
+        if base_is_token1:
+            base_in, base_out, quote_in, quote_out = amt1_in / d1, amt1_out / d1, amt0_in / d0, amt0_out / d0
+        else:
+            base_in, base_out, quote_in, quote_out = amt0_in / d0, amt0_out / d0, amt1_in / d1, amt1_out / d1
+        base_delta, quote_delta = base_out - base_in, quote_out - quote_in
+        if not base_delta or not quote_delta:
+            continue   # no net trade, no price
+        out.append({
+            "block_number": log["blockNumber"], "timestamp": log["timestamp"],
+            "tx_hash": log["transactionHash"], "log_index": log["logIndex"],
+            "sender": args["sender"], "recipient": args["to"],
+            "base_delta": base_delta, "quote_delta": quote_delta,
+            "base_vol": abs(base_delta), "quote_vol": abs(quote_delta),
+            "price": abs(quote_delta) / abs(base_delta),
+            "liquidity": None, "tick": None,
+            "is_buy": quote_delta < 0,
+        })
+    return out
+
+
+@pytest.mark.parametrize("dec0,dec1,base_is_token1", [(18, 6, False), (6, 18, True), (18, 18, False)])
+def test_fast_v2_decoder_matches_abi_decoder(dec0, dec1, base_is_token1):
+    logs = _stamp(v2_swap_logs(2_000, 30_000_000, 5_000, seed=4))
+
+    assert decode_v2(logs, V2_SWAP_ABI, dec0, dec1, base_is_token1).rows() == \
+        as_db_rows(reference_v2(logs, V2_SWAP_ABI, dec0, dec1, base_is_token1))
+
+
+def test_fast_v2_decoder_handles_full_width_amounts():
+    rng = random.Random(6)
+    logs = _stamp([v2_swap_log(rng, 30_000_000 + i, i) for i in range(3)])
+    for log, values in zip(logs, ([2**256 - 1, 0, 0, 1], [0, 1, 2**255, 0], [1, 1, 1, 1])):
+        log["data"] = encode(["uint256"] * 4, values).hex()
+
+    assert decode_v2(logs, V2_SWAP_ABI, 18, 6, False).rows(raw=True) == \
+        as_fixed_rows(reference_v2(logs, V2_SWAP_ABI, 18, 6, False))
+
+
+def test_v2_price_is_net_quote_per_net_base():
+    rng = random.Random(7)
+    logs = _stamp([v2_swap_log(rng, 30_000_000 + i, i) for i in range(4)])
+    weth, usdc = 2 * 10**18, 6_000 * 10**6
+    legs = (
+        [weth, 0, 0, usdc],                  # sell 2 WETH for 6000 USDC
+        [0, usdc, weth, 0],                  # buy 2 WETH with 6000 USDC
+        [10**18, usdc, 3 * 10**18, 0],       # pays 1 WETH + 6000 USDC in, takes 3 WETH: net 2 WETH
+        [weth, 0, weth, 0],                  # WETH in and straight back out: no trade
+    )
+    for log, values in zip(logs, legs):
+        log["data"] = encode(["uint256"] * 4, values).hex()
+
+    swaps = decode_v2(logs, V2_SWAP_ABI, 18, 6, False)
+
+    assert swaps.rows() == as_db_rows(reference_v2(logs, V2_SWAP_ABI, 18, 6, False))
+    assert [row["price"] for row in swaps.rows()] == [Decimal(3_000)] * 3
+    assert [row["is_buy"] for row in swaps.rows()] == [False, True, True]
+
+
+def test_v3_logs_given_a_v2_abi_take_the_abi_path():
+    """A V3 payload under a V2 ABI is caught by the per-chunk cross-check, not mis-sliced."""
+    logs = _stamp(v3_swap_logs(5, 250_000_000, 10))
+    for log in logs:
+        log["data"] = log["data"][:4 * 64]  # 4 words: the V2 fast path would accept it
+
+    with pytest.raises(MismatchedABI):
+        decode_v2(logs, V2_SWAP_ABI, 18, 6, False)
+
+
+@pytest.mark.benchmark
+def test_benchmark_v2_decode_100k_logs():
+    """logs/sec of the original ABI decoder vs the sliced fast path."""
+    logs = _stamp(v2_swap_logs(100_000, 30_000_000, 400_000, seed=8))
+
+    sample = logs[:10_000]
+    t0 = time.perf_counter()
+    expected = reference_v2(sample, V2_SWAP_ABI, 18, 6, False)
+    abi_rate = len(sample) / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    swaps = decode_v2(logs, V2_SWAP_ABI, 18, 6, False)
+    fast_rate = len(logs) / (time.perf_counter() - t0)
+
+    print(f"\nV2 decode, 100k logs: get_event_data={abi_rate:,.0f} logs/s  fast={fast_rate:,.0f} logs/s "
+          f"({fast_rate / abi_rate:.1f}×)")
+    assert swaps.rows()[:len(sample)] == as_db_rows(expected)
+    assert fast_rate > abi_rate * 5
@@ -0,0 +1,304 @@
+import json
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils import rpc_batcher, tx_senders
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_for
+from app.sources.dex_data_pipeline.evm.utils.enrich_tx_batch import enrich_range, enrich_tx_batch
+from app.sources.dex_data_pipeline.evm.utils.rpc_batcher import RateBudget
+from app.sources.dex_data_pipeline.evm.utils.tx_senders import (
+    SenderCostModel,
+    log_sender_stats,
+    lookup_senders,
+    prefetch_shared_senders,
+    sender_stats,
+    tx_key,
+)
+from app.utils.layered_cache import LayeredCache
+from app.utils.log_utils import partition_logs
+from chain_stand_in import FakeRedis
+from swap_logs import v3_swap_logs
+from test_swap_decoders import _stamp
+
+
+class FakeNode:
+    """httpx transport handler for batched eth_getTransactionByHash / eth_getBlockByNumber."""
+
+    def __init__(self, unknown=(), blocks=None):
+        self.unknown = set(unknown)
+        self.blocks = blocks or {}       # number → tx keys
+        self.posts = 0
+        self.looked_up = []
+        self.blocks_fetched = []
+
+    def sender_of(self, key):
+        return "0x" + key[-40:].upper()
+
+    def __call__(self, http_request):
+        self.posts += 1
+        out = []
+        for request in json.loads(http_request.content):
+            if request["method"] == "eth_getBlockByNumber":
+                number = int(request["params"][0], 16)
+                self.blocks_fetched.append(number)
+                result = {"transactions": [{"hash": "0x" + key, "from": self.sender_of(key)}
+                                           for key in self.blocks.get(number, ())]}
+            else:
+                key = request["params"][0][2:]
+                self.looked_up.append(key)
+                result = None if key in self.unknown else {"hash": "0x" + key, "from": self.sender_of(key)}
+            out.append({"jsonrpc": "2.0", "id": request["id"], "result": result})
+        return httpx.Response(200, json=out)
+
+
+def unthrottled(monkeypatch, transport=None):
+    """Route tx_senders' batches through `transport` (real HTTP if None), without a rate budget."""
+    if transport is not None:
+        monkeypatch.setattr(rpc_batcher, "http_client", lambda url: httpx.Client(transport=transport))
+    monkeypatch.setattr(rpc_batcher, "rate_budget", lambda url: RateBudget(1e9))
+
+
+@pytest.fixture
+def node(monkeypatch):
+    fake = FakeNode()
+    unthrottled(monkeypatch, httpx.MockTransport(fake))
+    return fake
+
+
+def _cache(redis):
+    return LayeredCache("txfrom", redis=redis, ttl=3_600, decode=bytes.decode)
+
+
+def _hashes(n, seed=0):
+    return [f"{seed:08x}{i:056x}" for i in range(n)]
+
+
+def test_second_lookup_and_other_workers_hit_the_cache(node):
+    redis = FakeRedis()
+    hashes = _hashes(250)
+
+    first = lookup_senders(hashes, "http://node", _cache(redis))
+    again = lookup_senders(["0x" + h.upper() for h in hashes[:10]], "http://node", _cache(redis))
+
+    assert first == {h: node.sender_of(h).lower() for h in hashes}
+    assert again == {h: first[h] for h in hashes[:10]}
+    assert node.posts == 3 and len(node.looked_up) == 250        # batches of 100, misses only
+    assert set(redis.ttls.values()) == {3_600}
+    assert sender_stats(_cache(redis)) == {"hits": 10, "misses": 250, "rpc_calls": 3}
+
+
+def test_unknown_transactions_are_not_cached(node):
+    redis = FakeRedis()
+    [lost] = _hashes(1)
+    node.unknown.add(lost)
+
+    assert lookup_senders([lost], "http://node", _cache(redis)) == {}
+    assert lookup_senders([lost], "http://node", _cache(redis)) == {}
+    assert node.looked_up == [lost, lost]
+
+
+def test_enrich_reads_senders_from_the_cache(node, monkeypatch):
+    logs = _stamp(v3_swap_logs(300, 1_000, 100, seed=2))
+    batch = plan_for(SWAP_ABI, 18, 6, False).decode(logs)
+    cache = _cache(FakeRedis())
+    monkeypatch.setattr(tx_senders, "_cache", cache)
+    cache.set_many({tx_key(h): node.sender_of(tx_key(h)).lower() for h in batch.tx_hash[:200]})
+
+    enriched = enrich_tx_batch(batch, "http://node")
+
+    assert len(node.looked_up) == len(set(batch.tx_hash[200:]))
+    assert [enriched.address_at(c) for c in enriched.caller] == [
+        node.sender_of(tx_key(h)).lower() for h in batch.tx_hash]
+    assert set(enriched.router_tag) <= {"EOA", "router/agg"}
+
+
+def test_multi_pool_transactions_are_fetched_once(node, caplog, monkeypatch):
+    # celery_app's dictConfig disables loggers created before it was imported
+    monkeypatch.setattr(tx_senders.log, "disabled", False)
+    redis = FakeRedis()
+    shared = _hashes(40, seed=1)
+    logs_by_pool = {
+        pool: [{"transactionHash": h, "blockNumber": n} for n, h in enumerate(shared + _hashes(60, seed=2 + i))]
+        for i, pool in enumerate(("weth_usdc", "arb_weth", "arb_usdc"))
+    }
+    before = sender_stats(_cache(redis))
+
+    assert prefetch_shared_senders("http://node", logs_by_pool, _cache(redis)) == 40
+    for logs in logs_by_pool.values():           # each pool's enrich task, own worker
+        lookup_senders([log["transactionHash"] for log in logs], "http://node", _cache(redis))
+
+    assert len(node.looked_up) == len(set(node.looked_up)) == 40 + 3 * 60
+    after = sender_stats(_cache(redis))
+    with caplog.at_level(logging.INFO, logger=tx_senders.__name__):
+        log_sender_stats(before, after, "run_chain")
+    # 40 prefetched + 3 × 100 pool lookups; each pool found the 40 shared ones cached
+    assert after == {"hits": 120, "misses": 220, "rpc_calls": 4}
+    assert "340 lookups, hit ratio 35.3%, 120 sender lookups saved" in caplog.text
+
+
+def test_redis_outage_still_enriches(node):
+    cache = _cache(FakeRedis(fail=True))
+
+    assert len(lookup_senders(_hashes(5), "http://node", cache)) == 5
+    assert sender_stats(cache) is None
+
+
+def test_enrich_range_looks_each_tx_up_once(node, monkeypatch):
+    monkeypatch.setattr(tx_senders, "TX_SENDER_STRATEGY", "tx")
+    logs = _stamp(v3_swap_logs(1_200, 1_000, 600, seed=4))
+    for prev, log in zip(logs, logs[1:]):        # multi-hop routes: swaps sharing a block share a tx
+        if log["blockNumber"] == prev["blockNumber"]:
+            log["transactionHash"] = prev["transactionHash"]
+    unique = len({log["transactionHash"] for log in logs})
+    plan = plan_for(SWAP_ABI, 18, 6, False)
+    decode = lambda: [plan.decode(chunk) for chunk in partition_logs(logs, 8)]
+
+    monkeypatch.setattr(tx_senders, "_cache", _cache(FakeRedis()))
+    per_chunk = [enrich_tx_batch(batch, "http://node") for batch in decode()]
+    chunk_posts, chunk_lookups = node.posts, len(node.looked_up)
+    node.posts, node.looked_up = 0, []
+    monkeypatch.setattr(tx_senders, "_cache", _cache(FakeRedis()))
+    chunks = decode()
+    per_range = enrich_range(chunks, "http://node")
+
+    print(f"\n{len(logs)} swaps / {unique} txs in 8 chunks: per-chunk enrich {chunk_lookups} lookups in "
+          f"{chunk_posts} RPCs → per-range {len(node.looked_up)} lookups in {node.posts} RPCs "
+          f"(dedup {len(logs) / unique:.2f}×)")
+    assert len(node.looked_up) == unique and node.posts == math.ceil(unique / 100) < chunk_posts
+    assert [b.rows() for b in per_range] == [b.rows() for b in per_chunk]
+    assert [b.minutes for b in per_range] == [b.minutes for b in chunks]    # partials ride on to aggregate
+
+
+def test_cost_model_prefers_blocks_when_swaps_share_them():
+    cost = SenderCostModel(txs_per_block=20)
+
+    assert cost.strategy(1_000, 1_000) == "tx"          # one swap per block
+    assert cost.strategy(1_000, 100) == "block"         # ten per block
+    assert cost.strategy(1_000, 0) == "tx"
+    for _ in range(200):                                # blocks turn out to be huge
+        cost.observe_block(2_000)
+    assert cost.txs_per_block == pytest.approx(2_000, rel=0.01)
+    assert cost.strategy(1_000, 100) == "tx"
+
+
+def test_dense_batches_are_resolved_from_blocks(node, monkeypatch):
+    monkeypatch.setattr(tx_senders, "sender_cost", SenderCostModel(txs_per_block=20))
+    hashes = _hashes(400)
+    blocks = [100 + i // 20 for i in range(400)]        # 20 swaps in each of 20 blocks
+    node.blocks = {b: [h for h, n in zip(hashes, blocks) if n == b] + _hashes(5, seed=b) for b in set(blocks)}
+    node.blocks[100].remove(hashes[0])                   # reorged out of the block we were told
+    redis = FakeRedis()
+
+    senders = lookup_senders(hashes, "http://node", _cache(redis), blocks)
+
+    assert senders == {h: node.sender_of(h).lower() for h in hashes}
+    assert sorted(node.blocks_fetched) == list(range(100, 120)) and node.looked_up == [hashes[0]]
+    assert node.posts == 2                               # one block batch + the straggler
+    assert len(redis.store) == 401                       # filler txs are not cached (+ stats hash)
+
+
+class LocalNode:
+    """
+    JSON-RPC stand-in on a loopback HTTP server: `n_blocks` blocks of
+    `txs_per_block` full-size tx objects, `request_seconds` of node work
+    per sub-request, `call_seconds` of latency per HTTP request and
+    `connect_seconds` per new connection (TCP + TLS handshake).
+    """
+
+    def __init__(self, n_blocks, txs_per_block, request_seconds=0.5e-3, call_seconds=0.0, connect_seconds=0.0):
+        self.txs, self.blocks = {}, {}
+        self.connections = 0
+        for number in range(n_blocks):
+            block = []
+            for i in range(txs_per_block):
+                key = f"{number:032x}{i:032x}"
+                self.txs[key] = {
+                    "hash": "0x" + key, "from": "0x" + key[-40:], "to": "0x" + "ab" * 20,
+                    "blockNumber": hex(number), "blockHash": "0x" + "cd" * 32, "transactionIndex": hex(i),
+                    "nonce": "0x1f", "gas": "0x2dc6c0", "gasPrice": "0x989680", "value": "0x0", "type": "0x2",
+                    "input": "0x04e45aaf" + "00" * 160, "v": "0x1", "r": "0x" + "ef" * 32, "s": "0x" + "ef" * 32,
+                }
+                block.append(self.txs[key])
+            self.blocks[number] = {"number": hex(number), "transactions": block}
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"         # keep-alive
+
+            def setup(self):
+                super().setup()
+                node.connections += 1
+                time.sleep(connect_seconds)
+
+            def do_POST(self):
+                batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(call_seconds)
+                out = []
+                for request in batch:
+                    time.sleep(request_seconds)
+                    param = request["params"][0]
+                    if request["method"] == "eth_getBlockByNumber":
+                        result = node.blocks.get(int(param, 16))
+                    else:
+                        result = node.txs.get(param[2:])
+                    out.append({"jsonrpc": "2.0", "id": request["id"], "result": result})
+                body = json.dumps(out).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def swaps(self, n_swaps, per_block):
+        """`n_swaps` tx keys, `per_block` of them in each block used, and their block numbers."""
+        keys = [f"{i // per_block:032x}{i % per_block:032x}" for i in range(n_swaps)]
+        return keys, [i // per_block for i in range(n_swaps)]
+
+
+@pytest.mark.benchmark
+def test_benchmark_tx_vs_block_lookups_on_local_rpc(monkeypatch):
+    """Resolving 400 uncached senders per tx vs per block, by swaps-per-block density."""
+    unthrottled(monkeypatch)
+    local = LocalNode(n_blocks=400, txs_per_block=20)
+    results = {}
+    try:
+        for per_block in (1, 4, 20):
+            keys, blocks = local.swaps(400, per_block)
+            seconds = {}
+            for strategy in ("tx", "block"):
+                monkeypatch.setattr(tx_senders, "TX_SENDER_STRATEGY", strategy)
+                monkeypatch.setattr(tx_senders, "sender_cost", SenderCostModel())
+                t0 = time.perf_counter()
+                senders = lookup_senders(keys, local.url, LayeredCache("txfrom", decode=bytes.decode), blocks)
+                seconds[strategy] = time.perf_counter() - t0
+                assert senders == {key: "0x" + key[-40:] for key in keys}
+            chosen = SenderCostModel().strategy(len(keys), len(set(blocks)))
+            results[per_block] = (seconds, chosen)
+    finally:
+        local.close()
+
+    print("\n400 senders, 20-tx blocks: " + "; ".join(
+        f"{per_block}/block tx={s['tx'] * 1000:.0f} ms block={s['block'] * 1000:.0f} ms → model picks {chosen}"
+        for per_block, (s, chosen) in results.items()))
+    sparse, _ = results[1]
+    dense, _ = results[20]
+    assert results[1][1] == "tx" and sparse["tx"] < sparse["block"]
+    assert results[20][1] == "block" and dense["block"] * 3 < dense["tx"]
@@ -0,0 +1,100 @@
+import random
+import time
+
+import pytest
+
+from app.sources.dex_data_pipeline.evm.arbitrum.dexs.uniswap_v3.config import SWAP_ABI
+from app.sources.dex_data_pipeline.evm.utils.decoder_registry import plan_for
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.swap_aggregator import SwapAggregator
+from app.sources.dex_data_pipeline.utils.aggregator_and_upsert.aggreation.vector_swap_aggregator import (
+    VectorSwapAggregator,
+)
+from app.sources.dex_data_pipeline.utils.swap_batch import SwapBatch
+from app.utils.log_utils import chunk_logs, partition_logs
+from swap_logs import v3_swap_logs
+from test_swap_decoders import _stamp
+
+PLAN = plan_for(SWAP_ABI, 18, 6, False)
+
+
+def synthetic_batch(n: int, seed: int = 0, shuffle: bool = False) -> SwapBatch:
+    """`n` swaps, ~4 per second (so ties within a second), WETH/USDC-sized fixed-point values."""
+    rng = random.Random(seed)
+    ts = [1_700_000_000 + i // 4 for i in range(n)]
+    if shuffle:
+        rng.shuffle(ts)
+    return SwapBatch(
+        block_number=list(range(n)),
+        timestamp=ts,
+        price=[rng.randint(2_900 * 10**18, 3_100 * 10**18) for _ in range(n)],      # > int64
+        base_delta=[rng.randint(-10**21, 10**21) for _ in range(n)],
+        quote_delta=[rng.randint(-3 * 10**24, 3 * 10**24) for _ in range(n)],
+    )
+
+
+def _both(batches, partials=False):
+    reference, vector = SwapAggregator(), VectorSwapAggregator()
+    for batch in batches:
+        reference.add_batch(batch)
+        if partials:
+            vector.add_partials(batch.minutes)
+        else:
+            vector.add_batch(batch)
+    return reference, vector
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_batches_match_the_reference(shuffle):
+    batches = [synthetic_batch(3_000, seed=s, shuffle=shuffle) for s in range(3)]   # same minutes, 3 arrivals
+
+    reference, vector = _both(batches)
+
+    assert vector.buckets() == dict(reference.buckets)
+    assert vector.aggregate() == reference.aggregate()
+
+
+@pytest.mark.parametrize("split", [partition_logs, chunk_logs])
+def test_partials_match_the_reference(split):
+    chunks = [PLAN.decode(chunk) for chunk in split(_stamp(v3_swap_logs(2_000, 6_000, 4_000)), 5)]
+
+    reference, vector = _both(chunks, partials=True)
+
+    assert vector.aggregate() == reference.aggregate()
+
+
+def test_single_swaps_and_empty_input():
+    vector = VectorSwapAggregator()
+    assert vector.aggregate() == {}
+    vector.add_batch(SwapBatch())
+    vector.add_partials({"minute": []})
+    assert vector.aggregate() == {}
+
+    one = synthetic_batch(1)
+    reference, vector = _both([one])
+    assert vector.aggregate() == reference.aggregate()
+    [row] = vector.aggregate().values()
+    assert row["open_price"] == row["close_price"] == row["high_price"] == row["low_price"]
+
+
+@pytest.mark.benchmark
+def test_benchmark_swaps_per_second_10k_100k_1m():
+    """Reference per-swap SwapAggregator vs VectorSwapAggregator, identical output."""
+    rates = {}
+    for n in (10_000, 100_000, 1_000_000):
+        batch = synthetic_batch(n, seed=n)
+        t0 = time.perf_counter()
+        reference = SwapAggregator()
+        reference.add_batch(batch)
+        expected = reference.aggregate()
+        reference_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vector = VectorSwapAggregator()
+        vector.add_batch(batch)
+        result = vector.aggregate()
+        vector_s = time.perf_counter() - t0
+        assert result == expected
+        rates[n] = (n / reference_s, n / vector_s)
+
+    print("\nswaps/s, reference → vectorized: " + "; ".join(
+        f"{n:,}: {ref:,.0f} → {vec:,.0f} ({vec / ref:.1f}×)" for n, (ref, vec) in rates.items()))
+    assert all(vec > 1.5 * ref for n, (ref, vec) in rates.items() if n >= 100_000)
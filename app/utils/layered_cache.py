@@ -0,0 +1,98 @@
+"""
+Two-level key → value cache: a bounded in-process LRU in front of Redis.
+
+The LRU absorbs repeats inside one worker; Redis shares values between the
+orchestrator and every Celery worker, so a value fetched once is never
+fetched again anywhere.  Redis is optional and best-effort – if it is down
+the cache silently degrades to the local LRU.
+
+Values are ints by default (block timestamps); pass `decode` to read
+something else back from Redis, e.g. `bytes.decode` for strings.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+import logging
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+log = logging.getLogger(__name__)
+
+
+class LayeredCache:
+    def __init__(
+        self,
+        namespace: str,
+        redis: Redis | None = None,
+        maxsize: int = 100_000,
+        ttl: int | None = None,
+        decode: Callable[[bytes], Any] = int,
+    ):
+        self.namespace = namespace
+        self.redis = redis
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds; None = keep forever (immutable values)
+        self.decode = decode  # Redis bytes → value
+        self._lru: OrderedDict = OrderedDict()
+
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _remember(self, key, value) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: Iterable) -> dict:
+        """Return {key: value} for every key found locally or in Redis."""
+        found, remote = {}, []
+        for key in keys:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                found[key] = self._lru[key]
+            else:
+                remote.append(key)
+        self.local_hits += len(found)
+
+        shared = 0
+        if remote and self.redis is not None:
+            try:
+                values = self.redis.mget([self._key(k) for k in remote])
+            except RedisError as exc:
+                log.warning(f"[{self.namespace}] Redis MGET failed, using local cache only: {exc}")
+                values = [None] * len(remote)
+            for key, value in zip(remote, values):
+                if value is not None:
+                    found[key] = self.decode(value)
+                    self._remember(key, found[key])
+                    shared += 1
+        self.shared_hits += shared
+        self.misses += len(remote) - shared
+        return found
+
+    def set_many(self, mapping: dict) -> None:
+        """Store values locally and (pipelined) in Redis."""
+        for key, value in mapping.items():
+            self._remember(key, value)
+        if not mapping or self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(self._key(key), value, ex=self.ttl)
+            pipe.execute()
+        except RedisError as exc:
+            log.warning(f"[{self.namespace}] Redis write of {len(mapping)} keys failed: {exc}")
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return (self.local_hits + self.shared_hits) / lookups if lookups else 0.0
@@ -1,6 +1,7 @@
 # app/utils/sanitize.py
 from web3.datastructures import AttributeDict
 from hexbytes import HexBytes
+from bisect import bisect_right
 from typing import List
 import math
 
@@ -22,4 +23,31 @@ def chunk_logs(logs: List[dict], n_chunks: int) -> List[List[dict]]:
     if n_chunks <= 1 or len(logs) <= n_chunks:
         return [logs]
     size = math.ceil(len(logs) / n_chunks)
-    return [logs[i : i + size] for i in range(0, len(logs), size)]
\ No newline at end of file
+    return [logs[i : i + size] for i in range(0, len(logs), size)]
+
+def partition_logs(logs: List[dict], n_chunks: int) -> List[List[dict]]:
+    """
+    Split `logs` into ≈`n_chunks` even chunks, cutting only where the minute
+    changes (the block, for logs not stamped yet) – so every minute's swaps
+    land in one chunk and its partial aggregate is final for that chunk.
+    """
+    if n_chunks <= 1 or len(logs) <= n_chunks:
+        return [logs]
+    if "timestamp" in logs[0]:
+        keys = [log["timestamp"] // 60 for log in logs]
+    else:
+        keys = [log["blockNumber"] for log in logs]
+    bounds = [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]]
+    if not bounds:
+        return [logs]
+    size = len(logs) / n_chunks
+    cuts = [0]
+    for k in range(1, n_chunks):
+        target = round(k * size)
+        j = bisect_right(bounds, target)
+        # nearest boundary to the ideal cut, past the previous cut
+        candidates = [b for b in bounds[max(0, j - 1):j + 1] if b > cuts[-1]]
+        if candidates:
+            cuts.append(min(candidates, key=lambda b: abs(b - target)))
+    cuts.append(len(logs))
+    return [logs[a:b] for a, b in zip(cuts, cuts[1:]) if b > a]